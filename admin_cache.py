@@ -0,0 +1,125 @@
+import os
+import time
+import asyncio
+
+from aiogram.enums import ChatMemberStatus
+
+# Guruh adminlari ro'yxati (get_chat_administrators) keshi.
+# Har bir xabarda get_chat_member chaqirish o'rniga ro'yxat bir marta olinadi va TTL davomida
+# xotiradan tekshiriladi. Muddati o'tgan ro'yxat bilan javob berilib, fon rejimida yangilanadi.
+ADMIN_ROSTER_TTL = int(os.getenv("ADMIN_ROSTER_TTL", 600))
+ADMIN_ROSTER_ERROR_TTL = 30 # Ro'yxatni olib bo'lmasa, qayta urinishgacha kutish (soniya)
+
+ADMIN_STATUSES = (ChatMemberStatus.CREATOR, ChatMemberStatus.ADMINISTRATOR)
+
+
+def _apply_patches(admins, patches):
+    for user_id, status in patches.items():
+        if status in ADMIN_STATUSES:
+            admins.add(user_id)
+        else:
+            admins.discard(user_id)
+
+
+class AdminRoster:
+    """chat_id -> adminlar user_id to'plami, TTL va hit/miss/refresh hisoblagichlari bilan."""
+
+    def __init__(self, ttl=ADMIN_ROSTER_TTL):
+        self.ttl = ttl
+        self._rosters = {}      # chat_id -> (expires_at, set(user_id))
+        self._refreshing = {}   # chat_id -> yangilash vazifasi (bir vaqtda bitta so'rov)
+        self._generations = {}  # chat_id -> ro'yxat o'zgarishlari soni (chat_member, invalidate)
+        self._patches = {}      # chat_id -> {user_id: status}: yangilash javobi kutilayotganda kelganlari
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.invalidations = 0
+        self.patches = 0
+
+    async def is_admin(self, bot, chat_id, user_id):
+        """Foydalanuvchi guruh admini yoki yaratuvchisi ekanini tekshiradi."""
+        entry = self._rosters.get(chat_id)
+
+        if entry is None:
+            self.misses += 1
+            admins = await self._refresh_once(bot, chat_id)
+            return user_id in admins
+
+        self.hits += 1
+        expires_at, admins = entry
+        if time.monotonic() >= expires_at and chat_id not in self._refreshing:
+            self._start_refresh(bot, chat_id)
+        return user_id in admins
+
+    async def _refresh_once(self, bot, chat_id):
+        task = self._refreshing.get(chat_id)
+        if task is None:
+            task = self._start_refresh(bot, chat_id)
+        return await task
+
+    def _start_refresh(self, bot, chat_id):
+        # Javob kutilayotganda ro'yxat o'zgarsa (generation oshsa), eski javob keshdagini bosib ketmasin:
+        # chat_member o'zgarishlari unga qayta qo'llanadi, invalidate bo'lgan bo'lsa keshga yozilmaydi
+        generation = self._generations.get(chat_id, 0)
+        patches = self._patches[chat_id] = {}
+        task = self._refreshing[chat_id] = asyncio.create_task(self._refresh(bot, chat_id, generation, patches))
+        return task
+
+    async def _refresh(self, bot, chat_id, generation, patches):
+        try:
+            members = await bot.get_chat_administrators(chat_id)
+            admins = {member.user.id for member in members}
+            if self._generations.get(chat_id, 0) != generation:
+                if self._patches.get(chat_id) is not patches:
+                    return admins
+                _apply_patches(admins, patches)
+            self._rosters[chat_id] = (time.monotonic() + self.ttl, admins)
+            self.refreshes += 1
+            return admins
+        except Exception as e:
+            print(f"⚠️ Adminlar ro'yxatini olishda xato ({chat_id}): {e}")
+            self.refresh_errors += 1
+            admins = self._rosters.get(chat_id, (0, set()))[1]
+            if self._patches.get(chat_id) is patches:
+                self._rosters[chat_id] = (time.monotonic() + ADMIN_ROSTER_ERROR_TTL, admins)
+            return admins
+        finally:
+            self._refreshing.pop(chat_id, None)
+            if self._patches.get(chat_id) is patches:
+                del self._patches[chat_id]
+
+    def _bump(self, chat_id):
+        self._generations[chat_id] = self._generations.get(chat_id, 0) + 1
+
+    def apply_member_update(self, chat_id, user_id, status):
+        """chat_member update'i bo'yicha keshdagi ro'yxatni joyida yangilaydi."""
+        self._bump(chat_id)
+        pending = self._patches.get(chat_id)
+        if pending is not None:
+            pending[user_id] = status
+        entry = self._rosters.get(chat_id)
+        if entry is not None:
+            _apply_patches(entry[1], {user_id: status})
+            self.patches += 1
+
+    def invalidate(self, chat_id):
+        """Guruh ro'yxatini keshdan o'chiradi (keyingi tekshiruvda qayta olinadi)."""
+        self._bump(chat_id)
+        self._patches.pop(chat_id, None)
+        if self._rosters.pop(chat_id, None) is not None:
+            self.invalidations += 1
+
+    def stats(self):
+        return {
+            'chats': len(self._rosters),
+            'hits': self.hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'refresh_errors': self.refresh_errors,
+            'invalidations': self.invalidations,
+            'patches': self.patches,
+        }
+
+
+admin_roster = AdminRoster()
@@ -0,0 +1 @@
+# Offline benchmarklar: python -m benchmarks.<nomi>
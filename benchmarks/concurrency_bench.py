@@ -0,0 +1,99 @@
+"""Update'larni parallel qayta ishlash uchun stress benchmark (soxta Bot bilan).
+
+Handler foydalanuvchi hisoblagichini o'qiydi, Bot API chaqiruvini kutadi va yozadi
+(database backenddagi kabi await'li o'qish-o'zgartirish-yozish). Uch rejim solishtiriladi:
+ketma-ket, parallel lock'siz va parallel update_serializer bilan. So'ng main.py handlerlari
+ketma-ket va update_serializer bilan parallel o'tkaziladi.
+
+Ishga tushirish: python -m benchmarks.concurrency_bench [update_soni] [foydalanuvchilar] [api_kechikish_ms]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+from collections import Counter
+
+from aiogram import Dispatcher
+
+import main
+import storage
+from deletion_scheduler import deletion_scheduler
+from update_locks import UpdateSerializer
+from benchmarks.fakes import make_bot, make_group_message
+
+CHAT_ID = -1001000000000
+
+
+def make_counter_dispatcher(counters, serializer=None):
+    dp = Dispatcher()
+    if serializer is not None:
+        dp.update.outer_middleware(serializer)
+
+    async def count_message(message):
+        key = (message.chat.id, message.from_user.id)
+        value = counters[key]
+        await message.bot.get_chat_member(message.chat.id, message.from_user.id)
+        counters[key] = value + 1
+
+    dp.message.register(count_message)
+    return dp
+
+
+async def feed(dp, bot, updates, concurrent):
+    start = time.perf_counter()
+    if concurrent:
+        await asyncio.gather(*(dp.feed_update(bot, update) for update in updates))
+    else:
+        for update in updates:
+            await dp.feed_update(bot, update)
+    return time.perf_counter() - start
+
+
+async def run(total, users, latency):
+    bot = make_bot(latency=latency)
+    updates = [make_group_message(bot, CHAT_ID, random.randrange(1, users + 1)) for _ in range(total)]
+
+    print(f"{total} update, {users} foydalanuvchi, API kechikishi {latency * 1e3:.0f} ms")
+    for name, concurrent, serializer in (
+        ("ketma-ket", False, None),
+        ("parallel, lock'siz", True, None),
+        ("parallel + serializer", True, UpdateSerializer()),
+    ):
+        counters = Counter()
+        elapsed = await feed(make_counter_dispatcher(counters, serializer), bot, updates, concurrent)
+        lost = total - sum(counters.values())
+        extra = f" | {serializer.stats()}" if serializer else ""
+        print(f"    {name:<22} {total / elapsed:9.1f} update/s | yo'qolgan: {lost}{extra}")
+
+    main.bot = bot
+    main.bot_info = await bot.get_me()
+    for name, concurrent in (("main.py ketma-ket", False), ("main.py parallel", True)):
+        main.dp = Dispatcher()
+        main.setup_handlers(main.dp)
+        elapsed = await feed(main.dp, bot, updates, concurrent)
+        print(f"    {name:<22} {total / elapsed:9.1f} update/s")
+
+    for task in asyncio.all_tasks():
+        if task is not asyncio.current_task():
+            task.cancel()
+
+
+def bench():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    latency = float(sys.argv[3]) / 1e3 if len(sys.argv) > 3 else 5 / 1e3
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage.CONFIG_FILE = os.path.join(tmp_dir, 'config.json')
+        storage.STATS_FILE = os.path.join(tmp_dir, 'stats.json')
+        storage.STATS_JOURNAL_FILE = os.path.join(tmp_dir, 'stats.journal')
+        storage.CHANNELS_FILE = os.path.join(tmp_dir, 'channels.json')
+        deletion_scheduler.path = os.path.join(tmp_dir, 'deletions.jsonl')
+        asyncio.run(run(total, users, latency))
+        storage.flush_stats()
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,127 @@
+"""database.py (PostgREST client) uchun o'tkazuvchanlik va yo'qolgan yangilanishlar benchmarki, lokal stub server bilan.
+
+Bir foydalanuvchiga bir vaqtda N ta taklif yoziladi: eski o'qish-o'zgartirish-yozish usuli
+(SELECT + upsert), serverdagi apply_user_stats_delta RPC va batcher solishtiriladi.
+So'ng statistika o'zgarishlari har biri alohida RPC bilan va batcher orqali yuborilib, so'rov/s solishtiriladi.
+
+Ishga tushirish: python -m benchmarks.database_bench [amallar_soni] [parallellik] [kechikish_ms]
+"""
+import sys
+import time
+import random
+import asyncio
+
+import database
+from benchmarks.postgrest_stub import start_stub
+
+CHAT_ID = -1001000000000
+USERS = 1000
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(operations, concurrency, latency):
+    stub, runner, url = await start_stub(latency=latency)
+    database.SUPABASE_URL, database.SUPABASE_KEY = url, "stub-key"
+    await database.init_db()
+
+    policy = await database.get_policy(CHAT_ID)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_message():
+        async with semaphore:
+            start = time.perf_counter()
+            await database.consume_ad_quota(random.randrange(USERS), CHAT_ID, policy, invited_count_change=1)
+            latencies.append(time.perf_counter() - start)
+
+    stub.requests = 0
+    start = time.perf_counter()
+    await asyncio.gather(*(one_message() for _ in range(operations)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{operations} amal, parallellik {concurrency}, pul {database.supabase.pool_size}, "
+          f"server kechikishi {latency * 1e3:.0f} ms")
+    print(f"    {operations / elapsed:8.1f} amal/s | p50 {_percentile(latencies, 0.5) * 1e3:.2f} ms | "
+          f"p99 {_percentile(latencies, 0.99) * 1e3:.2f} ms | so'rov/amal {stub.requests / operations:.2f}")
+
+    await lost_updates(stub, concurrency)
+    await batching(stub, operations, concurrency)
+
+    await database.close_db()
+    await runner.cleanup()
+
+
+async def _read_modify_write(user_id, chat_id, policy):
+    """Oldingi update_user_stats usuli: o'qish va yozish alohida so'rovlarda."""
+    cycle_count, invited_count, epoch = await database._read_stats(user_id, chat_id, policy.reset_interval_days)
+    await (database.supabase.table('user_stats')
+           .upsert({'user_id': user_id, 'chat_id': chat_id, 'current_ad_cycle_count': cycle_count,
+                    'invited_members_count': invited_count + 1, 'cycle_epoch': epoch},
+                   on_conflict='chat_id,user_id')
+           .execute())
+
+
+async def _rpc_per_event(user_id, chat_id, policy):
+    """Batchersiz usul: har bir hodisa uchun alohida apply_user_stats_delta so'rovi."""
+    await database.supabase.rpc('apply_user_stats_delta', {
+        'p_chat_id': chat_id, 'p_user_id': user_id, 'p_epoch': policy.current_epoch(),
+        'p_reset_interval_days': policy.reset_interval_days, 'p_invited_delta': 1
+    })
+
+
+async def lost_updates(stub, concurrency):
+    policy = await database.get_policy(CHAT_ID)
+    print(f"Bitta foydalanuvchiga {concurrency} ta parallel taklif:")
+    for name, user_id, increment in (
+        ("o'qish+yozish", USERS + 1, lambda user: _read_modify_write(user, CHAT_ID, policy)),
+        ("RPC delta", USERS + 2, lambda user: _rpc_per_event(user, CHAT_ID, policy)),
+        ("batcher", USERS + 3, lambda user: database.update_user_stats(user, CHAT_ID, invited_count_change=1, wait=True)),
+    ):
+        stub.requests = 0
+        start = time.perf_counter()
+        await asyncio.gather(*(increment(user_id) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        stats = await database.get_user_stats(user_id, CHAT_ID, await database.get_config(CHAT_ID))
+        invited = stats['invited_members_count']
+        print(f"    {name:<14} natija {invited:>5} / {concurrency} (yo'qolgan: {concurrency - invited}) | "
+              f"{elapsed * 1e3:.1f} ms | so'rov/amal {stub.requests / concurrency:.2f}")
+
+
+async def batching(stub, events, concurrency):
+    policy = await database.get_policy(CHAT_ID)
+    semaphore = asyncio.Semaphore(concurrency)
+    print(f"{events} ta statistika o'zgarishi ({USERS} foydalanuvchi, parallellik {concurrency}):")
+
+    async def per_event(user_id):
+        async with semaphore:
+            await _rpc_per_event(user_id, CHAT_ID, policy)
+
+    async def batched(user_id):
+        await database.update_user_stats(user_id, CHAT_ID, invited_count_change=1)
+
+    for name, record in (("har biri alohida", per_event), ("batcher", batched)):
+        users = [random.randrange(USERS) for _ in range(events)]
+        stub.requests = 0
+        start = time.perf_counter()
+        await asyncio.gather(*(record(user_id) for user_id in users))
+        await database.flush_stats()
+        elapsed = time.perf_counter() - start
+        print(f"    {name:<16} {events / elapsed:9.1f} hodisa/s | {stub.requests / elapsed:7.1f} so'rov/s | "
+              f"so'rovlar {stub.requests}")
+    print(f"    batcher: {database.stats_batcher_stats()}")
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    latency = float(sys.argv[3]) / 1e3 if len(sys.argv) > 3 else 5.0 / 1e3
+    asyncio.run(run(operations, concurrency, latency))
+
+
+if __name__ == "__main__":
+    main()
+
@@ -0,0 +1,132 @@
+"""Tarmoqsiz benchmarklar uchun soxta Telegram Bot API sessiyasi va update generatorlari."""
+import random
+import asyncio
+import itertools
+from collections import Counter
+from datetime import datetime
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import GetChatAdministrators, GetChatMember, GetMe, SendMessage
+from aiogram.types import Chat, ChatMemberMember, ChatMemberOwner, Message, Update, User
+
+BOT_ID = 4200000000
+OWNER_ID = 4200000001
+
+
+class FakeSession(BaseSession):
+    """Bot API so'rovlarini tarmoqqa chiqarmasdan javob beradi va metod bo'yicha sanaydi.
+
+    latency        - har bir so'rovga qo'shiladigan sun'iy kechikish (soniya)
+    retry_every    - har N-chi so'rovda TelegramRetryAfter qaytariladi (0 - o'chirilgan)
+    retry_after    - RetryAfter dagi kutish vaqti (soniya)
+    """
+
+    def __init__(self, latency=0.0, retry_every=0, retry_after=1):
+        super().__init__()
+        self.latency = latency
+        self.retry_every = retry_every
+        self.retry_after = retry_after
+        self.calls = Counter()
+        self.errors = Counter()
+        self._total = 0
+        self._message_ids = itertools.count(1_000_000)
+        self.me = User(id=BOT_ID, is_bot=True, first_name="LimitBot", username="limit_test_bot")
+
+    async def close(self):
+        pass
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def make_request(self, bot, method, timeout=None):
+        name = type(method).__name__
+        self.calls[name] += 1
+        self._total += 1
+        call_number = self._total
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if self.retry_every and call_number % self.retry_every == 0:
+            self.errors['TelegramRetryAfter'] += 1
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=self.retry_after)
+
+        return self._respond(bot, method)
+
+    def _respond(self, bot, method):
+        if isinstance(method, GetMe):
+            return self.me
+        if isinstance(method, SendMessage):
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type='supergroup'),
+                from_user=self.me,
+                text=method.text
+            ).as_(bot)
+        if isinstance(method, GetChatMember):
+            return ChatMemberMember(user=User(id=method.user_id, is_bot=False, first_name="User"))
+        if isinstance(method, GetChatAdministrators):
+            return [ChatMemberOwner(user=User(id=OWNER_ID, is_bot=False, first_name="Owner"), is_anonymous=False)]
+        return True
+
+    def reset(self):
+        self.calls.clear()
+        self.errors.clear()
+        self._total = 0
+
+
+def make_bot(**session_kwargs):
+    """FakeSession bilan ishlaydigan haqiqiy aiogram Bot obyektini yaratadi."""
+    return Bot(token="42:FAKE-TOKEN-FOR-BENCHMARKS", session=FakeSession(**session_kwargs))
+
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+def make_group_message(bot, chat_id, user_id, text="Reklama matni"):
+    message = Message(
+        message_id=next(_message_ids),
+        date=datetime.now(),
+        chat=Chat(id=chat_id, type='supergroup', title=f"Guruh {chat_id}"),
+        from_user=User(id=user_id, is_bot=False, first_name=f"User{user_id}"),
+        text=text
+    )
+    return Update(update_id=next(_update_ids), message=message.as_(bot)).as_(bot)
+
+
+def make_join_message(bot, chat_id, inviter_id, new_member_ids):
+    message = Message(
+        message_id=next(_message_ids),
+        date=datetime.now(),
+        chat=Chat(id=chat_id, type='supergroup', title=f"Guruh {chat_id}"),
+        from_user=User(id=inviter_id, is_bot=False, first_name=f"User{inviter_id}"),
+        new_chat_members=[User(id=member_id, is_bot=False, first_name=f"User{member_id}") for member_id in new_member_ids]
+    )
+    return Update(update_id=next(_update_ids), message=message.as_(bot)).as_(bot)
+
+
+def make_workload(bot, updates, chats, users, join_ratio=0.1, burst_ratio=0.02, burst_size=20, seed=1):
+    """chats x users bo'yicha sintetik update'lar ro'yxati.
+
+    join_ratio  - qo'shilish (new_chat_members) update'lari ulushi
+    burst_ratio - spam portlashi ehtimoli: bitta foydalanuvchi ketma-ket burst_size ta xabar yuboradi
+    """
+    rng = random.Random(seed)
+    new_member_ids = itertools.count(5_000_000_000)
+    result = []
+    while len(result) < updates:
+        chat_id = -1001000000000 - rng.randrange(chats)
+        user_id = rng.randrange(1, users + 1)
+        roll = rng.random()
+        if roll < burst_ratio:
+            result.extend(make_group_message(bot, chat_id, user_id) for _ in range(burst_size))
+        elif roll < burst_ratio + join_ratio:
+            members = [next(new_member_ids) for _ in range(rng.randint(1, 3))]
+            result.append(make_join_message(bot, chat_id, user_id, members))
+        else:
+            result.append(make_group_message(bot, chat_id, user_id))
+    return result[:updates]
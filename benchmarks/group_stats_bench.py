@@ -0,0 +1,97 @@
+"""Guruhlar bo'yicha bo'lingan statistika (stats.d/): bitta ulkan guruh va ko'p kichik guruhlar.
+
+Kichik guruhlardagi amallar ulkan guruh hajmiga bog'liq emasligi tekshiriladi: ishga tushgandan keyingi
+birinchi xabar, kichik guruhlardagi xabarlardan keyin journalni yig'ish (butun snapshotni bitta
+stats.bin ga qayta yozish bilan taqqoslanadi), get_group_stats va guruhni o'chirib yig'ish.
+
+Ishga tushirish: python -m benchmarks.group_stats_bench [ulkan_guruh] [kichik_guruhlar] [kichik_guruh_hajmi]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from array import array
+
+import storage
+from binary_snapshot import write_snapshot
+from limits import cycle_epoch
+from stats_shards import split_table
+from stats_table import ChatStats, StatsTable
+
+HUGE_CHAT_ID = -1001000000000
+MESSAGES = 1000
+RESET_INTERVAL_DAYS = 30
+
+
+def make_table(huge, small_chats, small_size, rng):
+    epoch = cycle_epoch(RESET_INTERVAL_DAYS)
+    table = StatsTable()
+    for chat_id, size in [(HUGE_CHAT_ID, huge)] + [(HUGE_CHAT_ID - 1 - chat, small_size) for chat in range(small_chats)]:
+        ids = sorted(rng.sample(range(1, 50 * size), size))
+        table.chats[chat_id] = ChatStats(
+            array('q', ids), array('i', (rng.randrange(5) for _ in ids)),
+            array('i', (rng.randrange(30) for _ in ids)), array('i', [epoch]) * size
+        )
+    return table
+
+
+def reset_storage(tmp_dir):
+    if storage._journal is not None:
+        storage._journal.close()
+    storage._stats, storage._journal, storage._seq, storage._unsynced = None, None, 0, 0
+    storage.STATS_FILE = os.path.join(tmp_dir, 'stats.json')
+    storage.STATS_JOURNAL_FILE = os.path.join(tmp_dir, 'stats.journal')
+
+
+def timed_ms(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - start) * 1e3, result
+
+
+def run(huge, small_chats, small_size, tmp_dir):
+    rng = random.Random(1)
+    table = make_table(huge, small_chats, small_size, rng)
+    small_ids = [chat_id for chat_id in table.chats if chat_id != HUGE_CHAT_ID]
+    messages = [(chat_id, table.chats[chat_id].ids[rng.randrange(small_size)])
+                for chat_id in rng.choices(small_ids, k=MESSAGES)]
+    storage.CONFIG_FILE = os.path.join(tmp_dir, 'config.json')
+    reset_storage(tmp_dir)
+    split_table(storage._shards_dir(), table, 0)
+    print(f"Ulkan guruh: {huge} | kichik guruhlar: {small_chats} x {small_size} | {MESSAGES} xabar kichik guruhlarda")
+
+    chat_id, user_id = messages[0]
+    first_ms, _ = timed_ms(storage.consume_ad_quota, user_id, chat_id, storage.get_policy(chat_id))
+    print(f"    birinchi xabar (kichik guruh):   {first_ms:9.2f} ms")
+
+    for chat_id, user_id in messages[1:]:
+        storage.consume_ad_quota(user_id, chat_id, storage.get_policy(chat_id))
+    touched = len({chat_id for chat_id, _ in messages})
+    fold_ms, _ = timed_ms(storage.compact_stats)
+    whole_ms, whole_bytes = timed_ms(write_snapshot, os.path.join(tmp_dir, 'whole.bin'), table)
+    print(f"    journalni yig'ish ({touched} guruh):  {fold_ms:9.2f} ms | butun stats.bin: {whole_ms:9.2f} ms "
+          f"({whole_bytes / 2**20:.1f} MiB)")
+
+    reset_storage(tmp_dir)
+    export_ms, rows = timed_ms(storage.get_group_stats, small_ids[-1])
+    print(f"    get_group_stats (kichik guruh):  {export_ms:9.2f} ms | {len(rows)} qator")
+
+    storage.reset_group_stats(small_ids[0])
+    storage.delete_group(small_ids[1])
+    drop_ms, _ = timed_ms(storage.compact_stats)
+    huge_loaded = "ha" if storage._stats.chats.get(HUGE_CHAT_ID) is not None else "yo'q"
+    print(f"    2 guruhni o'chirib yig'ish:      {drop_ms:9.2f} ms | ulkan guruh yuklanganmi: {huge_loaded}")
+    reset_storage(tmp_dir)
+
+
+def main():
+    huge = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    small_chats = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    small_size = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run(huge, small_chats, small_size, tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
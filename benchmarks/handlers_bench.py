@@ -0,0 +1,70 @@
+"""Guruh handlerlari uchun kechikish va Bot API chaqiruvlari benchmarki (soxta Bot bilan).
+
+Ishga tushirish: python -m benchmarks.handlers_bench [xabarlar_soni] [api_kechikish_ms]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+
+from aiogram import Dispatcher
+
+import main
+import storage
+from admin_cache import admin_roster
+from deletion_scheduler import deletion_scheduler
+from limit_warnings import limit_warnings
+from benchmarks.fakes import make_bot, make_group_message
+
+CHAT_ID = -1001000000000
+USERS = 200
+
+
+async def run(messages, latency):
+    bot = make_bot(latency=latency)
+    main.bot = bot
+    main.bot_info = await bot.get_me()
+    main.dp = Dispatcher()
+    main.setup_handlers(main.dp)
+    bot.session.reset()
+
+    updates = [make_group_message(bot, CHAT_ID, random.randrange(1, USERS + 1)) for _ in range(messages)]
+
+    start = time.perf_counter()
+    for update in updates:
+        await main.dp.feed_update(bot, update)
+    await main.send_queue.drain()  # Handlerlar kutmagan yuborish/o'chirishlar
+    elapsed = time.perf_counter() - start
+
+    calls = bot.session.calls
+    print(f"{messages} xabar | {elapsed / messages * 1e3:.3f} ms/xabar | "
+          f"API chaqiruvlari/xabar: {sum(calls.values()) / messages:.2f}")
+    for name, count in calls.most_common():
+        print(f"    {name:<24} {count / messages:.2f}")
+    print(f"Adminlar keshi: {admin_roster.stats()}")
+    print(f"O'chirish navbati: {deletion_scheduler.stats()}")
+    print(f"Ogohlantirishlar: {limit_warnings.stats()}")
+
+    for task in asyncio.all_tasks():
+        if task is not asyncio.current_task():
+            task.cancel()
+
+
+def bench():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = float(sys.argv[2]) / 1e3 if len(sys.argv) > 2 else 0.0
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage.CONFIG_FILE = os.path.join(tmp_dir, 'config.json')
+        storage.STATS_FILE = os.path.join(tmp_dir, 'stats.json')
+        storage.STATS_JOURNAL_FILE = os.path.join(tmp_dir, 'stats.journal')
+        storage.CHANNELS_FILE = os.path.join(tmp_dir, 'channels.json')
+        deletion_scheduler.path = os.path.join(tmp_dir, 'deletions.jsonl')
+        asyncio.run(run(messages, latency))
+        storage.flush_stats()
+
+
+if __name__ == "__main__":
+    bench()
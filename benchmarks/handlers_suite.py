@@ -0,0 +1,188 @@
+"""handle_group_messages va handle_new_member uchun o'tkazuvchanlik benchmarki (har bir storage backendida).
+
+Haqiqiy handlerlar soxta Bot (FakeSession) bilan ishlaydi: sintetik update'lar N guruh x M foydalanuvchi
+bo'yicha yaratiladi (xabarlar, qo'shilishlar, spam portlashlari) va webhook rejimidagi kabi parallel
+beriladi. Telegram chaqiruvlari production'dagi kabi send_queue orqali o'tadi (limitlar o'chirilgan),
+shuning uchun RetryAfter ham umumiy pauza bilan qayta ishlanadi.
+
+Natija: update/s, p50/p99 kechikish, update boshiga diskka yozilgan baytlar (/proc/self/io, faqat Linux)
+va update boshiga API chaqiruvlari. Oxirgi argument berilsa, natijalar JSON faylga yoziladi -
+versiyalarni solishtirish uchun.
+
+Ishga tushirish:
+    python -m benchmarks.handlers_suite [update'lar] [guruhlar] [foydalanuvchilar] [api_kechikish_ms] [retry_every] [natija.json]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+
+from aiogram import Dispatcher
+
+import main
+import storage
+import sqlite_storage
+from admin_cache import AdminRoster
+from deletion_scheduler import DeletionScheduler
+from limit_warnings import WarningRegistry
+from send_queue import SendQueue
+from update_locks import UpdateSerializer
+from benchmarks.fakes import make_bot, make_workload
+
+BACKENDS = ('json', 'sqlite')
+CONCURRENCY = 100  # bir vaqtda qayta ishlanadigan update'lar (WEBHOOK_MAX_IN_FLIGHT kabi)
+UNLIMITED = 1e9    # send_queue token bucket'lari amalda o'chiriladi
+
+# main.py STORAGE_BACKEND bo'yicha import qiladigan nomlar
+STORAGE_NAMES = (
+    'get_config', 'update_config', 'get_required_channels', 'add_channel', 'delete_channel',
+    'get_all_chat_configs', 'add_new_group', 'get_policy', 'consume_ad_quota', 'flush_stats', 'stats_flusher',
+)
+
+
+def _written_bytes():
+    """Jarayon write() tizim chaqiruvlari orqali yozgan baytlar (Linux'da bo'lmasa None)."""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def use_backend(backend, tmp_dir):
+    """main.py handlerlarini tanlangan backendga va bo'sh vaqtinchalik fayllarga ulaydi."""
+    if backend == 'sqlite':
+        module = sqlite_storage
+        if module._conn is not None:
+            module._conn.close()
+        module._conn = None
+        module.SQLITE_FILE = os.path.join(tmp_dir, 'bot.sqlite3')
+    else:
+        module = storage
+        if module._journal is not None:
+            module._journal.close()
+        module._stats, module._journal, module._seq, module._unsynced = None, None, 0, 0
+        module._config_mtime = None
+        module.CONFIG_FILE = os.path.join(tmp_dir, 'config.json')
+        module.STATS_FILE = os.path.join(tmp_dir, 'stats.json')
+        module.STATS_JOURNAL_FILE = os.path.join(tmp_dir, 'stats.journal')
+        module.CHANNELS_FILE = os.path.join(tmp_dir, 'channels.json')
+    module._config_cache.invalidate()
+    for name in STORAGE_NAMES:
+        setattr(main, name, getattr(module, name))
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run_backend(backend, tmp_dir, updates, chats, users, latency, retry_every):
+    use_backend(backend, tmp_dir)
+
+    # Har bir backend toza holatdan boshlaydi
+    main.admin_roster = AdminRoster()
+    main.limit_warnings = WarningRegistry()
+    main.update_serializer = UpdateSerializer()
+    main.deletion_scheduler = DeletionScheduler(os.path.join(tmp_dir, 'deletions.jsonl'))
+
+    bot = make_bot(latency=latency, retry_every=retry_every, retry_after=1)
+    queue = SendQueue(global_per_second=UNLIMITED, group_per_minute=UNLIMITED, private_per_second=UNLIMITED)
+    bot.session.middleware(queue)
+    main.bot = bot
+    main.bot_info = await bot.get_me()
+    main.dp = Dispatcher()
+    main.setup_handlers(main.dp)
+
+    workload = make_workload(bot, updates, chats, users)
+    joins = sum(1 for update in workload if update.message.new_chat_members)
+    bot.session.reset()
+
+    latencies = []
+    slots = asyncio.Semaphore(CONCURRENCY)
+
+    async def feed(update):
+        async with slots:
+            start = time.perf_counter()
+            await main.dp.feed_update(bot, update)
+            latencies.append(time.perf_counter() - start)
+
+    written_before = _written_bytes()
+    start = time.perf_counter()
+    await asyncio.gather(*(feed(update) for update in workload))
+    await main.send_queue.drain()  # Handlerlar kutmagan yuborish/o'chirishlar
+    main.flush_stats()
+    elapsed = time.perf_counter() - start
+    written_after = _written_bytes()
+
+    for task in queue._tasks:
+        task.cancel()
+    await asyncio.gather(*queue._tasks, return_exceptions=True)
+
+    latencies.sort()
+    calls = bot.session.calls
+    return {
+        'backend': backend,
+        'updates': updates,
+        'joins': joins,
+        'updates_per_sec': round(updates / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1e3, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1e3, 3),
+        'bytes_per_update': round((written_after - written_before) / updates, 1) if written_before is not None else None,
+        'api_calls_per_update': round(sum(calls.values()) / updates, 3),
+        'api_calls': dict(calls.most_common()),
+        'retry_after': bot.session.errors['TelegramRetryAfter'],
+    }
+
+
+async def run_all(updates, chats, users, latency, retry_every):
+    results = []
+    for backend in BACKENDS:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results.append(await run_backend(backend, tmp_dir, updates, chats, users, latency, retry_every))
+            if backend == 'sqlite':
+                sqlite_storage._conn.close()
+                sqlite_storage._conn = None
+            else:
+                storage._journal.close()
+                storage._journal = None
+
+    pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    return results
+
+
+def bench():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    chats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    users = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    latency = float(sys.argv[4]) / 1e3 if len(sys.argv) > 4 else 0.0
+    retry_every = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+    output = sys.argv[6] if len(sys.argv) > 6 else None
+
+    print(f"{updates} update | {chats} guruh x {users} foydalanuvchi | API {latency * 1e3:.0f} ms | "
+          f"retry_every={retry_every} | parallel {CONCURRENCY}")
+    results = asyncio.run(run_all(updates, chats, users, latency, retry_every))
+
+    print(f"{'backend':<8} {'update/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'bayt/upd':>9} {'API/upd':>8} {'RetryAfter':>10}")
+    for result in results:
+        written = result['bytes_per_update']
+        print(f"{result['backend']:<8} {result['updates_per_sec']:>10.1f} {result['p50_ms']:>9.3f} {result['p99_ms']:>9.3f} "
+              f"{written if written is not None else '-':>9} {result['api_calls_per_update']:>8.3f} {result['retry_after']:>10}")
+    for result in results:
+        print(f"    {result['backend']}: {result['api_calls']}")
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({'args': sys.argv[1:], 'results': results}, f, indent=2)
+        print(f"Natijalar {output} ga yozildi.")
+
+
+if __name__ == "__main__":
+    bench()
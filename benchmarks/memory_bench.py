@@ -0,0 +1,81 @@
+"""Statistikaning xotiradagi hajmi: eski ichma-ich lug'atlar va stats_table ustunlari.
+
+(guruh, foydalanuvchi) juftliklari soni bo'yicha ikkala ko'rinish snapshot JSON'idan yuklanadi va
+tracemalloc bilan ushlab qolingan xotira (va yuklash paytidagi cho'qqi) o'lchanadi.
+
+Ishga tushirish: python -m benchmarks.memory_bench [juftliklar] [guruhlar]
+"""
+import sys
+import json
+import time
+import random
+import tracemalloc
+from datetime import date, timedelta
+
+from limits import cycle_epoch
+from stats_table import StatsTable
+
+RESET_INTERVAL_DAYS = 30
+
+
+def legacy_snapshot(pairs, chats, rng):
+    """Eski stats.json: {user_id: {chat_id: {..., 'last_reset_date': 'YYYY-MM-DD'}}}."""
+    users_per_chat = pairs // chats
+    data = {}
+    for chat in range(chats):
+        chat_id_str = str(-1001000000000 - chat)
+        for user in rng.sample(range(1, 50 * users_per_chat), users_per_chat):
+            data.setdefault(str(user), {})[chat_id_str] = {
+                'current_ad_cycle_count': rng.randrange(5),
+                'invited_members_count': rng.randrange(30),
+                'last_reset_date': (date.today() - timedelta(days=rng.randrange(60))).isoformat()
+            }
+    return json.dumps(data)
+
+
+def measure(load):
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = load()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, current, peak, elapsed
+
+
+def main():
+    pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    chats = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    rng = random.Random(1)
+
+    legacy_text = legacy_snapshot(pairs, chats, rng)
+    legacy, legacy_bytes, legacy_peak, legacy_time = measure(lambda: json.loads(legacy_text))
+    count = sum(len(chats) for chats in legacy.values())
+
+    table = StatsTable.from_json(legacy, lambda chat_id: RESET_INTERVAL_DAYS)
+    columnar_text = json.dumps(table.to_json(), separators=(',', ':'))
+    del legacy, table
+
+    table, table_bytes, table_peak, table_time = measure(
+        lambda: StatsTable.from_json(json.loads(columnar_text), lambda chat_id: RESET_INTERVAL_DAYS)
+    )
+    assert len(table) == count
+
+    epoch = cycle_epoch(RESET_INTERVAL_DAYS)
+    lookups = [(chat_id, chat.ids[rng.randrange(len(chat.ids))]) for chat_id, chat in table.chats.items() for _ in range(200)]
+    start = time.perf_counter()
+    for chat_id, user_id in lookups:
+        stats = table.get(chat_id, user_id)
+        stats is not None and stats[2] == epoch
+    lookup_us = (time.perf_counter() - start) / len(lookups) * 1e6
+
+    print(f"{count} juftlik, {chats} guruh")
+    print(f"    eski lug'atlar:  {legacy_bytes / count:7.1f} bayt/juftlik | {legacy_bytes / 2**20:8.1f} MiB | "
+          f"cho'qqi {legacy_peak / 2**20:8.1f} MiB | yuklash {legacy_time:.2f} s")
+    print(f"    ustunli jadval:  {table_bytes / count:7.1f} bayt/juftlik | {table_bytes / 2**20:8.1f} MiB | "
+          f"cho'qqi {table_peak / 2**20:8.1f} MiB | yuklash {table_time:.2f} s")
+    print(f"    tejash: {legacy_bytes / table_bytes:.1f}x | qidiruv: {lookup_us:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""migrate.py o'tkazuvchanligi: eski stats.json -> SQLite -> stats.d/ -> Supabase (PostgREST stub).
+
+Har bir yo'nalish uchun qatorlar/s chiqariladi va natija manbadagi qatorlar soni bilan solishtiriladi.
+Supabase uchun paketli upsert bitta qatorli so'rovlar bilan (database.py dagi kabi) taqqoslanadi -
+ikkinchisi namunadan hisoblanadi. Oxirida eski stats.json ni json.load bilan va migrate.JsonMembers
+bilan o'qishdagi xotira cho'qqisi (tracemalloc) solishtiriladi.
+
+Ishga tushirish: python -m benchmarks.migrate_bench [juftliklar] [supabase_juftliklar] [api_kechikish_ms]
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+
+import migrate
+import sqlite_storage
+from stats_shards import ShardedStats
+from rest_client import PostgrestClient
+from benchmarks.postgrest_stub import start_stub
+
+CHATS = 100
+SINGLE_ROW_SAMPLE = 500
+
+
+def write_legacy(directory, pairs, rng):
+    """config.json va eski {user_id: {chat_id: stats}} ko'rinishidagi stats.json."""
+    chat_ids = [str(-1001000000000 - chat) for chat in range(CHATS)]
+    with open(os.path.join(directory, 'config.json'), 'w', encoding='utf-8') as f:
+        json.dump({chat_id: {'free_ad_count': 1, 'reset_interval_days': rng.choice([7, 30]),
+                             'invite_levels': {'1': 2, 'max': 10}} for chat_id in chat_ids}, f)
+    data = {}
+    users_per_chat = pairs // CHATS
+    for chat_id in chat_ids:
+        for user in rng.sample(range(1, 50 * users_per_chat), users_per_chat):
+            data.setdefault(str(user), {})[chat_id] = {
+                'current_ad_cycle_count': rng.randrange(5),
+                'invited_members_count': rng.randrange(30),
+                'last_reset_date': (date.today() - timedelta(days=rng.randrange(60))).isoformat()
+            }
+    with open(os.path.join(directory, 'stats.json'), 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    return sum(len(chats) for chats in data.values())
+
+
+async def route(name, source, target, expected, count_rows):
+    print(f"--- {name}")
+    migrate.PROGRESS_INTERVAL = float('inf')  # Oraliq hisobotlarsiz
+    start = time.perf_counter()
+    counts = await migrate.run(source, target)
+    elapsed = time.perf_counter() - start
+    stored = count_rows()
+    status = "mos" if stored == expected else f"MOS EMAS (kutilgan {expected})"
+    print(f"    {counts['user_stats']} qator | {elapsed:.2f} s | {counts['user_stats'] / elapsed:.0f} qator/s | "
+          f"maqsadda {stored} - {status}")
+    return elapsed
+
+
+def sqlite_count(path):
+    def count():
+        sqlite_storage._conn = None
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM user_stats").fetchone()[0]
+    return count
+
+
+async def single_row_rate(url, rows):
+    """Har bir qator alohida upsert so'rovi bilan: qatorlar/s."""
+    client = PostgrestClient(url, 'bench')
+    start = time.perf_counter()
+    for row in rows:
+        await (client.table('user_stats')
+               .upsert(dict(zip(migrate.STATS_COLUMNS, row)), on_conflict='chat_id,user_id', returning='minimal')
+               .execute())
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return len(rows) / elapsed
+
+
+def peak_memory(read):
+    tracemalloc.start()
+    read()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+async def run(pairs, supabase_pairs, latency, tmp_dir):
+    rng = random.Random(1)
+    legacy_dir = os.path.join(tmp_dir, 'eski')
+    os.makedirs(legacy_dir)
+    expected = write_legacy(legacy_dir, pairs, rng)
+    size = os.path.getsize(os.path.join(legacy_dir, 'stats.json'))
+    print(f"{expected} juftlik, {CHATS} guruh | eski stats.json {size / 2**20:.1f} MiB | paket {migrate.MIGRATE_BATCH}")
+
+    sqlite_path = os.path.join(tmp_dir, 'bot.sqlite3')
+    shards_dir = os.path.join(tmp_dir, 'guruhlar')
+    await route("json (eski stats.json) -> sqlite", 'json:' + legacy_dir, 'sqlite:' + sqlite_path,
+                expected, sqlite_count(sqlite_path))
+    await route("sqlite -> json (stats.d)", 'sqlite:' + sqlite_path, 'json:' + shards_dir,
+                expected, lambda: len(ShardedStats(os.path.join(shards_dir, 'stats.d'))))
+    sqlite_copy = os.path.join(tmp_dir, 'copy.sqlite3')
+    await route("json (stats.d) -> sqlite", 'json:' + shards_dir, 'sqlite:' + sqlite_copy,
+                expected, sqlite_count(sqlite_copy))
+
+    # Supabase: kichikroq to'plam (stub xotirada va bitta jarayonda ishlaydi)
+    small_dir = os.path.join(tmp_dir, 'kichik')
+    os.makedirs(small_dir)
+    small_expected = write_legacy(small_dir, supabase_pairs, rng)
+    stub, runner, url = await start_stub(latency=latency)
+    os.environ['SUPABASE_KEY'] = 'bench'
+    try:
+        print(f"Supabase stub: {small_expected} juftlik, API kechikishi {latency * 1e3:.0f} ms")
+        batched = await route("json -> supabase (paketli upsert)", 'json:' + small_dir, 'supabase:' + url,
+                              small_expected, lambda: len(stub.tables['user_stats']))
+        sample = [row for _, row in zip(range(SINGLE_ROW_SAMPLE), migrate.stats_json_rows(
+            os.path.join(small_dir, 'stats.json'), lambda chat_id: 30))]
+        rate = await single_row_rate(url, sample)
+        print(f"    bitta qatorli so'rovlar: {rate:.0f} qator/s -> {small_expected / rate:.1f} s "
+              f"(paketli: {batched:.1f} s, {small_expected / rate / batched:.0f}x)")
+        supabase_sqlite = os.path.join(tmp_dir, 'supabase.sqlite3')
+        await route("supabase -> sqlite", 'supabase:' + url, 'sqlite:' + supabase_sqlite,
+                    small_expected, sqlite_count(supabase_sqlite))
+    finally:
+        await runner.cleanup()
+
+    legacy_path = os.path.join(legacy_dir, 'stats.json')
+
+    def load_whole():
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            json.load(f)
+
+    def stream():
+        for _ in migrate.iter_json_members(legacy_path, lambda keys: len(keys) == 1):
+            pass
+
+    print("--- eski stats.json ni o'qish: xotira cho'qqisi (tracemalloc)")
+    for name, read in (("json.load", load_whole), ("JsonMembers", stream)):
+        print(f"    {name:<12} {peak_memory(read) / 2**20:8.1f} MiB")
+
+
+def main():
+    pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    supabase_pairs = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    latency = float(sys.argv[3]) / 1e3 if len(sys.argv) > 3 else 5.0 / 1e3
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        asyncio.run(run(pairs, supabase_pairs, latency, tmp_dir))
+
+
+if __name__ == "__main__":
+    main()
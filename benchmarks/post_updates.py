@@ -0,0 +1,126 @@
+"""Webhook endpoint'ini lokal sinash: yozib olingan update JSON'larini POST qiladi.
+
+Ishga tushirish: python -m benchmarks.post_updates [updates.jsonl|-] [url] [parallellik]
+
+- fayl har qatorda bitta update JSON yoki recorder.py yozib olgan fayl bo'lishi mumkin;
+- fayl '-' yoki berilmasa, soxta guruh xabarlari generatsiya qilinadi;
+- url berilmasa, main.py ning webhook ilovasi shu jarayonda soxta Bot bilan ishga tushiriladi
+  (Telegram'ga so'rov ketmaydi), aks holda ishlab turgan botga yuboriladi (BOT_MODE=webhook).
+So'rovlarga X-Telegram-Bot-Api-Secret-Token sarlavhasi (WEBHOOK_SECRET) qo'shiladi: ishlab turgan botga
+yuborishda u botnikidek bo'lishi kerak, lokal ilova uchun o'rnatilmagan bo'lsa tasodifiy yaratiladi.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import secrets
+import tempfile
+
+from aiohttp import ClientSession, web
+from aiogram import Dispatcher
+
+import main
+import storage
+from deletion_scheduler import deletion_scheduler
+from recorder import read_records
+from benchmarks.fakes import make_bot, make_group_message
+
+CHAT_ID = -1001000000000
+USERS = 200
+GENERATED_UPDATES = 1000
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def load_updates(path, bot):
+    if path and path != '-':
+        return [json.dumps(update, separators=(',', ':')) for _, update in read_records(path)]
+    return [
+        make_group_message(bot, CHAT_ID, random.randrange(1, USERS + 1)).model_dump_json(exclude_none=True)
+        for _ in range(GENERATED_UPDATES)
+    ]
+
+
+async def start_local_webhook():
+    """main.py webhook ilovasini soxta Bot bilan tasodifiy portda ishga tushiradi."""
+    main.BOT_MODE = "webhook"
+    main.WEBHOOK_SECRET = main.WEBHOOK_SECRET or secrets.token_urlsafe(16)
+    main.bot = make_bot()
+    main.bot_info = await main.bot.get_me()
+    main.dp = Dispatcher()
+    main.setup_handlers(main.dp)
+    main.bot.session.reset()
+
+    runner = web.AppRunner(main.make_web_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host='127.0.0.1', port=0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}{main.WEBHOOK_PATH}"
+
+
+async def run(path, url, concurrency):
+    runner = None
+    if url is None:
+        runner, url = await start_local_webhook()
+    updates = load_updates(path, main.bot or make_bot())
+
+    headers = {'Content-Type': 'application/json'}
+    if main.WEBHOOK_SECRET:
+        headers['X-Telegram-Bot-Api-Secret-Token'] = main.WEBHOOK_SECRET
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+
+    async with ClientSession(headers=headers) as session:
+        async def post(body):
+            async with semaphore:
+                start = time.perf_counter()
+                async with session.post(url, data=body) as response:
+                    statuses[response.status] = statuses.get(response.status, 0) + 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(post(body) for body in updates))
+        accepted = time.perf_counter() - start
+
+    if runner is not None:
+        await asyncio.gather(*list(main.webhook_tasks))
+    processed = time.perf_counter() - start
+
+    print(f"{len(updates)} update -> {url} | parallellik {concurrency} | statuslar {statuses}")
+    print(f"    qabul: {len(updates) / accepted:.1f} update/s | p50 {_percentile(latencies, 0.5) * 1e3:.2f} ms | "
+          f"p99 {_percentile(latencies, 0.99) * 1e3:.2f} ms")
+    if runner is not None:
+        calls = main.bot.session.calls
+        print(f"    qayta ishlandi: {len(updates) / processed:.1f} update/s | API chaqiruvlari: {dict(calls)}")
+        await runner.cleanup()
+
+    for task in asyncio.all_tasks():
+        if task is not asyncio.current_task():
+            task.cancel()
+
+
+def bench():
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    url = sys.argv[2] if len(sys.argv) > 2 else None
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage.CONFIG_FILE = os.path.join(tmp_dir, 'config.json')
+        storage.STATS_FILE = os.path.join(tmp_dir, 'stats.json')
+        storage.STATS_JOURNAL_FILE = os.path.join(tmp_dir, 'stats.journal')
+        storage.CHANNELS_FILE = os.path.join(tmp_dir, 'channels.json')
+        deletion_scheduler.path = os.path.join(tmp_dir, 'deletions.jsonl')
+        asyncio.run(run(path, url, concurrency))
+        storage.flush_stats()
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,310 @@
+"""database.py ni tarmoqsiz sinash va benchmark qilish uchun PostgREST'ga mos lokal server.
+
+Jadvallar xotirada saqlanadi. Qo'llab-quvvatlanadi: select + eq/gt filtrlari va ularning or=(...)/and(...) guruhlari,
+order (bir nechta ustun), limit, insert,
+upsert (Prefer: resolution=merge-duplicates + on_conflict, return=minimal), update, delete, single()
+va /rpc/<funksiya>.
+supabase_migrations.sql dagi RPC funksiyalarining Python'dagi o'rinbosarlari ham shu yerda.
+
+Ishga tushirish: python -m benchmarks.postgrest_stub [port] [kechikish_ms]
+So'ng .env da SUPABASE_URL=http://127.0.0.1:<port> qilib botni shu serverga ulash mumkin.
+"""
+import sys
+import json
+import asyncio
+import itertools
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+from limits import LimitPolicy, evaluate_quota, stats_epoch
+
+# jadval -> (avtomatik raqamlanadigan ustun, noyob kalitlar ro'yxati)
+TABLES = {
+    'admins': ('admin_id', [('admin_id',), ('username',)]),
+    'chat_config': (None, [('chat_id',)]),
+    'user_stats': (None, [('chat_id', 'user_id')]),
+    'required_channels': ('channel_id', [('channel_id',)]),
+}
+
+
+def _as_filter_text(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if value is None:
+        return 'null'
+    return str(value)
+
+
+def _split_terms(text):
+    """'a.eq.1,and(b.gt.2,c.eq.3)' -> ['a.eq.1', 'and(b.gt.2,c.eq.3)'] (qavs ichidagi vergullar bo'linmaydi)."""
+    terms, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            terms.append(text[start:i])
+            start = i + 1
+    terms.append(text[start:])
+    return terms
+
+
+def _condition(column, value):
+    """(ustun, operator, qiymat) yoki ('and'|'or', [shartlar])."""
+    if column in ('and', 'or'):
+        if not (value.startswith('(') and value.endswith(')')):
+            raise web.HTTPBadRequest(text=json.dumps({'message': f"{column} qavsda bo'lishi kerak"}))
+        conditions = []
+        for term in _split_terms(value[1:-1]):
+            group, _, rest = term.partition('(')
+            if group in ('and', 'or') and rest:
+                conditions.append(_condition(group, '(' + rest))
+            else:
+                name, _, term_value = term.partition('.')
+                conditions.append(_condition(name, term_value))
+        return column, conditions
+    operator, _, operand = value.partition('.')
+    if operator not in ('eq', 'gt'):
+        raise web.HTTPBadRequest(text=json.dumps({'message': f"operator {operator} qo'llab-quvvatlanmaydi"}))
+    return column, operator, operand
+
+
+def _holds(row, condition):
+    if len(condition) == 2:
+        group, conditions = condition
+        return (all if group == 'and' else any)(_holds(row, other) for other in conditions)
+    column, operator, operand = condition
+    value = row.get(column)
+    if operator == 'eq':
+        return _as_filter_text(value) == operand
+    return value is not None and value > type(value)(operand)
+
+
+class PostgrestStub:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.tables = {name: [] for name in TABLES}
+        self.functions = {}
+        self.requests = 0
+        self._serials = {name: itertools.count(1) for name in TABLES}
+        self._indexes = {name: {} for name in TABLES}  # jadval -> {kalit ustunlari: {qiymatlar: qator}}
+        for name, function in RPC_FUNCTIONS.items():
+            self.register_rpc(name, function)
+
+    def register_rpc(self, name, function):
+        """function(stub, params) -> JSON natija."""
+        self.functions[name] = function
+
+    # --- Yordamchi ---
+
+    def _filters(self, request):
+        return [_condition(column, value) for column, value in request.query.items()
+                if column not in ('select', 'on_conflict', 'order', 'limit')]
+
+    @staticmethod
+    def _matches(row, filters):
+        return all(_holds(row, condition) for condition in filters)
+
+    @staticmethod
+    def _order(rows, request):
+        order = request.query.get('order')
+        if order:
+            # Barqaror saralash: oxirgi ustundan birinchisiga qarab
+            for ordering in reversed(order.split(',')):
+                column, _, direction = ordering.partition('.')
+                rows.sort(key=lambda row: row.get(column), reverse=direction == 'desc')
+        limit = request.query.get('limit')
+        return rows[:int(limit)] if limit else rows
+
+    @staticmethod
+    def _project(rows, select):
+        if not select or select == '*':
+            return [dict(row) for row in rows]
+        columns = select.split(',')
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+    def _index(self, table, key):
+        index = self._indexes[table].get(key)
+        if index is None:
+            index = self._indexes[table][key] = {
+                tuple(existing.get(column) for column in key): existing for existing in self.tables[table]
+            }
+        return index
+
+    def find_conflict(self, table, row, keys):
+        for key in keys:
+            if all(column in row for column in key):
+                existing = self._index(table, key).get(tuple(row[column] for column in key))
+                if existing is not None:
+                    return existing
+        return None
+
+    def insert_row(self, table, row, merge_keys=None):
+        serial_column, unique_keys = TABLES[table]
+        if merge_keys:
+            existing = self.find_conflict(table, row, [merge_keys])
+            if existing is not None:
+                indexes = self._indexes[table]
+                old_keys = {key: tuple(existing.get(column) for column in key) for key in indexes}
+                existing.update(row)
+                for key, index in indexes.items():
+                    index.pop(old_keys[key], None)
+                    index[tuple(existing.get(column) for column in key)] = existing
+                return existing
+        if self.find_conflict(table, row, unique_keys) is not None:
+            raise web.HTTPConflict(text=json.dumps({'code': '23505', 'message': 'duplicate key value'}))
+        row = dict(row)
+        if serial_column and serial_column not in row:
+            row[serial_column] = next(self._serials[table])
+        self.tables[table].append(row)
+        for key, index in self._indexes[table].items():
+            index[tuple(row.get(column) for column in key)] = row
+        return row
+
+    def _respond(self, request, rows, status=200):
+        if 'return=minimal' in request.headers.get('Prefer', ''):
+            return web.Response(status=201 if status == 201 else 204)
+        if 'vnd.pgrst.object' in request.headers.get('Accept', ''):
+            if len(rows) != 1:
+                return web.json_response({'message': 'JSON object requested, multiple (or no) rows returned'}, status=406)
+            return web.json_response(rows[0], status=status)
+        return web.json_response(rows, status=status)
+
+    # --- HTTP handlerlar ---
+
+    async def handle_table(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        table = request.match_info['table']
+        if table not in self.tables:
+            return web.json_response({'message': f"relation {table} does not exist"}, status=404)
+
+        filters = self._filters(request)
+        rows = self.tables[table]
+
+        if request.method == 'GET':
+            found = self._order([row for row in rows if self._matches(row, filters)], request)
+            return self._respond(request, self._project(found, request.query.get('select')))
+
+        if request.method == 'POST':
+            body = await request.json()
+            merge_keys = None
+            if 'merge-duplicates' in request.headers.get('Prefer', ''):
+                on_conflict = request.query.get('on_conflict')
+                merge_keys = tuple(on_conflict.split(',')) if on_conflict else TABLES[table][1][0]
+            items = body if isinstance(body, list) else [body]
+            return self._respond(request, [dict(self.insert_row(table, item, merge_keys)) for item in items], 201)
+
+        if request.method == 'PATCH':
+            values = await request.json()
+            changed = [row for row in rows if self._matches(row, filters)]
+            for row in changed:
+                row.update(values)
+            self._indexes[table] = {}
+            return self._respond(request, [dict(row) for row in changed])
+
+        if request.method == 'DELETE':
+            removed = [row for row in rows if self._matches(row, filters)]
+            self.tables[table] = [row for row in rows if not self._matches(row, filters)]
+            self._indexes[table] = {}
+            return self._respond(request, removed)
+
+        return web.json_response({'message': 'method not allowed'}, status=405)
+
+    async def handle_rpc(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        function = self.functions.get(request.match_info['function'])
+        if function is None:
+            return web.json_response({'message': 'function not found'}, status=404)
+        params = await request.json() if request.can_read_body else {}
+        return web.json_response(function(self, params))
+
+    def make_app(self):
+        app = web.Application()
+        app.add_routes([
+            web.post('/rest/v1/rpc/{function}', self.handle_rpc),
+            web.route('*', '/rest/v1/{table}', self.handle_table),
+        ])
+        return app
+
+
+# --- RPC funksiyalari (supabase_migrations.sql bilan bir xil mantiq) ---
+# Handler bitta event loop qadamida, await'siz bajariladi - bu serverdagi qator qulfiga teng.
+
+def _locked_user_stats(stub, params):
+    """Qatorni topadi yoki yaratadi; (qator, joriy_tsikl, joriy_takliflar) qaytaradi."""
+    key = {'chat_id': params['p_chat_id'], 'user_id': params['p_user_id']}
+    row = stub.find_conflict('user_stats', key, [('chat_id', 'user_id')])
+    if row is None:
+        row = stub.insert_row('user_stats', dict(key, current_ad_cycle_count=0, invited_members_count=0,
+                                                 cycle_epoch=params['p_epoch'], last_ad_timestamp=None))
+    if stats_epoch(row, params['p_reset_interval_days'], date_key='last_ad_timestamp') != params['p_epoch']:
+        return row, 0, 0
+    return row, row['current_ad_cycle_count'], row['invited_members_count']
+
+
+def rpc_apply_user_stats_delta(stub, params):
+    row, cycle, invited = _locked_user_stats(stub, params)
+    row['current_ad_cycle_count'] = cycle + params.get('p_ad_delta', 0)
+    row['invited_members_count'] = (0 if params.get('p_reset_invited') else invited) + params.get('p_invited_delta', 0)
+    row['cycle_epoch'] = params['p_epoch']
+    if params.get('p_ad_delta', 0) > 0:
+        row['last_ad_timestamp'] = datetime.now(timezone.utc).isoformat()
+    return None
+
+
+def rpc_apply_user_stats_deltas(stub, params):
+    for delta in params['p_deltas']:
+        rpc_apply_user_stats_delta(stub, {f"p_{name}": value for name, value in delta.items()})
+    return None
+
+
+def rpc_consume_ad_quota(stub, params):
+    row, cycle, invited = _locked_user_stats(stub, params)
+    policy = LimitPolicy(params['p_free_ad_count'], params['p_reset_interval_days'],
+                         params['p_thresholds'], params['p_max_required'])
+    result, new_cycle, new_invited = evaluate_quota(
+        policy, cycle, invited, params.get('p_invited_delta', 0), params.get('p_consume_free', True)
+    )
+    row['current_ad_cycle_count'] = new_cycle
+    row['invited_members_count'] = new_invited
+    row['cycle_epoch'] = params['p_epoch']
+    if result.allowed:
+        row['last_ad_timestamp'] = datetime.now(timezone.utc).isoformat()
+    return result._asdict()
+
+
+RPC_FUNCTIONS = {
+    'apply_user_stats_delta': rpc_apply_user_stats_delta,
+    'apply_user_stats_deltas': rpc_apply_user_stats_deltas,
+    'consume_ad_quota': rpc_consume_ad_quota,
+}
+
+
+async def start_stub(port=0, latency=0.0):
+    """Serverni fon rejimida ishga tushiradi. (stub, runner, url) qaytaradi."""
+    stub = PostgrestStub(latency)
+    runner = web.AppRunner(stub.make_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host='127.0.0.1', port=port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return stub, runner, f"http://127.0.0.1:{bound_port}"
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 54321
+    latency = float(sys.argv[2]) / 1e3 if len(sys.argv) > 2 else 0.0
+    print(f"PostgREST stub: http://127.0.0.1:{port} (kechikish {latency * 1e3:.0f} ms)")
+    web.run_app(PostgrestStub(latency).make_app(), host='127.0.0.1', port=port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""recorder.py yozib olgan update'larni setup_handlers(dp) orqali soxta Bot bilan qayta o'ynatadi.
+
+Production trafigini (masalan, spam to'lqinini) oflayn takrorlash va kod o'zgarishlarining
+o'tkazuvchanlikka ta'sirini o'lchash uchun. Statistika vaqtinchalik papkada yoziladi;
+backend STORAGE_BACKEND bo'yicha tanlanadi (json yoki sqlite).
+
+tezlik: 0 - iloji boricha tez (standart), 1 - asl vaqt oraliqlari bilan, 2 - ikki barobar tez va h.k.
+Aylantirilgan fayllarni (updates.jsonl.2 updates.jsonl.1 updates.jsonl) eng eskisidan boshlab
+vergul bilan berish mumkin.
+
+Ishga tushirish: python -m benchmarks.replay <updates.jsonl[,...]> [tezlik] [api_kechikish_ms] [parallellik]
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+from aiogram import Dispatcher
+from aiogram.types import Update
+
+import main
+from admin_cache import AdminRoster
+from deletion_scheduler import DeletionScheduler
+from limit_warnings import WarningRegistry
+from recorder import read_records
+from update_locks import UpdateSerializer
+from benchmarks.fakes import make_bot
+from benchmarks.handlers_suite import percentile, use_backend
+
+
+def load(paths, bot):
+    """[(t, Update)] ro'yxati; vaqt belgisi yo'q qatorlar uchun t=None."""
+    records = []
+    for path in paths:
+        for timestamp, data in read_records(path):
+            records.append((timestamp, Update.model_validate(data, context={'bot': bot})))
+    return records
+
+
+async def run(paths, speed, latency, concurrency, tmp_dir):
+    use_backend(main.STORAGE_BACKEND, tmp_dir)
+    main.admin_roster = AdminRoster()
+    main.limit_warnings = WarningRegistry()
+    main.update_serializer = UpdateSerializer()
+    main.deletion_scheduler = DeletionScheduler(os.path.join(tmp_dir, 'deletions.jsonl'))
+
+    bot = make_bot(latency=latency)
+    main.bot = bot
+    main.bot_info = await bot.get_me()
+    main.dp = Dispatcher()
+    main.setup_handlers(main.dp)
+
+    records = load(paths, bot)
+    if not records:
+        print("Faylda update topilmadi.")
+        return
+    bot.session.reset()
+
+    latencies = []
+    lag = []  # asl vaqtdan qancha kechikib berildi (tezlik > 0 da)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def feed(update):
+        try:
+            start = time.perf_counter()
+            await main.dp.feed_update(bot, update)
+            latencies.append(time.perf_counter() - start)
+        finally:
+            slots.release()
+
+    tasks = []
+    first_timestamp = next((t for t, _ in records if t is not None), None)
+    start = time.perf_counter()
+    for timestamp, update in records:
+        if speed > 0 and timestamp is not None and first_timestamp is not None:
+            due = (timestamp - first_timestamp) / speed
+            delay = due - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                lag.append(-delay)
+        await slots.acquire()
+        tasks.append(asyncio.create_task(feed(update)))
+    await asyncio.gather(*tasks)
+    await main.send_queue.drain()  # Handlerlar kutmagan yuborish/o'chirishlar
+    main.flush_stats()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    calls = bot.session.calls
+    count = len(records)
+    mode = "iloji boricha tez" if speed <= 0 else f"asl vaqt x{speed:g}"
+    print(f"{count} update | {mode} | {elapsed:.2f} s | {count / elapsed:.1f} update/s | "
+          f"p50 {percentile(latencies, 0.5) * 1e3:.2f} ms | p99 {percentile(latencies, 0.99) * 1e3:.2f} ms")
+    if lag:
+        print(f"    asl vaqtdan orqada qolgan update'lar: {len(lag)} (eng ko'pi {max(lag) * 1e3:.1f} ms)")
+    print(f"    API chaqiruvlari/update: {sum(calls.values()) / count:.2f} | {dict(calls.most_common())}")
+
+    pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+def bench():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    paths = sys.argv[1].split(',')
+    speed = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    latency = float(sys.argv[3]) / 1e3 if len(sys.argv) > 3 else 0.0
+    concurrency = int(sys.argv[4]) if len(sys.argv) > 4 else 100
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        asyncio.run(run(paths, speed, latency, concurrency, tmp_dir))
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,61 @@
+"""send_queue uchun benchmark: ustuvorliklar, token bucket'lar va umumiy RetryAfter pauzasi (soxta Bot bilan).
+
+Bir nechta guruhga bir vaqtda limit ogohlantirishlari (yuqori ustuvorlik), salomlashishlar (past)
+va o'chirishlar yuboriladi. Limitlar `tezlashtirish` marta oshiriladi, benchmark tez tugashi uchun.
+
+Ishga tushirish: python -m benchmarks.send_queue_bench [guruhlar] [tezlashtirish] [retry_every]
+"""
+import sys
+import time
+import asyncio
+
+from send_queue import (
+    SendQueue, send_priority, PRIORITY_HIGH, PRIORITY_LOW,
+    SEND_GLOBAL_PER_SECOND, SEND_GROUP_PER_MINUTE, SEND_PRIVATE_PER_SECOND
+)
+from benchmarks.fakes import make_bot
+
+PER_CHAT = 2  # har bir guruhga shuncha ogohlantirish, salomlashish va o'chirish
+
+
+async def run(chats, speedup, retry_every):
+    queue = SendQueue(
+        global_per_second=SEND_GLOBAL_PER_SECOND * speedup,
+        group_per_minute=SEND_GROUP_PER_MINUTE * speedup,
+        private_per_second=SEND_PRIVATE_PER_SECOND * speedup
+    )
+    bot = make_bot(latency=0.02, retry_every=retry_every, retry_after=1)
+    bot.session.middleware(queue)
+
+    async def send(chat_id, text, priority):
+        with send_priority(priority):
+            await bot.send_message(chat_id, text)
+
+    jobs = []
+    for i in range(PER_CHAT):
+        for chat in range(chats):
+            chat_id = -1001000000000 - chat
+            jobs.append(send(chat_id, "Salom", PRIORITY_LOW))
+            jobs.append(send(chat_id, "Limit", PRIORITY_HIGH))
+            jobs.append(bot.delete_message(chat_id, i + 1))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    errors = sum(isinstance(result, Exception) for result in results)
+    print(f"{len(jobs)} chaqiruv, {chats} guruh, limitlar x{speedup:g} | {elapsed:.2f} s | "
+          f"{len(jobs) / elapsed:.1f} chaqiruv/s | xatolar {errors}")
+    print(f"    API: {dict(bot.session.calls)} | RetryAfter: {bot.session.errors['TelegramRetryAfter']}")
+    print(f"    navbat: {queue.stats()}")
+
+
+def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    speedup = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    retry_every = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    asyncio.run(run(chats, speedup, retry_every))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Ko'p jarayonli (sharded) rejim uchun lokal benchmark, soxta Bot bilan.
+
+Old jarayon (ShardRouter) tasodifiy portda ishga tushadi, sintetik guruh xabarlari unga POST
+qilinadi va 1, 2, 4, ... ta shard bilan barcha update'lar qayta ishlangunicha ketgan vaqt o'lchanadi.
+Telegram limitlari (send_queue) benchmark uchun o'chiriladi - faqat CPU va IPC o'lchanadi.
+
+Ishga tushirish: python -m benchmarks.sharding_bench [update_soni] [maks_shardlar] [guruhlar]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import secrets
+import tempfile
+
+from aiohttp import ClientSession, UnixConnector, web
+
+import sharding
+
+USERS_PER_CHAT = 10
+CONCURRENCY = 64
+
+
+def bench_shard(index, count, tmp_dir):
+    """Shard jarayoni: fayllar vaqtinchalik papkada, Bot soxta."""
+    os.environ["SEND_GLOBAL_PER_SECOND"] = "1000000"
+    os.environ["SEND_GROUP_PER_MINUTE"] = "1000000"
+
+    import storage
+    from deletion_scheduler import deletion_scheduler
+    from benchmarks.fakes import make_bot
+
+    storage.CONFIG_FILE = os.path.join(tmp_dir, 'config.json')
+    storage.STATS_FILE = os.path.join(tmp_dir, 'stats.json')
+    storage.STATS_JOURNAL_FILE = os.path.join(tmp_dir, 'stats.journal')
+    storage.CHANNELS_FILE = os.path.join(tmp_dir, 'channels.json')
+    deletion_scheduler.path = os.path.join(tmp_dir, 'deletions.jsonl')
+    try:
+        asyncio.run(sharding.serve_shard(index, count, make_bot()))
+    except KeyboardInterrupt:
+        pass
+
+
+def make_updates(total, chats):
+    from benchmarks.fakes import make_bot, make_group_message
+
+    bot = make_bot()
+    updates = []
+    for _ in range(total):
+        chat_id = -1001000000000 - random.randrange(chats)
+        user_id = random.randrange(1, USERS_PER_CHAT + 1) + chat_id % 1000 * 100
+        updates.append(make_group_message(bot, chat_id, user_id).model_dump_json(exclude_none=True))
+    return updates
+
+
+async def wait_idle(count):
+    """Barcha shardlarda qayta ishlanayotgan update qolmaguncha kutadi."""
+    for index in range(count):
+        connector = UnixConnector(path=sharding.shard_socket_path(index))
+        async with ClientSession(connector=connector) as session:
+            while True:
+                async with session.get(f"http://shard{index}/shard") as response:
+                    if (await response.json())['in_flight'] == 0:
+                        break
+                await asyncio.sleep(0.01)
+
+
+async def run_once(count, updates, tmp_dir):
+    processes = sharding.start_shards(count, target=bench_shard, args=(tmp_dir,))
+    await sharding.wait_for_shards(count)
+
+    router = sharding.ShardRouter(count)
+    runner = web.AppRunner(router.make_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host='127.0.0.1', port=0)
+    await site.start()
+    url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/webhook"
+
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    headers = {'Content-Type': 'application/json', 'X-Telegram-Bot-Api-Secret-Token': os.environ["WEBHOOK_SECRET"]}
+    async with ClientSession() as session:
+        async def post(body):
+            async with semaphore:
+                async with session.post(url, data=body, headers=headers) as response:
+                    await response.read()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(post(body) for body in updates))
+        await wait_idle(count)
+        elapsed = time.perf_counter() - start
+
+    print(f"    {count} shard: {len(updates) / elapsed:9.1f} update/s | taqsimot {router.stats()['routed']}")
+
+    await router.close()
+    await runner.cleanup()
+    for process in processes:
+        process.terminate()
+        process.join()
+
+
+async def run(total, max_shards, chats):
+    # Old jarayon ham, shardlar ham secret'ni muhitdan oladi (main.py import qilinishidan oldin)
+    os.environ.setdefault("WEBHOOK_SECRET", secrets.token_urlsafe(16))
+    updates = make_updates(total, chats)
+    print(f"{total} update, {chats} guruh, {os.cpu_count()} yadro")
+    count = 1
+    while count <= max_shards:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sharding.SHARD_SOCKET_DIR = tmp_dir
+            os.environ["SHARD_SOCKET_DIR"] = tmp_dir
+            await run_once(count, updates, tmp_dir)
+        count *= 2
+
+
+def bench():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    max_shards = int(sys.argv[2]) if len(sys.argv) > 2 else min(4, os.cpu_count() or 1)
+    chats = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+    asyncio.run(run(total, max_shards, chats))
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,125 @@
+"""Ishga tushishdan keyingi birinchi xabar kechikishi: eski stats.json, ustunli stats.json, stats.bin (mmap)
+va guruhlar bo'yicha bo'lingan stats.d/.
+
+Har bir hajm uchun bir xil statistika to'rttala formatda yoziladi, so'ng storage.py holati tozalanib
+birinchi consume_ad_quota gacha bo'lgan vaqt va keyingi xabarlarning o'rtacha narxi o'lchanadi.
+Bitta fayldagi formatlar uchun birinchi xabarga stats.d/ ga bir martalik bo'lish ham kiradi.
+Fayllar sahifa keshida bo'ladi - haqiqiy sovuq diskda JSON formatlari uchun farq yanada katta.
+
+Ishga tushirish: python -m benchmarks.startup_bench [10000 100000 1000000]
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+from array import array
+
+import storage
+from binary_snapshot import write_snapshot
+from stats_shards import split_table
+from limits import cycle_epoch
+from stats_table import ChatStats, StatsTable
+
+CHATS = 100
+MESSAGES = 2000
+RESET_INTERVAL_DAYS = 30
+
+
+def make_table(pairs, rng):
+    epoch = cycle_epoch(RESET_INTERVAL_DAYS)
+    table = StatsTable()
+    per_chat = pairs // CHATS
+    for chat in range(CHATS):
+        ids = sorted(rng.sample(range(1, 50 * per_chat), per_chat))
+        table.chats[-1001000000000 - chat] = ChatStats(
+            array('q', ids), array('i', (rng.randrange(5) for _ in ids)),
+            array('i', (rng.randrange(30) for _ in ids)), array('i', [epoch]) * per_chat
+        )
+    return table
+
+
+def legacy_json(table):
+    data = {}
+    for chat_id, chat in table.chats.items():
+        for user_id, cycle, invited, epoch in zip(*chat.columns()):
+            data.setdefault(str(user_id), {})[str(chat_id)] = {
+                'current_ad_cycle_count': cycle, 'invited_members_count': invited, 'cycle_epoch': epoch
+            }
+    return data
+
+
+def write_formats(tmp_dir, table):
+    paths = {}
+    for name in ('eski json', 'ustunli json', 'binar', 'guruh fayllari'):
+        directory = os.path.join(tmp_dir, name.replace(' ', '_'))
+        os.makedirs(directory)
+        paths[name] = os.path.join(directory, 'stats.json')
+    with open(paths['eski json'], 'w', encoding='utf-8') as f:
+        json.dump(legacy_json(table), f, separators=(',', ':'))
+    with open(paths['ustunli json'], 'w', encoding='utf-8') as f:
+        json.dump(table.to_json(), f, separators=(',', ':'))
+    write_snapshot(os.path.splitext(paths['binar'])[0] + '.bin', table)
+    split_table(os.path.splitext(paths['guruh fayllari'])[0] + '.d', table, 0)
+    return paths
+
+
+def snapshot_size(name, stats_file):
+    base = os.path.splitext(stats_file)[0]
+    if name == 'binar':
+        return os.path.getsize(base + '.bin')
+    if name == 'guruh fayllari':
+        return sum(os.path.getsize(os.path.join(base + '.d', f)) for f in os.listdir(base + '.d'))
+    return os.path.getsize(stats_file)
+
+
+def reset_storage(stats_file):
+    if storage._journal is not None:
+        storage._journal.close()
+    storage._stats, storage._journal, storage._seq, storage._unsynced = None, None, 0, 0
+    storage.STATS_FILE = stats_file
+    storage.STATS_JOURNAL_FILE = os.path.join(os.path.dirname(stats_file), 'stats.journal')
+
+
+def bench(pairs, rng):
+    table = make_table(pairs, rng)
+    messages = [(chat_id, chat.ids[rng.randrange(len(chat.ids))]) for chat_id, chat in table.chats.items()
+                for _ in range(MESSAGES // CHATS)]
+    rng.shuffle(messages)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage.CONFIG_FILE = os.path.join(tmp_dir, 'config.json')
+        paths = write_formats(tmp_dir, table)
+        del table
+
+        results = []
+        for name, stats_file in paths.items():
+            reset_storage(stats_file)
+            chat_id, user_id = messages[0]
+            start = time.perf_counter()
+            storage.consume_ad_quota(user_id, chat_id, storage.get_policy(chat_id))
+            first_ms = (time.perf_counter() - start) * 1e3
+
+            start = time.perf_counter()
+            for chat_id, user_id in messages[1:]:
+                storage.consume_ad_quota(user_id, chat_id, storage.get_policy(chat_id))
+            per_message_us = (time.perf_counter() - start) / (len(messages) - 1) * 1e6
+            size = snapshot_size(name, stats_file)
+            results.append((name, size, first_ms, per_message_us))
+        reset_storage(storage.STATS_FILE)
+
+    print(f"{pairs} juftlik ({CHATS} guruh)")
+    for name, size, first_ms, per_message_us in results:
+        print(f"    {name:<14} {size / 2**20:8.1f} MiB | birinchi xabar: {first_ms:9.1f} ms | keyingilari: {per_message_us:6.2f} us")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    rng = random.Random(1)
+    for size in sizes:
+        bench(size, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""storage.py statistikasi uchun xabar boshiga kechikish benchmarki.
+
+Ishga tushirish: python -m benchmarks.storage_bench [1000 10000 100000 1000000]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+from array import array
+
+import storage
+from limits import cycle_epoch
+from stats_shards import split_table
+from stats_table import ChatStats, StatsTable
+
+CHAT_ID = -1001000000000
+MESSAGES = 20000
+CONFIG = {'free_ad_count': 1, 'reset_interval_days': 30, 'invite_levels': {'1': 5, '2': 7, 'max': 10}}
+
+
+def _populate(user_count):
+    """Guruh snapshotini (stats.d/) user_count ta foydalanuvchi bilan yozadi va storage holatini tozalaydi."""
+    table = StatsTable()
+    table.chats[CHAT_ID] = ChatStats(
+        array('q', range(user_count)), array('i', bytes(4 * user_count)), array('i', bytes(4 * user_count)),
+        array('i', [cycle_epoch(CONFIG['reset_interval_days'])]) * user_count
+    )
+    shutil.rmtree(storage._shards_dir(), ignore_errors=True)
+    split_table(storage._shards_dir(), table, 0)
+    if storage._journal is not None:
+        storage._journal.close()
+    storage._stats, storage._journal, storage._seq, storage._unsynced = None, None, 0, 0
+    for file_path in (storage.STATS_JOURNAL_FILE, storage.STATS_JOURNAL_FILE + '.1'):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def bench(user_count):
+    _populate(user_count)
+
+    start = time.perf_counter()
+    storage._get_stats_data().chat(CHAT_ID)  # Indeks + guruh fayli
+    load_ms = (time.perf_counter() - start) * 1e3
+
+    user_ids = [random.randrange(user_count) for _ in range(MESSAGES)]
+
+    # handle_group_messages dagi ketma-ketlik: o'qish + yangilash
+    start = time.perf_counter()
+    for user_id in user_ids:
+        storage.get_user_stats(user_id, CHAT_ID, CONFIG)
+        storage.update_user_stats(user_id, CHAT_ID, ad_used=True)
+    per_message_us = (time.perf_counter() - start) / MESSAGES * 1e6
+
+    # Faqat journalga qo'shish narxi
+    start = time.perf_counter()
+    for user_id in user_ids:
+        storage.update_user_stats(user_id, CHAT_ID, invited_count_change=1)
+    append_us = (time.perf_counter() - start) / MESSAGES * 1e6
+
+    start = time.perf_counter()
+    storage.compact_stats()
+    compact_ms = (time.perf_counter() - start) * 1e3
+
+    print(f"{user_count:>9} foydalanuvchi | yuklash: {load_ms:8.1f} ms | xabar: {per_message_us:6.2f} us"
+          f" | append: {append_us:6.2f} us | kompaksiya: {compact_ms:8.1f} ms")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000, 1_000_000]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage.STATS_FILE = os.path.join(tmp_dir, 'stats.json')
+        storage.STATS_JOURNAL_FILE = os.path.join(tmp_dir, 'stats.journal')
+        for size in sizes:
+            bench(size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Sozlamalar va statistika uchun versiyali binar snapshot (mmap orqali o'qiladi).
+
+Fayl tuzilishi (little-endian, har bir bo'lim 8 baytga tekislangan):
+    sarlavha          HEADER: magic, versiya, journal seq, qatorlar/guruhlar/sozlamalar soni
+    guruhlar katalogi chat_id bo'yicha saralangan (chat_id q, birinchi_qator Q, qatorlar_soni Q)
+    id indeksi        har bir guruh ichida saralangan user_id'lar (q)
+    yozuvlar jadvali  qatorlar bo'yicha belgilangan kenglikdagi ustunlar: ad_cycle_count,
+                      invited_count, cycle_epoch (har biri i)
+    sozlamalar        chat_id bo'yicha saralangan (chat_id q, free_ad_count i, reset_interval_days i,
+                      invite_levels JSON'ining blob ichidagi o'rni I va uzunligi I) + JSON blob
+
+Fayl ACCESS_COPY bilan mmap qilinadi: ochilganda faqat sarlavha va katalog o'qiladi, qolgan sahifalar
+qidiruv ularga tekkanda diskdan olinadi. stats_table.ChatStats ustunlari to'g'ridan-to'g'ri shu xotiraga
+qaraydi, joyida o'zgartirishlar faylga yozilmaydi. Yangi snapshot har doim vaqtinchalik faylga yozilib
+os.replace bilan almashtiriladi - ochiq mmap eski faylni ko'rishda davom etadi.
+
+Faqat little-endian tizimlarda ishlaydi (SUPPORTED); boshqalarida storage.py JSON snapshotda qoladi.
+
+Eski fayllardan o'tkazish:
+    python -m binary_snapshot <chiqish.bin> [config.json] [chat_config.json] [stats.json] [user_stats.json]
+Kirish fayllari turi mazmunidan aniqlanadi; bir guruh bir nechta faylda bo'lsa keyingisi ustun.
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left
+
+from limits import DEFAULT_RESET_INTERVAL_DAYS, cycle_epoch
+from stats_table import COLUMN_TYPES, NO_EPOCH, ChatStats, StatsTable
+
+MAGIC = b'LIMITBOT'
+VERSION = 1
+SUPPORTED = sys.byteorder == 'little'
+# Bundan kichik fayllar mmap o'rniga to'liq o'qiladi: har bir mmap ochiq fayl deskriptorini ushlab turadi,
+# guruhlar bo'yicha bo'lingan statistikada esa minglab kichik fayl bo'ladi (stats_shards.py)
+MMAP_MIN_BYTES = 256 * 1024
+
+HEADER = struct.Struct('<8sHHIQQII')  # magic, versiya, zaxira, zaxira, seq, qatorlar, guruhlar, sozlamalar
+CHAT_ENTRY = struct.Struct('<qQQ')
+CONFIG_ENTRY = struct.Struct('<qiiII')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _layout(rows, chats, configs):
+    """Bo'limlar boshlanish o'rinlari: (katalog, ids, ustunlar, sozlamalar, blob)."""
+    directory = _align(HEADER.size)
+    ids = _align(directory + chats * CHAT_ENTRY.size)
+    offset = ids + rows * 8
+    columns = []
+    for _ in COLUMN_TYPES[1:]:
+        columns.append(offset)
+        offset = _align(offset + rows * 4)
+    return directory, ids, columns, offset, _align(offset + configs * CONFIG_ENTRY.size)
+
+
+def write_snapshot(path, table, seq=0, configs=None):
+    """StatsTable (va ixtiyoriy {chat_id: sozlamalar}) ni atomar ravishda yozadi. Yozilgan baytlarni qaytaradi."""
+    if not SUPPORTED:
+        raise SnapshotError("binar snapshot faqat little-endian tizimlarda ishlaydi")
+    chats = sorted(table.chats.items())
+    config_items = sorted((int(chat_id), config) for chat_id, config in (configs or {}).items())
+    rows = sum(len(chat) for _, chat in chats)
+
+    directory_offset, ids_offset, column_offsets, config_offset, blob_offset = _layout(rows, len(chats), len(config_items))
+
+    directory = bytearray()
+    first_row = 0
+    for chat_id, chat in chats:
+        count = len(chat.columns()[0])
+        directory += CHAT_ENTRY.pack(chat_id, first_row, count)
+        first_row += count
+
+    config_entries = bytearray()
+    blob = bytearray()
+    for chat_id, config in config_items:
+        levels = json.dumps(config.get('invite_levels') or {}, separators=(',', ':')).encode('utf-8')
+        config_entries += CONFIG_ENTRY.pack(
+            chat_id, config.get('free_ad_count', 0),
+            config.get('reset_interval_days', DEFAULT_RESET_INTERVAL_DAYS), len(blob), len(levels)
+        )
+        blob += levels
+
+    directory_name = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory_name, prefix='.tmp_', suffix='.bin')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, 0, seq, rows, len(chats), len(config_items)))
+            f.seek(directory_offset)
+            f.write(directory)
+            for index, offset in enumerate((ids_offset,) + tuple(column_offsets)):
+                f.seek(offset)
+                for _, chat in chats:
+                    f.write(chat.columns()[index])
+            f.seek(config_offset)
+            f.write(config_entries)
+            f.seek(blob_offset)
+            f.write(blob)
+            size = blob_offset + len(blob)
+            f.truncate(size) # Oxirgi bo'limlar bo'sh bo'lsa ham tekislash baytlari faylda bo'lsin
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return size
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class Snapshot:
+    """Binar snapshotni o'qish. Ochish faylning hajmiga bog'liq emas (sahifalar kerak bo'lganda o'qiladi)."""
+
+    def __init__(self, path):
+        if not SUPPORTED:
+            raise SnapshotError("binar snapshot faqat little-endian tizimlarda ishlaydi")
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise SnapshotError(f"{path}: fayl juda kichik")
+            if os.name == 'nt' or size < MMAP_MIN_BYTES:
+                buffer = bytearray(f.read()) # Windows'da mmap qilingan faylni os.replace bilan almashtirib bo'lmaydi
+            else:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+        magic, version, _, _, self.seq, self.rows, chats, configs = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path}: binar snapshot emas")
+        if version != VERSION:
+            raise SnapshotError(f"{path}: {version}-versiya qo'llab-quvvatlanmaydi (kutilgan {VERSION})")
+
+        directory_offset, ids_offset, column_offsets, config_offset, blob_offset = _layout(self.rows, chats, configs)
+        if len(buffer) < blob_offset:
+            raise SnapshotError(f"{path}: fayl kesilgan")
+
+        self.path = path
+        self._view = memoryview(buffer)
+        self._columns = [
+            self._view[offset:offset + self.rows * array(typecode).itemsize].cast(typecode)
+            for offset, typecode in zip([ids_offset] + column_offsets, COLUMN_TYPES)
+        ]
+        self._chats = [CHAT_ENTRY.unpack_from(buffer, directory_offset + i * CHAT_ENTRY.size) for i in range(chats)]
+        # Sozlamalar jadvalidagi chat_id maydonlari (har bir yozuv 3 ta q kengligida)
+        self._config_ids = self._view[config_offset:config_offset + configs * CONFIG_ENTRY.size].cast('q')[::3]
+        self._config_offset = config_offset
+        self._blob_offset = blob_offset
+        self.configs_count = configs
+
+    def stats_table(self):
+        """Guruhlari shu fayl xotirasiga qaraydigan StatsTable."""
+        table = StatsTable()
+        for chat_id, first_row, count in self._chats:
+            table.chats[chat_id] = ChatStats(*(column[first_row:first_row + count] for column in self._columns))
+        return table
+
+    def _config_entry(self, index):
+        return CONFIG_ENTRY.unpack_from(self._view, self._config_offset + index * CONFIG_ENTRY.size)
+
+    def _config(self, entry):
+        _, free_ad_count, reset_interval_days, offset, length = entry
+        start = self._blob_offset + offset
+        return {
+            'free_ad_count': free_ad_count,
+            'reset_interval_days': reset_interval_days,
+            'invite_levels': json.loads(bytes(self._view[start:start + length]))
+        }
+
+    def config(self, chat_id):
+        """Bitta guruh sozlamalari (bisect bilan) yoki None."""
+        chat_id = int(chat_id)
+        index = bisect_left(self._config_ids, chat_id)
+        if index < self.configs_count and self._config_ids[index] == chat_id:
+            return self._config(self._config_entry(index))
+        return None
+
+    def configs(self):
+        entries = (self._config_entry(index) for index in range(self.configs_count))
+        return {str(entry[0]): self._config(entry) for entry in entries}
+
+
+def load_stats(path):
+    """(StatsTable, seq) qaytaradi."""
+    snapshot = Snapshot(path)
+    return snapshot.stats_table(), snapshot.seq
+
+
+# --- Eski fayllardan o'tkazish ---
+
+def chat_user_items(data):
+    """user_stats.json yozuvlari: {"<chat_id>_<user_id>": stats} va {"<chat_id>": {"<user_id>": stats}}
+    ko'rinishlari aralash uchraydi. (chat_id_str, user_id_str, stats) qaytaradi."""
+    for key, value in data.items():
+        if '_' in key:
+            chat_id_str, _, user_id_str = key.rpartition('_')
+            yield chat_id_str, user_id_str, value
+        else:
+            for user_id_str, stats in value.items():
+                yield key, user_id_str, stats
+
+
+def legacy_epoch(stats, reset_interval_days):
+    """cycle_epoch yoki oxirgi tiklanish/reklama sanasidan epoch; noma'lum bo'lsa NO_EPOCH."""
+    epoch = stats.get('cycle_epoch')
+    if epoch is not None:
+        return epoch
+    day = stats.get('last_reset_date') or stats.get('last_ad_timestamp')
+    return cycle_epoch(reset_interval_days, day) if day else NO_EPOCH
+
+
+def table_from_chat_user(data, reset_interval_days):
+    """user_stats.json dan StatsTable."""
+    table = StatsTable()
+    for chat_id_str, user_id_str, stats in chat_user_items(data):
+        table.set(
+            int(chat_id_str), int(user_id_str),
+            stats.get('current_ad_cycle_count', 0), stats.get('invited_members_count', 0),
+            legacy_epoch(stats, reset_interval_days(chat_id_str))
+        )
+    return table
+
+
+def _kind(data):
+    """JSON fayl turi: 'config', 'stats' (storage.py snapshoti) yoki 'chat_user' (user_stats.json)."""
+    if data.get('_format') is not None:
+        return 'stats'
+    for key, value in data.items():
+        if key.startswith('_'):
+            continue
+        if 'free_ad_count' in value or 'invite_levels' in value:
+            return 'config'
+        # Guruh id'lari manfiy: storage.py snapshoti foydalanuvchi id'si bilan boshlanadi
+        return 'chat_user' if key.startswith('-') else 'stats'
+    return 'config'
+
+
+def convert(output, inputs):
+    configs = {}
+    stats_files = []
+    for path in inputs:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        kind = _kind(data)
+        print(f"    {path}: {kind}")
+        if kind == 'config':
+            configs.update(data)
+        else:
+            stats_files.append((kind, data))
+
+    def reset_interval_days(chat_id):
+        return configs.get(str(chat_id), {}).get('reset_interval_days', DEFAULT_RESET_INTERVAL_DAYS)
+
+    table = StatsTable()
+    seq = 0
+    for kind, data in stats_files:
+        if kind == 'chat_user':
+            part = table_from_chat_user(data, reset_interval_days)
+        else:
+            seq = max(seq, data.pop('_seq', 0))
+            part = StatsTable.from_json(data, reset_interval_days)
+        for chat_id, chat in part.chats.items():
+            if chat_id not in table.chats:
+                table.chats[chat_id] = chat
+                continue
+            for user_id, cycle, invited, epoch in zip(*chat.columns()):
+                table.set(chat_id, user_id, cycle, invited, epoch)
+
+    size = write_snapshot(output, table, seq, configs)
+    print(f"{output}: {len(table)} statistika qatori, {len(configs)} guruh sozlamasi, {size} bayt")
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        return
+    convert(sys.argv[1], sys.argv[2:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import itertools
+
+from limits import compile_policy
+
+# Guruh sozlamalari keshi: chat_id -> (versiya, tayyor sozlamalar, LimitPolicy).
+# Backendlar sozlamani o'zgartirganda (update_config/update_chat_config/delete_group)
+# tegishli yozuvni o'chiradi; har bir yangi yozuv yangi versiya raqamini oladi va
+# limit qoidasi shu versiya uchun bir marta tuziladi.
+_versions = itertools.count(1)
+
+
+class ConfigCache:
+    """Jarayon bo'yicha yagona chat sozlamalari keshi."""
+
+    def __init__(self):
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chat_id):
+        """(versiya, sozlamalar, qoida) yoki None qaytaradi."""
+        entry = self._entries.get(str(chat_id))
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def __contains__(self, chat_id):
+        return str(chat_id) in self._entries
+
+    def put(self, chat_id, config):
+        entry = (next(_versions), config, compile_policy(config))
+        self._entries[str(chat_id)] = entry
+        return entry
+
+    def invalidate(self, chat_id=None):
+        """Bitta guruh yoki (chat_id=None bo'lsa) butun keshni tozalaydi."""
+        if chat_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(str(chat_id), None)
+
+    def stats(self):
+        return {'chats': len(self._entries), 'hits': self.hits, 'misses': self.misses}
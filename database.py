@@ -1,9 +1,11 @@
 import os
 import json
-import asyncio
-from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from supabase import create_client, Client
+
+from config_cache import ConfigCache
+from limits import QuotaResult, cycle_epoch, stats_epoch
+from rest_client import PostgrestClient
+from stats_batcher import StatsBatcher
 
 load_dotenv()
 
@@ -11,7 +13,10 @@ load_dotenv()
 SUPABASE_URL: str = os.getenv("SUPABASE_URL")
 SUPABASE_KEY: str = os.getenv("SUPABASE_KEY")
 
-supabase: Client = None
+supabase: PostgrestClient = None
+
+# Guruh sozlamalari keshi (invite_levels allaqachon JSON dan o'girilgan holda)
+_config_cache = ConfigCache()
 
 
 # --- Asosiy ishga tushirish funksiyasi ---
@@ -24,7 +29,7 @@ async def init_db():
         return False
 
     try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        supabase = PostgrestClient(SUPABASE_URL, SUPABASE_KEY)
         print("✅ Supabase client ulandi.")
         await create_tables_and_init_admin()
         return True
@@ -33,11 +38,11 @@ async def init_db():
         return False
 
 
-# --- Foydali yordamchi ---
-async def run_query(func):
-    """Supabase so‘rovlarini async muhitda xavfsiz bajaradi."""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, func)
+async def close_db():
+    """Yozilmagan statistikani yuboradi va ulanishlar pulini yopadi."""
+    if supabase is not None:
+        await flush_stats()
+        await supabase.close()
 
 
 # --- Admin bilan bog‘liq funksiyalar ---
@@ -51,13 +56,13 @@ async def create_tables_and_init_admin():
         return
 
     try:
-        response = await run_query(lambda: supabase.table('admins')
-                                   .select('admin_id')
-                                   .eq('username', username)
-                                   .execute())
+        response = await (supabase.table('admins')
+                          .select('admin_id')
+                          .eq('username', username)
+                          .execute())
 
         if not getattr(response, "data", None):
-            await run_query(lambda: supabase.table('admins').insert({
+            await (supabase.table('admins').insert({
                 'username': username,
                 'password_hash': password,
                 'is_active': True
@@ -71,11 +76,11 @@ async def create_tables_and_init_admin():
 
 async def check_admin_credentials(username, password_hash):
     try:
-        response = await run_query(lambda: supabase.table('admins')
-                                   .select('*')
-                                   .eq('username', username)
-                                   .eq('password_hash', password_hash)
-                                   .execute())
+        response = await (supabase.table('admins')
+                          .select('*')
+                          .eq('username', username)
+                          .eq('password_hash', password_hash)
+                          .execute())
         data = getattr(response, "data", None)
         return data[0] if data else None
     except Exception as e:
@@ -86,25 +91,25 @@ async def check_admin_credentials(username, password_hash):
 async def link_admin_telegram_id(username=None, telegram_user_id=None):
     try:
         if username:
-            await run_query(lambda: supabase.table('admins')
-                           .update({'telegram_user_id': telegram_user_id})
-                           .eq('username', username)
-                           .execute())
+            await (supabase.table('admins')
+                  .update({'telegram_user_id': telegram_user_id})
+                  .eq('username', username)
+                  .execute())
         elif telegram_user_id:
-            await run_query(lambda: supabase.table('admins')
-                           .update({'telegram_user_id': None})
-                           .eq('telegram_user_id', telegram_user_id)
-                           .execute())
+            await (supabase.table('admins')
+                  .update({'telegram_user_id': None})
+                  .eq('telegram_user_id', telegram_user_id)
+                  .execute())
     except Exception as e:
         print(f"⚠️ Telegram ID ulashda xato: {e}")
 
 
 async def get_admin_by_telegram_id(telegram_user_id):
     try:
-        response = await run_query(lambda: supabase.table('admins')
-                                   .select('*')
-                                   .eq('telegram_user_id', telegram_user_id)
-                                   .execute())
+        response = await (supabase.table('admins')
+                          .select('*')
+                          .eq('telegram_user_id', telegram_user_id)
+                          .execute())
         data = getattr(response, "data", None)
         return data[0] if data else None
     except Exception as e:
@@ -123,10 +128,10 @@ async def update_admin_credentials(admin_id, login=None, password_hash=None):
         return
 
     try:
-        await run_query(lambda: supabase.table('admins')
-                       .update(updates)
-                       .eq('admin_id', admin_id)
-                       .execute())
+        await (supabase.table('admins')
+              .update(updates)
+              .eq('admin_id', admin_id)
+              .execute())
     except Exception as e:
         print(f"⚠️ Admin credential yangilashda xato: {e}")
 
@@ -134,27 +139,32 @@ async def update_admin_credentials(admin_id, login=None, password_hash=None):
 # --- Guruh konfiguratsiyasi ---
 async def get_all_chat_configs():
     try:
-        response = await run_query(lambda: supabase.table('chat_config')
-                                   .select('chat_id')
-                                   .execute())
+        response = await (supabase.table('chat_config')
+                          .select('chat_id')
+                          .execute())
         return getattr(response, "data", [])
     except Exception as e:
         print(f"⚠️ Chat konfiguratsiyalarini olishda xato: {e}")
         return []
 
 
-async def get_config(chat_id):
+async def _get_config_entry(chat_id):
+    """Keshdan (versiya, sozlamalar, qoida) yozuvini oladi, kerak bo'lsa Supabase'dan yuklaydi."""
+    entry = _config_cache.get(chat_id)
+    if entry is not None:
+        return entry
+
     try:
-        response = await run_query(lambda: supabase.table('chat_config')
-                                   .select('*')
-                                   .eq('chat_id', chat_id)
-                                   .execute())
+        response = await (supabase.table('chat_config')
+                          .select('*')
+                          .eq('chat_id', chat_id)
+                          .execute())
 
         if getattr(response, "data", None):
             config = response.data[0]
             if isinstance(config.get('invite_levels'), str):
                 config['invite_levels'] = json.loads(config['invite_levels'])
-            return config
+            return _config_cache.put(chat_id, config)
 
         default_config = {
             'chat_id': chat_id,
@@ -163,117 +173,160 @@ async def get_config(chat_id):
             'invite_levels': json.dumps({"1": 2, "2": 5, "max": 10})
         }
 
-        await run_query(lambda: supabase.table('chat_config').insert(default_config).execute())
+        await supabase.table('chat_config').insert(default_config).execute()
         default_config['invite_levels'] = json.loads(default_config['invite_levels'])
-        return default_config
+        return _config_cache.put(chat_id, default_config)
 
     except Exception as e:
         print(f"⚠️ Chat konfiguratsiyasini olishda xato: {e}")
         return None
 
 
+async def get_config(chat_id):
+    entry = await _get_config_entry(chat_id)
+    return entry[1] if entry else None
+
+
+async def get_policy(chat_id):
+    """Guruhning tuzilgan limit qoidasini (LimitPolicy) qaytaradi."""
+    entry = await _get_config_entry(chat_id)
+    return entry[2] if entry else None
+
+
 async def update_chat_config(chat_id, key, value):
     updates = {key: json.dumps(value) if isinstance(value, dict) else value}
     try:
-        await run_query(lambda: supabase.table('chat_config')
-                       .update(updates)
-                       .eq('chat_id', chat_id)
-                       .execute())
+        await (supabase.table('chat_config')
+              .update(updates)
+              .eq('chat_id', chat_id)
+              .execute())
     except Exception as e:
         print(f"⚠️ Chat konfiguratsiyasini yangilashda xato: {e}")
+    finally:
+        _config_cache.invalidate(chat_id)
 
 
 # --- Foydalanuvchi statistikasi ---
-async def get_user_stats(user_id, chat_id, config):
+# Eski qatorlarda epoch last_ad_timestamp dan olinadi (serverda user_stats_epoch). O'zgarishlar serverdagi
+# SQL funksiyalari (supabase_migrations.sql) orqali bitta so'rovda va qator qulfi ostida qo'llanadi,
+# shuning uchun bir vaqtdagi xabarlar bir-birining natijasini yo'qotmaydi.
+async def _read_stats(user_id, chat_id, reset_interval_days):
+    """(ad_cycle_count, invited_count, joriy_epoch) qaytaradi, xatoda None. Hech narsa yozmaydi."""
+    epoch = cycle_epoch(reset_interval_days)
     try:
-        response = await run_query(lambda: supabase.table('user_stats')
-                                   .select('*')
-                                   .eq('user_id', user_id)
-                                   .eq('chat_id', chat_id)
-                                   .execute())
-        data = getattr(response, "data", None)
-
-        if not data:
-            new_stats = {
-                'user_id': user_id,
-                'chat_id': chat_id,
-                'last_ad_timestamp': datetime.now().isoformat(),
-                'current_ad_cycle_count': 0,
-                'invited_members_count': 0
-            }
-            await run_query(lambda: supabase.table('user_stats').insert(new_stats).execute())
-            return new_stats
-
-        stats = data[0]
-        last_ad_ts = stats.get('last_ad_timestamp')
-        if last_ad_ts:
-            last_ad_dt = datetime.fromisoformat(last_ad_ts.replace('Z', '+00:00'))
-        else:
-            last_ad_dt = datetime.now()
-
-        reset_date = last_ad_dt + timedelta(days=config['reset_interval_days'])
-        if datetime.now() > reset_date:
-            reset_data = {
-                'current_ad_cycle_count': 0,
-                'invited_members_count': 0,
-                'last_ad_timestamp': datetime.now().isoformat()
-            }
-            await run_query(lambda: supabase.table('user_stats')
-                           .update(reset_data)
-                           .eq('user_id', user_id)
-                           .eq('chat_id', chat_id)
-                           .execute())
-            stats.update(reset_data)
-
-        return stats
-
+        response = await (supabase.table('user_stats')
+                          .select('current_ad_cycle_count,invited_members_count,cycle_epoch,last_ad_timestamp')
+                          .eq('user_id', user_id)
+                          .eq('chat_id', chat_id)
+                          .execute())
     except Exception as e:
         print(f"⚠️ User stats olishda xato: {e}")
         return None
 
+    data = getattr(response, "data", None)
+    if not data or stats_epoch(data[0], reset_interval_days, date_key='last_ad_timestamp') != epoch:
+        return 0, 0, epoch
+    return data[0]['current_ad_cycle_count'], data[0]['invited_members_count'], epoch
 
-async def update_user_stats(user_id, chat_id, ad_used=False, invited_count_change=0, reset_invited=False):
-    updates = {}
 
+async def get_user_stats(user_id, chat_id, config):
+    await _stats_batcher.wait_for((chat_id, user_id))
+    stats = await _read_stats(user_id, chat_id, config['reset_interval_days'])
+    if stats is None:
+        return None
+    return {
+        'user_id': user_id,
+        'chat_id': chat_id,
+        'current_ad_cycle_count': stats[0],
+        'invited_members_count': stats[1],
+        'cycle_epoch': stats[2]
+    }
+
+
+# Delta: (epoch, reset_interval_days, ad_delta, invited_delta, reset_invited).
+# reset_invited bo'lsa, takliflar avval 0 qilinadi, keyin invited_delta qo'shiladi.
+def _merge_deltas(old, new):
+    if new[0] != old[0]:
+        return new  # Yangi tsikl: eski tsikl hisoblagichlari baribir 0 deb olinadi
+    invited = new[3] if new[4] else old[3] + new[3]
+    return new[0], new[1], old[2] + new[2], invited, old[4] or new[4]
+
+
+async def _write_stats_batch(items):
+    await supabase.rpc('apply_user_stats_deltas', {'p_deltas': [
+        {
+            'chat_id': chat_id,
+            'user_id': user_id,
+            'epoch': epoch,
+            'reset_interval_days': reset_interval_days,
+            'ad_delta': ad_delta,
+            'invited_delta': invited_delta,
+            'reset_invited': reset_invited
+        }
+        for (chat_id, user_id), (epoch, reset_interval_days, ad_delta, invited_delta, reset_invited) in items
+    ]})
+
+
+_stats_batcher = StatsBatcher(_write_stats_batch, _merge_deltas)
+
+
+async def update_user_stats(user_id, chat_id, ad_used=False, invited_count_change=0, reset_invited=False, wait=False):
+    """O'zgarishni navbatga qo'shadi; u boshqalari bilan birga bitta so'rovda yoziladi.
+    wait=True bo'lsa, yozilishini kutadi (muvaffaqiyatli bo'lsa True)."""
+    if not ad_used and not invited_count_change and not reset_invited:
+        return True
+
+    policy = await get_policy(chat_id)
+    if policy is None:
+        return False
+
+    written = _stats_batcher.add((chat_id, user_id), (
+        policy.current_epoch(),
+        policy.reset_interval_days,
+        1 if ad_used else 0,
+        0 if reset_invited else invited_count_change,
+        reset_invited
+    ))
+    return await written if wait else True
+
+
+async def flush_stats():
+    """Navbatdagi barcha statistika o'zgarishlarini hoziroq yozadi."""
+    return await _stats_batcher.flush()
+
+
+def stats_batcher_stats():
+    """Batcher ko'rsatkichlari: navbat chuqurligi, paketlar soni, yozish kechikishi."""
+    return _stats_batcher.stats()
+
+
+async def consume_ad_quota(user_id, chat_id, policy, invited_count_change=0, consume_free=True):
+    """Limitni tekshiradi va kvota yetarli bo'lsa uni serverda bitta RPC bilan ishlatadi. QuotaResult qaytaradi."""
+    await _stats_batcher.wait_for((chat_id, user_id))
     try:
-        if ad_used:
-            response = await run_query(lambda: supabase.table('user_stats')
-                                       .select('current_ad_cycle_count')
-                                       .eq('user_id', user_id)
-                                       .eq('chat_id', chat_id)
-                                       .single()
-                                       .execute())
-            current = getattr(response, "data", {}).get('current_ad_cycle_count', 0)
-            updates['current_ad_cycle_count'] = current + 1
-            updates['last_ad_timestamp'] = datetime.now().isoformat()
-
-        if invited_count_change:
-            response = await run_query(lambda: supabase.table('user_stats')
-                                       .select('invited_members_count')
-                                       .eq('user_id', user_id)
-                                       .eq('chat_id', chat_id)
-                                       .single()
-                                       .execute())
-            current_inv = getattr(response, "data", {}).get('invited_members_count', 0)
-            updates['invited_members_count'] = current_inv + invited_count_change
-
-        if reset_invited:
-            updates['invited_members_count'] = 0
-
-        if updates:
-            await run_query(lambda: supabase.table('user_stats')
-                           .update(updates)
-                           .eq('user_id', user_id)
-                           .eq('chat_id', chat_id)
-                           .execute())
+        response = await supabase.rpc('consume_ad_quota', {
+            'p_chat_id': chat_id,
+            'p_user_id': user_id,
+            'p_epoch': policy.current_epoch(),
+            'p_reset_interval_days': policy.reset_interval_days,
+            'p_free_ad_count': policy.free_ad_count,
+            'p_thresholds': list(policy.thresholds),
+            'p_max_required': policy.max_required,
+            'p_invited_delta': invited_count_change,
+            'p_consume_free': consume_free
+        })
     except Exception as e:
-        print(f"⚠️ User stats yangilashda xato: {e}")
+        print(f"⚠️ Limit kvotasini yangilashda xato: {e}")
+        return None
+
+    data = response.data
+    return QuotaResult(data['allowed'], data['required'], data['invited'], data['missing'])
 
 
 # --- Kanallar bilan ishlash ---
 async def get_required_channels():
     try:
-        response = await run_query(lambda: supabase.table('required_channels').select('*').execute())
+        response = await supabase.table('required_channels').select('*').execute()
         return getattr(response, "data", [])
     except Exception as e:
         print(f"⚠️ Kanallarni olishda xato: {e}")
@@ -282,9 +335,9 @@ async def get_required_channels():
 
 async def get_all_channels_for_settings():
     try:
-        response = await run_query(lambda: supabase.table('required_channels')
-                                   .select('channel_username')
-                                   .execute())
+        response = await (supabase.table('required_channels')
+                          .select('channel_username')
+                          .execute())
         return getattr(response, "data", [])
     except Exception as e:
         print(f"⚠️ Kanallar sozlamalarini olishda xato: {e}")
@@ -293,9 +346,9 @@ async def get_all_channels_for_settings():
 
 async def add_channel(username):
     try:
-        response = await run_query(lambda: supabase.table('required_channels')
-                                   .insert({'channel_username': username, 'is_active': True})
-                                   .execute())
+        response = await (supabase.table('required_channels')
+                          .insert({'channel_username': username, 'is_active': True})
+                          .execute())
         return getattr(response, "data", None)
     except Exception as e:
         print(f"⚠️ Kanal qo‘shishda xato: {e}")
@@ -304,9 +357,9 @@ async def add_channel(username):
 
 async def delete_channel(channel_id):
     try:
-        await run_query(lambda: supabase.table('required_channels')
-                       .delete()
-                       .eq('channel_id', channel_id)
-                       .execute())
+        await (supabase.table('required_channels')
+              .delete()
+              .eq('channel_id', channel_id)
+              .execute())
     except Exception as e:
         print(f"⚠️ Kanalni o‘chirishda xato: {e}")
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import heapq
+import asyncio
+import tempfile
+
+from aiogram.exceptions import TelegramRetryAfter
+
+# Kechiktirilgan xabar o'chirishlar uchun yagona rejalashtiruvchi.
+# Har bir xabar uchun alohida uxlovchi task o'rniga bitta heap (muddat, chat_id, message_id) va
+# bitta task ishlaydi. Navbat DELETIONS_FILE ga yozib boriladi (append-only), shuning uchun
+# qayta ishga tushirilganda (Render redeploy) kutilayotgan o'chirishlar yo'qolmaydi.
+# Muddati kelgan xabarlar guruh bo'yicha yig'ilib, deleteMessages bilan (100 tadan) o'chiriladi.
+DELETIONS_FILE = os.getenv("DELETIONS_FILE", "deletions.jsonl")
+DELETE_BATCH_SIZE = 100      # deleteMessages bir so'rovda qabul qiladigan maksimal xabarlar soni
+DELETIONS_COMPACT_AFTER = 1000  # shuncha bajarilgan yozuvdan keyin fayl qayta yoziladi
+DELETE_COALESCE_SECONDS = 1.0   # muddatiga shuncha qolgan xabarlar ham shu paketga qo'shiladi
+
+
+class DeletionScheduler:
+    """Kutilayotgan o'chirishlar heap'i va ularni bajaruvchi task."""
+
+    def __init__(self, path=DELETIONS_FILE):
+        self.path = path
+        self._heap = []          # (muddat - unix vaqt, chat_id, message_id)
+        self._file = None
+        self._done_records = 0
+        self._wakeup = None
+        self._loaded = False
+        self.scheduled = 0
+        self.deleted = 0
+        self.batches = 0
+        self.errors = 0
+
+    # --- Fayl ---
+
+    def _load(self):
+        """Fayldan navbatni tiklaydi: qo'shilganlar ('a') minus bajarilganlar ('d')."""
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+
+        pending = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Uzilib qolgan oxirgi qator
+                if 'a' in record:
+                    deadline, chat_id, message_id = record['a']
+                    pending[(chat_id, message_id)] = deadline
+                elif 'd' in record:
+                    chat_id, message_ids = record['d']
+                    for message_id in message_ids:
+                        pending.pop((chat_id, message_id), None)
+
+        self._heap = [(deadline, chat_id, message_id) for (chat_id, message_id), deadline in pending.items()]
+        heapq.heapify(self._heap)
+        self._compact()
+
+    def _append(self, record):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._file.flush()
+
+    def _compact(self):
+        """Faylni faqat kutilayotgan yozuvlar bilan qayta yozadi."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        dir_name = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=dir_name, delete=False) as tmp:
+            for entry in self._heap:
+                tmp.write(json.dumps({'a': list(entry)}, separators=(',', ':')) + '\n')
+        os.replace(tmp.name, self.path)
+        self._done_records = 0
+
+    # --- Navbat ---
+
+    def schedule(self, chat_id, message_id, delay=330):
+        """Xabarni delay soniyadan keyin o'chirishga qo'yadi."""
+        if not self._loaded:
+            self._load()
+
+        entry = (time.time() + delay, chat_id, message_id)
+        try:
+            self._append({'a': list(entry)})
+        except Exception as e:
+            print(f"⚠️ O'chirish navbatini faylga yozishda xato: {e}")
+
+        heapq.heappush(self._heap, entry)
+        self.scheduled += 1
+        if self._wakeup is not None and self._heap[0] is entry:
+            self._wakeup.set()  # Yangi yozuv eng yaqin muddatga ega - taymerni qayta hisoblash
+
+    def _pop_due(self, until):
+        """Muddati until gacha bo'lgan xabarlarni chat bo'yicha guruhlab qaytaradi."""
+        due = {}
+        while self._heap and self._heap[0][0] <= until:
+            _, chat_id, message_id = heapq.heappop(self._heap)
+            due.setdefault(chat_id, []).append(message_id)
+        return due
+
+    async def _delete_chat_messages(self, bot, chat_id, message_ids):
+        for i in range(0, len(message_ids), DELETE_BATCH_SIZE):
+            chunk = message_ids[i:i + DELETE_BATCH_SIZE]
+            try:
+                await bot.delete_messages(chat_id, chunk)
+                self.deleted += len(chunk)
+            except TelegramRetryAfter as e:
+                # Flood control: qolganlarini keyinroq qayta urinamiz (faylda hali bajarilmagan)
+                for message_id in message_ids[i:]:
+                    heapq.heappush(self._heap, (time.time() + e.retry_after, chat_id, message_id))
+                message_ids = message_ids[:i]
+                break
+            except Exception as e:
+                # Xabar allaqachon o'chirilgan yoki botda huquq yo'q - qayta urinishdan foyda yo'q
+                print(f"⚠️ Xabarlarni o'chirishda xato ({chat_id}): {e}")
+                self.errors += 1
+            finally:
+                self.batches += 1
+
+        if message_ids:
+            self._append({'d': [chat_id, message_ids]})
+            self._done_records += 1
+
+    async def run(self, bot):
+        """Muddati kelgan o'chirishlarni bajaruvchi yagona task."""
+        if not self._loaded:
+            self._load()
+        self._wakeup = asyncio.Event()
+
+        while True:
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            if timeout is None or timeout > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            for chat_id, message_ids in self._pop_due(time.time() + DELETE_COALESCE_SECONDS).items():
+                try:
+                    await self._delete_chat_messages(bot, chat_id, message_ids)
+                except Exception as e:
+                    print(f"⚠️ O'chirish navbatini bajarishda xato: {e}")
+
+            if self._done_records >= DELETIONS_COMPACT_AFTER:
+                try:
+                    self._compact()
+                except Exception as e:
+                    print(f"⚠️ O'chirish navbati faylini siqishda xato: {e}")
+
+    def stats(self):
+        return {
+            'pending': len(self._heap),
+            'scheduled': self.scheduled,
+            'deleted': self.deleted,
+            'batches': self.batches,
+            'errors': self.errors,
+        }
+
+
+deletion_scheduler = DeletionScheduler()
@@ -0,0 +1,91 @@
+import os
+import time
+
+# Limit ogohlantirishlari reyestri: (chat_id, user_id) uchun oyna davomida bitta jonli ogohlantirish.
+# Oyna ichidagi keyingi buzilishlarda yangi xabar yuborilmaydi - mavjud ogohlantirish hisoblagich
+# bilan tahrirlanadi (ko'pi bilan LIMIT_WARNING_EDIT_INTERVAL da bir marta) yoki o'tkazib yuboriladi.
+# Oyna xabar o'chirilishidan (330 s) qisqa bo'lishi kerak, aks holda o'chirilgan xabar tahrirlanadi.
+LIMIT_WARNING_WINDOW = float(os.getenv("LIMIT_WARNING_WINDOW", 300))
+LIMIT_WARNING_EDIT_INTERVAL = float(os.getenv("LIMIT_WARNING_EDIT_INTERVAL", 15)) # 0 - hech qachon tahrirlamaslik
+LIMIT_WARNING_SWEEP_INTERVAL = 60
+
+
+class LiveWarning:
+    __slots__ = ('message_id', 'expires_at', 'violations', 'missing', 'edited_at')
+
+    def __init__(self, expires_at, missing, now):
+        self.message_id = None  # Xabar yuborilguncha None (parallel buzilishlar ham yangi xabar yubormaydi)
+        self.expires_at = expires_at
+        self.violations = 1
+        self.missing = missing
+        self.edited_at = now
+
+
+class WarningRegistry:
+    """(chat_id, user_id) -> LiveWarning, avtomatik eskirish va tejalgan API chaqiruvlari hisobi bilan."""
+
+    def __init__(self, window=LIMIT_WARNING_WINDOW, edit_interval=LIMIT_WARNING_EDIT_INTERVAL):
+        self.window = window
+        self.edit_interval = edit_interval
+        self._warnings = {}
+        self._next_sweep = 0.0
+        self.sent = 0
+        self.edited = 0
+        self.skipped = 0
+        self.saved_calls = 0
+
+    def _sweep(self, now):
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + LIMIT_WARNING_SWEEP_INTERVAL
+        self._warnings = {key: w for key, w in self._warnings.items() if w.expires_at > now}
+
+    def claim(self, chat_id, user_id, missing):
+        """Buzilishni qayd etadi. Qaytaradi:
+        ('send', None)    - yangi ogohlantirish yuborish kerak (keyin set_message_id chaqiriladi);
+        ('edit', warning) - mavjud ogohlantirishni yangilash kerak;
+        ('skip', warning) - hech narsa yuborilmaydi.
+        """
+        now = time.monotonic()
+        self._sweep(now)
+        key = (chat_id, user_id)
+        warning = self._warnings.get(key)
+
+        if warning is None or warning.expires_at <= now:
+            self._warnings[key] = LiveWarning(now + self.window, missing, now)
+            self.sent += 1
+            return 'send', None
+
+        warning.violations += 1
+        due = self.edit_interval and now - warning.edited_at >= self.edit_interval
+        if warning.message_id is not None and (due or missing != warning.missing):
+            warning.missing = missing
+            warning.edited_at = now
+            self.edited += 1
+            self.saved_calls += 1  # sendMessage + deleteMessage o'rniga bitta editMessageText
+            return 'edit', warning
+
+        self.skipped += 1
+        self.saved_calls += 2
+        return 'skip', warning
+
+    def set_message_id(self, chat_id, user_id, message_id):
+        warning = self._warnings.get((chat_id, user_id))
+        if warning is not None:
+            warning.message_id = message_id
+
+    def forget(self, chat_id, user_id):
+        """Ogohlantirishni reyestrdan o'chiradi (yuborish/tahrirlash xatosi yoki limit ochilganda)."""
+        self._warnings.pop((chat_id, user_id), None)
+
+    def stats(self):
+        return {
+            'live': len(self._warnings),
+            'sent': self.sent,
+            'edited': self.edited,
+            'skipped': self.skipped,
+            'saved_calls': self.saved_calls,
+        }
+
+
+limit_warnings = WarningRegistry()
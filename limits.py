@@ -0,0 +1,163 @@
+from collections import namedtuple
+from datetime import date, datetime, timezone
+
+# Limit mantiqi: barcha storage backendlar va handlerlar uchun umumiy.
+
+# allowed  - xabar ruxsat etildi (kvota ishlatildi)
+# required - joriy tsikl uchun talab qilinadigan odamlar soni (0 - bepul xabar)
+# invited  - kvota ishlatilishidan oldingi takliflar soni
+# missing  - yana nechta odam qo'shish kerak (allowed bo'lsa 0)
+QuotaResult = namedtuple('QuotaResult', ['allowed', 'required', 'invited', 'missing'])
+
+
+# Tsikllar shu sanadan boshlab reset_interval_days kunlik bo'laklarga (epoch) bo'linadi.
+# Kunlar UTC bo'yicha sanaladi - server vaqt zonasidan qat'i nazar, supabase_migrations.sql dagi
+# user_stats_epoch bilan bir xil natija bo'lishi uchun.
+CYCLE_START = date(1970, 1, 1)
+
+DEFAULT_FREE_AD_COUNT = 1
+DEFAULT_RESET_INTERVAL_DAYS = 30
+DEFAULT_MAX_REQUIRED = 10
+
+# Sozlamalar chegaralari: admin panelda kiritilgan bitta katta son qoidani og'irlashtirmasin
+MAX_FREE_AD_COUNT = 1000
+MAX_RESET_INTERVAL_DAYS = 3650
+MAX_INVITE_LEVEL = 100
+
+
+def _utc_date(moment):
+    """datetime ning UTC dagi sanasi; vaqt zonasisiz qiymat UTC deb olinadi (Postgres sessiyasi kabi)."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.date()
+
+
+def cycle_epoch(reset_interval_days, day=None):
+    """Berilgan kun (standart - bugun, UTC) qaysi tsiklga (epoch) tegishli ekanini hisoblaydi."""
+    if day is None:
+        day = datetime.now(timezone.utc).date()
+    elif isinstance(day, str):
+        day = _utc_date(datetime.fromisoformat(day.replace('Z', '+00:00')))
+    elif isinstance(day, datetime):
+        day = _utc_date(day)
+    return (day - CYCLE_START).days // reset_interval_days
+
+
+# Hisoblagichlar o'zlari tegishli tsikl raqamini (cycle_epoch) saqlaydi. Barcha backendlarda epoch
+# joriy tsikldan farq qilsa hisoblagichlar o'qishda 0 deb olinadi; tiklanish alohida yozilmaydi, keyingi
+# haqiqiy o'zgarish yangi epoch bilan birga yoziladi (tsikl almashganda ommaviy UPDATE kerak emas).
+def stats_epoch(stats, reset_interval_days, date_key='last_reset_date'):
+    """Statistika yozuvining epochi. Eski yozuvlarda epoch yo'q - u oxirgi tiklanish sanasidan olinadi."""
+    epoch = stats.get('cycle_epoch')
+    if epoch is None and stats.get(date_key):
+        epoch = cycle_epoch(reset_interval_days, stats[date_key])
+    return epoch
+
+
+def _non_negative_int(value, name, minimum=0, maximum=None):
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        raise ValueError(f"'{name}' {minimum} yoki undan katta butun son bo'lishi kerak (berilgan: {value!r})")
+    if maximum is not None and value > maximum:
+        raise ValueError(f"'{name}' {maximum} dan oshmasligi kerak (berilgan: {value!r})")
+    return value
+
+
+class LimitPolicy:
+    """Guruh sozlamalaridan bir marta tuziladigan o'zgarmas limit qoidasi.
+
+    Dastlabki free_ad_count ta tsikl bepul; keyin thresholds[cycle - free_ad_count] - invite_levels
+    darajalari bo'yicha talab qilinadigan odamlar soni, jadvaldan keyingi tsikllar uchun max_required.
+    """
+
+    __slots__ = ('free_ad_count', 'reset_interval_days', 'thresholds', 'max_required')
+
+    def __init__(self, free_ad_count, reset_interval_days, thresholds, max_required):
+        object.__setattr__(self, 'free_ad_count', free_ad_count)
+        object.__setattr__(self, 'reset_interval_days', reset_interval_days)
+        object.__setattr__(self, 'thresholds', tuple(thresholds))
+        object.__setattr__(self, 'max_required', max_required)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("LimitPolicy o'zgarmas")
+
+    def __repr__(self):
+        return (f"LimitPolicy(free_ad_count={self.free_ad_count}, reset_interval_days={self.reset_interval_days}, "
+                f"thresholds={self.thresholds}, max_required={self.max_required})")
+
+    @classmethod
+    def from_config(cls, config):
+        """Sozlamalarni tekshiradi va qoidani tuzadi. Noto'g'ri qiymatda ValueError."""
+        free_ad_count = _non_negative_int(
+            config.get('free_ad_count', DEFAULT_FREE_AD_COUNT), 'free_ad_count', maximum=MAX_FREE_AD_COUNT
+        )
+        reset_interval_days = _non_negative_int(
+            config.get('reset_interval_days', DEFAULT_RESET_INTERVAL_DAYS), 'reset_interval_days',
+            minimum=1, maximum=MAX_RESET_INTERVAL_DAYS
+        )
+
+        invite_levels = config.get('invite_levels') or {}
+        if not isinstance(invite_levels, dict):
+            raise ValueError(f"'invite_levels' lug'at bo'lishi kerak (berilgan: {invite_levels!r})")
+
+        max_required = DEFAULT_MAX_REQUIRED
+        levels = {}
+        for key, value in invite_levels.items():
+            if key == 'max':
+                max_required = _non_negative_int(value, 'invite_levels.max')
+                continue
+            if not str(key).isdecimal() or not 1 <= int(key) <= MAX_INVITE_LEVEL:
+                raise ValueError(
+                    f"'invite_levels' kaliti 1..{MAX_INVITE_LEVEL} oralig'idagi son yoki 'max' bo'lishi kerak (berilgan: {key!r})"
+                )
+            levels[int(key)] = _non_negative_int(value, f'invite_levels.{key}')
+
+        # Darajalar orasidagi bo'sh joylar (masalan faqat '1' va '3') max bilan to'ldiriladi
+        top_level = max(levels, default=0)
+        thresholds = [levels.get(level, max_required) for level in range(1, top_level + 1)]
+        return cls(free_ad_count, reset_interval_days, thresholds, max_required)
+
+    def current_epoch(self):
+        """Joriy tsikl raqami. Statistikadagi epoch undan farq qilsa, hisoblagichlar 0 deb olinadi."""
+        return cycle_epoch(self.reset_interval_days)
+
+    def required_for(self, ad_cycle_count):
+        """Joriy tsikl uchun talab qilinadigan odamlar soni (0 - bepul xabar)."""
+        if ad_cycle_count < self.free_ad_count:
+            return 0
+        level = ad_cycle_count - self.free_ad_count
+        if level < len(self.thresholds):
+            return self.thresholds[level]
+        return self.max_required
+
+
+DEFAULT_POLICY = LimitPolicy.from_config({})
+
+
+def compile_policy(config):
+    """Sozlamalardan qoida tuzadi; fayldagi noto'g'ri sozlama botni to'xtatmasligi uchun standart qoidaga qaytadi."""
+    try:
+        return LimitPolicy.from_config(config)
+    except ValueError as e:
+        print(f"⚠️ Noto'g'ri guruh sozlamasi, standart limit ishlatiladi: {e}")
+        return DEFAULT_POLICY
+
+
+def evaluate_quota(policy, ad_cycle_count, invited_count, invited_count_change=0, consume_free=True):
+    """Limitni tekshiradi. (QuotaResult, yangi_ad_cycle_count, yangi_invited_count) qaytaradi.
+
+    Kvota yetarli bo'lsa, xabar tsikli bittaga oshadi va ortiqcha takliflar keyingi
+    tsiklga o'tadi. consume_free=False bo'lsa, bepul xabar kvotasi ishlatilmaydi
+    (yangi a'zo qo'shilganda faqat taklif talabi bajarilgani tekshiriladi).
+    """
+    invited = invited_count + invited_count_change
+    required = policy.required_for(ad_cycle_count)
+
+    if required == 0:
+        if consume_free:
+            return QuotaResult(True, 0, invited, 0), ad_cycle_count + 1, invited
+        return QuotaResult(False, 0, invited, 0), ad_cycle_count, invited
+
+    if invited >= required:
+        return QuotaResult(True, required, invited, 0), ad_cycle_count + 1, invited - required
+
+    return QuotaResult(False, required, invited, required - invited), ad_cycle_count, invited
@@ -1,45 +1,69 @@
 import os
-import re
+import hmac
 import asyncio
-from datetime import datetime
+import secrets
 from dotenv import load_dotenv
 
 # Aiogram importlari
 from aiogram import Bot, Dispatcher, types, F
-from aiogram.enums import ChatMemberStatus, ContentType
+from aiogram.enums import ContentType
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.client.default import DefaultBotProperties
 from aiogram.filters import Command, StateFilter 
 from aiogram.utils.keyboard import InlineKeyboardBuilder 
 
-# Xatolar uchun importlar (Flood Control uchun)
-from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter 
-
 # Web server va HTTP so'rovlar uchun kutubxona (Render uchun)
 from aiohttp import web, ClientSession 
 
+load_dotenv()
+
+from admin_cache import admin_roster
+from deletion_scheduler import deletion_scheduler
+from limit_warnings import limit_warnings
+from update_locks import update_serializer
+from recorder import update_recorder
+from send_queue import send_queue, send_priority, PRIORITY_HIGH, PRIORITY_LOW
+from metrics import registry, handler_metrics, api_metrics, limit_decisions, chat_label
+from limits import LimitPolicy
+
 # --- storage faylini import qilamiz ---
+# STORAGE_BACKEND=json (standart, storage.py) yoki sqlite (sqlite_storage.py)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
 try:
-    from storage import (
-        get_config, update_config, get_user_stats, update_user_stats,
-        get_required_channels, add_channel, delete_channel, get_all_chat_configs,
-        add_new_group
-    )
+    if STORAGE_BACKEND == "sqlite":
+        from sqlite_storage import (
+            get_config, update_config,
+            get_required_channels, add_channel, delete_channel, get_all_chat_configs,
+            add_new_group, get_policy, consume_ad_quota, flush_stats, stats_flusher
+        )
+    else:
+        from storage import (
+            get_config, update_config,
+            get_required_channels, add_channel, delete_channel, get_all_chat_configs,
+            add_new_group, get_policy, consume_ad_quota, flush_stats, stats_flusher
+        )
 except ImportError:
     print("❌ Xato: 'storage.py' fayli topilmadi. Ma'lumotlar bazasi mantig'i uchun bu fayl zarur.")
     exit()
 
-load_dotenv()
-
 # --- BOT INITS ---
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 # ADMIN_TELEGRAM_ID olib tashlandi!
 RENDER_URL_FOR_PING = os.getenv("RENDER_URL_FOR_PING") 
 WEB_SERVER_PORT = int(os.getenv("PORT", 10000))
 
+# BOT_MODE=polling (standart), webhook yoki sharded. Webhook rejimida update'lar shu veb-serverga keladi;
+# sharded rejimida bu jarayon faqat update'larni chat bo'yicha shard jarayonlariga tarqatadi (sharding.py).
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL") # Tashqi manzil, masalan https://bot.onrender.com (bo'sh bo'lsa setWebhook chaqirilmaydi)
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") # Bo'sh bo'lsa, WEBHOOK_URL bilan tasodifiy secret yaratiladi
+WEBHOOK_MAX_IN_FLIGHT = int(os.getenv("WEBHOOK_MAX_IN_FLIGHT", 100)) # Bir vaqtda qayta ishlanadigan update'lar
+
 bot = None
 dp = None
+bot_info = None  # Botning o'zi (get_me) - main() da bir marta olinadi, handlerlar faqat o'qiydi
 
 # --- ADMIN FSM HOLATLARI (Saqlanib qoldi) ---
 class AdminStates(StatesGroup):
@@ -60,6 +84,70 @@ async def handle_ping(request):
     """Render'dan kelgan soxta so'rovlarga javob beradi."""
     return web.Response(text="Bot is awake and polling!")
 
+# --- METRIKALAR ---
+
+registry.gauge('limitbot_deletion_queue_size', "O'chirilishini kutayotgan xabarlar",
+               lambda: deletion_scheduler.stats()['pending'])
+registry.gauge('limitbot_send_queue_backlog', "Yuborish navbatidagi so'rovlar", lambda: send_queue.backlog())
+registry.gauge('limitbot_updates_in_flight', "Qayta ishlanayotgan update'lar",
+               lambda: update_serializer.stats()['in_flight'])
+registry.gauge('limitbot_live_limit_warnings', "Jonli limit ogohlantirishlari",
+               lambda: limit_warnings.stats()['live'])
+
+async def handle_metrics(request):
+    """Prometheus matn formatidagi metrikalar."""
+    return web.Response(body=registry.render().encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+# --- WEBHOOK ---
+
+webhook_slots = None  # asyncio.Semaphore(WEBHOOK_MAX_IN_FLIGHT) - make_web_app() da yaratiladi
+webhook_tasks = set()
+
+async def process_webhook_update(update):
+    try:
+        await dp.feed_raw_update(bot, update)
+    except Exception as e:
+        print(f"❌ Update'ni qayta ishlashda xato: {e}")
+    finally:
+        webhook_slots.release()
+
+def ensure_webhook_secret():
+    """Webhook faqat secret token bilan ishlaydi. WEBHOOK_SECRET bo'lmasa, WEBHOOK_URL o'rnatilgan bo'lsa
+    tasodifiy secret yaratiladi (setWebhook'ga beriladi), aks holda False - rejim ishga tushmaydi."""
+    global WEBHOOK_SECRET
+    if WEBHOOK_SECRET:
+        return True
+    if not WEBHOOK_URL:
+        print("❌ WEBHOOK_SECRET o'rnatilmagan: webhook rejimi secret'siz ishga tushmaydi.")
+        return False
+    WEBHOOK_SECRET = secrets.token_urlsafe(32)
+    os.environ["WEBHOOK_SECRET"] = WEBHOOK_SECRET  # Shard jarayonlari ham shu secret bilan tekshiradi
+    print("🔐 WEBHOOK_SECRET o'rnatilmagan: tasodifiy secret yaratildi va setWebhook'ga beriladi.")
+    return True
+
+def check_webhook_secret(request):
+    """So'rov Telegram'dan kelganini secret token bo'yicha tekshiradi (secret bo'lmasa - rad etiladi)."""
+    return bool(WEBHOOK_SECRET) and hmac.compare_digest(
+        request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), WEBHOOK_SECRET
+    )
+
+async def handle_webhook(request):
+    """Telegram yuborgan update'ni qabul qiladi va fon rejimida qayta ishlaydi."""
+    if not check_webhook_secret(request):
+        return web.Response(status=401)
+
+    try:
+        update = await request.json()
+    except ValueError:
+        return web.Response(status=400)
+
+    # Limit to'lgan bo'lsa javob kechiktiriladi - Telegram yangi update yuborishni sekinlashtiradi
+    await webhook_slots.acquire()
+    task = asyncio.create_task(process_webhook_update(update))
+    webhook_tasks.add(task)
+    task.add_done_callback(webhook_tasks.discard)
+    return web.Response()
+
 async def periodic_pinger(url, interval_seconds=300):
     """Render serverni uyg'oq ushlab turadi."""
     if not url:
@@ -75,27 +163,6 @@ async def periodic_pinger(url, interval_seconds=300):
             except Exception as e:
                 print(f"❌ Ping yuborishda xato: {e}")
 
-# --- BOT YORDAMCHI FUNKSIYALARI ---
-
-async def delete_message_later(chat_id, message_id, delay=330):
-    """Xabarni belgilangan vaqt o'tgach o'chiradi."""
-    await asyncio.sleep(delay)
-    try:
-        await bot.delete_message(chat_id, message_id)
-    except Exception:
-        pass
-
-async def get_required_members(config, ad_cycle_count):
-    """Foydalanuvchi reklama tashlash uchun qancha odam taklif qilishi kerakligini hisoblaydi."""
-
-    if ad_cycle_count < config.get('free_ad_count', 1):
-        return 0
-
-    current_level = ad_cycle_count - config.get('free_ad_count', 1) + 1
-    invite_levels = config.get('invite_levels', {})
-
-    return invite_levels.get(str(current_level), invite_levels.get('max', 10))
-
 # --- ADMIN PANEL INTERFEYSI (Tugmalar Saqlanib qoldi) ---
 
 def get_admin_main_menu(user_id):
@@ -296,22 +363,26 @@ async def save_config_value(message: types.Message, state: FSMContext, is_invite
     config = get_config(chat_id)
 
     if is_invite_level:
-        # Level'larni o'zgartirish
-        if 'invite_levels' not in config:
-            config['invite_levels'] = {}
-            
+        # Level'larni o'zgartirish (keshdagi sozlamani o'zgartirmaslik uchun nusxa olinadi)
         key_map = {'level_1': '1', 'level_2': '2', 'level_max': 'max'}
-        level_key = key_map.get(config_key)
-        
-        config['invite_levels'][level_key] = new_value
-        update_config(chat_id, 'invite_levels', config['invite_levels'])
+        real_key = 'invite_levels'
+        real_value = dict(config.get('invite_levels', {}))
+        real_value[key_map.get(config_key)] = new_value
         
     else:
         # Oddiy kalitlarni o'zgartirish
         key_map = {'free_count': 'free_ad_count', 'interval': 'reset_interval_days'}
         real_key = key_map.get(config_key)
-        
-        update_config(chat_id, real_key, new_value)
+        real_value = new_value
+
+    # Yangi sozlama bilan limit qoidasi tuzilishini oldindan tekshiramiz
+    try:
+        LimitPolicy.from_config(dict(config, **{real_key: real_value}))
+    except ValueError as e:
+        await message.reply(f"❌ Xato: {e}")
+        return
+
+    update_config(chat_id, real_key, real_value)
 
     await state.set_state(AdminStates.CONFIG_MENU)
     await message.answer(f"✅ **Sozlama muvaffaqiyatli yangilandi!**\n\nID: {chat_id}", reply_markup=get_config_menu(chat_id))
@@ -392,7 +463,7 @@ async def handle_new_member(message: types.Message):
         inviter_user_id = message.from_user.id
         inviter_full_name = message.from_user.full_name
 
-        bot_id = (await bot.get_me()).id
+        bot_id = bot_info.id
 
         member_links = []
         real_new_members_count = 0
@@ -403,10 +474,7 @@ async def handle_new_member(message: types.Message):
             member_links.append(f"[{member.full_name}](tg://user?id={member.id})")
 
         if not member_links:
-            try:
-                await message.delete()
-            except Exception:
-                pass
+            send_queue.submit(message.delete(), f"SISTEM XABARINI O'CHIRISHDA XATO ({chat_id})")
             return
 
         if len(member_links) == 1:
@@ -420,27 +488,19 @@ async def handle_new_member(message: types.Message):
 
         if inviter_user_id != bot_id:
 
-            update_user_stats(
-                user_id=inviter_user_id,
-                chat_id=chat_id,
-                invited_count_change=real_new_members_count
+            quota = consume_ad_quota(
+                inviter_user_id, chat_id, get_policy(chat_id),
+                invited_count_change=real_new_members_count,
+                consume_free=False
             )
 
-            config = get_config(chat_id)
-            updated_stats = get_user_stats(inviter_user_id, chat_id, config)
-
-            required_members = await get_required_members(config, updated_stats['current_ad_cycle_count'])
-            current_invited = updated_stats.get('invited_members_count', 0)
-
-            if required_members > 0 and current_invited >= required_members:
-
-                remaining_members = current_invited - required_members
+            required_members = quota.required
+            current_invited = quota.invited
 
-                update_user_stats(inviter_user_id, chat_id, ad_used=True, reset_invited=True)
-                if remaining_members > 0:
-                    update_user_stats(inviter_user_id, chat_id, invited_count_change=remaining_members)
+            if quota.allowed:
 
                 is_limit_released = True
+                limit_warnings.forget(chat_id, inviter_user_id)
 
                 inviter_link = f"[{inviter_full_name}](tg://user?id={inviter_user_id})"
                 success_text = (
@@ -448,74 +508,55 @@ async def handle_new_member(message: types.Message):
                     f"Talab qilingan miqdor **({required_members})** bajarildi.\n\n"
                     f"Sizning xabar yuborish cheklovingiz olib tashlandi. Xabar yuborishingiz mumkin!"
                 )
-                try:
-                    await bot.send_message(chat_id, success_text, parse_mode="Markdown")
-                except Exception as e:
-                    print(f"❌ SUCCESS XABAR YUBORISHDA XATO: {e}")
+                send_queue.submit(bot.send_message(chat_id, success_text, parse_mode="Markdown"),
+                                  "SUCCESS XABAR YUBORISHDA XATO")
 
             if not is_limit_released and inviter_user_id != bot_id:
                  inviter_link = f"[{inviter_full_name}](tg://user?id={inviter_user_id})"
                  welcome_text += f"\n\n**{inviter_link}**, siz **{real_new_members_count}** ta odam qo'shganingiz uchun rahmat! 😊"
 
 
-        try:
-            sent_message = await message.answer(welcome_text, parse_mode="Markdown")
-            asyncio.create_task(delete_message_later(sent_message.chat.id, sent_message.message_id, delay=330))
-        except Exception as e:
-             print(f"❌ SALOMLASHISH XABAR YUBORISHDA XATO: {e}")
-
+        # Yuborish va o'chirishlar navbatga qo'yiladi, natijasi kutilmaydi (send_queue.submit)
+        with send_priority(PRIORITY_LOW):
+            send_queue.submit(
+                message.answer(welcome_text, parse_mode="Markdown"), "SALOMLASHISH XABAR YUBORISHDA XATO",
+                on_sent=lambda sent: deletion_scheduler.schedule(sent.chat.id, sent.message_id, delay=330)
+            )
 
-        try:
-            await message.delete()
-        except Exception:
-            print(f"❌ SISTEM XABARINI O'CHIRISHDA XATO: {message.chat.id}")
+        send_queue.submit(message.delete(), f"SISTEM XABARINI O'CHIRISHDA XATO ({chat_id})")
 
 
 async def handle_group_messages(message: types.Message):
     """Guruhdagi oddiy xabarlarni limit bo'yicha cheklaydi."""
     global bot
 
-    if message.chat.type not in ('group', 'supergroup') or message.from_user.id == (await bot.get_me()).id:
+    if message.chat.type not in ('group', 'supergroup') or message.from_user.id == bot_info.id:
         return
 
     user_id = message.from_user.id
     chat_id = message.chat.id
 
-    try:
-        member = await bot.get_chat_member(chat_id, user_id)
-        if member.status in [ChatMemberStatus.CREATOR, ChatMemberStatus.ADMINISTRATOR]:
-            return
-    except Exception:
-        pass
-
-    config = get_config(chat_id)
-    user_stats = get_user_stats(user_id, chat_id, config)
+    if await admin_roster.is_admin(bot, chat_id, user_id):
+        return
 
-    required_members = await get_required_members(config, user_stats['current_ad_cycle_count'])
+    quota = consume_ad_quota(user_id, chat_id, get_policy(chat_id))
+    limit_decisions.inc(chat_label(chat_id), 'allowed' if quota.allowed else 'blocked')
 
-    if required_members == 0:
-        update_user_stats(user_id, chat_id, ad_used=True)
+    if quota.allowed:
         return
 
-    current_invited = user_stats.get('invited_members_count', 0)
-
-    if current_invited >= required_members:
-        remaining_members = current_invited - required_members
+    current_invited = quota.invited
+    missing = quota.missing
 
-        update_user_stats(user_id, chat_id, ad_used=True, reset_invited=True)
-        if remaining_members > 0:
-            update_user_stats(user_id, chat_id, invited_count_change=remaining_members)
+    # Yuborish va o'chirishlar navbatga qo'yiladi, natijasi kutilmaydi: RetryAfter pauzasida ham
+    # handler update slotini darhol bo'shatadi
+    send_queue.submit(message.delete(), "LIMIT BUZILGANDA XABARNI O'CHIRISHDA XATO")
 
+    # Oyna ichida foydalanuvchining jonli ogohlantirishi bo'lsa, yangisi yuborilmaydi
+    action, warning = limit_warnings.claim(chat_id, user_id, missing)
+    if action == 'skip':
         return
 
-    missing = required_members - current_invited
-
-    try:
-        await message.delete()
-    except Exception as e:
-        print(f"❌ LIMIT BUZILGANDA XABARNI O'CHIRISHDA XATO: {e}")
-        pass
-
     user_link = f"[{message.from_user.full_name}](tg://user?id={user_id})"
 
     message_text = (
@@ -523,33 +564,38 @@ async def handle_group_messages(message: types.Message):
         f"Keyingi xabar uchun yana **{missing}** ta odam qo'shing. \n"
         f"Sizning joriy hisobingiz: {current_invited} ta odam.\n\n"
     )
-    
-    # 🛑 FLOOD CONTROL NI HAL QILISH UCHUN TRY-EXCEPT BLOKI
-    try:
-        sent_message = await bot.send_message(
-            chat_id,
-            message_text,
-            parse_mode="Markdown"
-        )
-        asyncio.create_task(delete_message_later(sent_message.chat.id, sent_message.message_id, delay=330))
 
-    except TelegramRetryAfter as e:
-        print(f"⚠️ Flood Control: {e.retry_after} soniya kutilyapti...")
-        await asyncio.sleep(e.retry_after) 
-        
-        try:
-            sent_message = await bot.send_message(
-                chat_id,
-                message_text,
-                parse_mode="Markdown"
+    if action == 'edit':
+        message_text += f"⚠️ Qoidabuzarliklar soni: {warning.violations}"
+        with send_priority(PRIORITY_HIGH):
+            send_queue.submit(
+                bot.edit_message_text(message_text, chat_id=chat_id, message_id=warning.message_id, parse_mode="Markdown"),
+                "LIMIT OGOHLANTIRISHINI YANGILASHDA XATO",
+                on_error=lambda e: limit_warnings.forget(chat_id, user_id)
             )
-            asyncio.create_task(delete_message_later(sent_message.chat.id, sent_message.message_id, delay=330))
+        return
 
-        except Exception as retry_e:
-            print(f"❌ LIMIT OGOHLANTIRISHI YUBORISHDA XATO (Qayta urinish): {retry_e}")
+    def warning_sent(sent_message):
+        limit_warnings.set_message_id(chat_id, user_id, sent_message.message_id)
+        deletion_scheduler.schedule(sent_message.chat.id, sent_message.message_id, delay=330)
+
+    # Flood control (RetryAfter) send_queue'da hal qilinadi: ogohlantirish navbatda birinchi turadi.
+    # Xabar ID'si kelguncha limit_warnings keyingi buzilishlarda yangi ogohlantirish yubormaydi.
+    with send_priority(PRIORITY_HIGH):
+        send_queue.submit(
+            bot.send_message(chat_id, message_text, parse_mode="Markdown"), "LIMIT OGOHLANTIRISHI YUBORISHDA XATO",
+            on_sent=warning_sent, on_error=lambda e: limit_warnings.forget(chat_id, user_id)
+        )
 
-    except Exception as e:
-        print(f"❌ LIMIT OGOHLANTIRISHI YUBORISHDA NOMA'LUM XATO: {e}")
+
+async def handle_chat_member_update(event: types.ChatMemberUpdated):
+    """A'zo statusi o'zgarganda adminlar keshini yangilaydi."""
+    admin_roster.apply_member_update(event.chat.id, event.new_chat_member.user.id, event.new_chat_member.status)
+
+
+async def handle_my_chat_member_update(event: types.ChatMemberUpdated):
+    """Botning o'z statusi o'zgarganda guruh adminlari ro'yxatini qayta oladi."""
+    admin_roster.invalidate(event.chat.id)
 
 
 async def handle_my_id_command(message: types.Message):
@@ -562,6 +608,17 @@ async def handle_my_id_command(message: types.Message):
 
 def setup_handlers(dp: Dispatcher):
 
+    # UPDATE_RECORD_FILE berilsa, kelgan update'lar benchmarks/replay.py uchun yozib olinadi
+    if update_recorder.enabled:
+        dp.update.outer_middleware(update_recorder)
+
+    # Bir foydalanuvchining update'lari navbat bilan, turli foydalanuvchilarniki parallel
+    dp.update.outer_middleware(update_serializer)
+
+    # Har bir handler bajarilish vaqti /metrics uchun
+    for observer in (dp.message, dp.callback_query, dp.chat_member, dp.my_chat_member):
+        observer.middleware(handler_metrics)
+
     # MESSAGE HANDLERS (Admin va oddiy)
     dp.message.register(handle_start, Command("start"))
     dp.message.register(handle_my_id_command, Command("myid"))
@@ -590,19 +647,52 @@ def setup_handlers(dp: Dispatcher):
         and message.content_type in (ContentType.TEXT, ContentType.PHOTO, ContentType.VIDEO, ContentType.AUDIO, ContentType.DOCUMENT, ContentType.ANIMATION, ContentType.STICKER)
     )
 
+    # Adminlar keshini yangilab turish uchun
+    dp.chat_member.register(handle_chat_member_update)
+    dp.my_chat_member.register(handle_my_chat_member_update)
+
 
 async def start_polling():
     """Botning Telegram serveri bilan ulanishini boshlaydi."""
     global bot, dp
     print("🚀 Bot Polling (Telegram so'rovlari) ishga tushdi.")
-    await dp.start_polling(bot)
+    await bot.delete_webhook() # Avval webhook o'rnatilgan bo'lsa, polling ishlamaydi
+    await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+
+async def register_webhook(bot, allowed_updates):
+    """Webhook'ni Telegram'da ro'yxatdan o'tkazadi (WEBHOOK_URL bo'lsa)."""
+    if WEBHOOK_URL:
+        await bot.set_webhook(
+            WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=allowed_updates,
+            max_connections=min(WEBHOOK_MAX_IN_FLIGHT, 100)
+        )
+        print(f"🚀 Webhook o'rnatildi: {WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}")
+    else:
+        print(f"⚠️ WEBHOOK_URL o'rnatilmagan: setWebhook chaqirilmadi, update'lar faqat {WEBHOOK_PATH} ga lokal yuboriladi.")
+
+async def start_webhook():
+    """Webhook rejimi: update'lar veb-serverga keladi."""
+    await register_webhook(bot, dp.resolve_used_update_types())
+    await asyncio.Event().wait() # Veb-server ishlayveradi
+
+def make_web_app():
+    """/ping, /metrics va (webhook rejimida) webhook endpoint'i bilan aiohttp ilovasi."""
+    global webhook_slots
+
+    app = web.Application()
+    app.add_routes([web.get('/ping', handle_ping), web.get('/metrics', handle_metrics)])
+    if BOT_MODE == "webhook":
+        webhook_slots = asyncio.Semaphore(WEBHOOK_MAX_IN_FLIGHT)
+        app.add_routes([web.post(WEBHOOK_PATH, handle_webhook)])
+    return app
 
 async def start_server():
     """Veb-serverni ishga tushiradi (Renderning 'always on' bo'lishi uchun)."""
     global WEB_SERVER_PORT
 
-    app = web.Application()
-    app.add_routes([web.get('/ping', handle_ping)])
+    app = make_web_app()
 
     runner = web.AppRunner(app)
     await runner.setup()
@@ -613,23 +703,54 @@ async def start_server():
     print(f"🌐 Veb-server {WEB_SERVER_PORT}-portda ishga tushdi.")
 
 
-async def main():
-    global bot, dp
+def create_bot():
+    return Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
+
+async def init_bot(new_bot):
+    """Bot, dispatcher va fon vazifalarini tayyorlaydi (oddiy rejim va har bir shard uchun umumiy)."""
+    global bot, dp, bot_info
+
+    bot = new_bot
+    bot.session.middleware(send_queue) # Barcha yuborish/o'chirish/javoblar umumiy navbat orqali
+    bot.session.middleware(api_metrics) # Navbatdan keyin: Telegram'ga haqiqatda ketgan so'rovlar sanaladi
+    bot_info = await bot.get_me()
+    dp = Dispatcher()
 
+    setup_handlers(dp) # Handlers ni sozlaymiz
+
+    asyncio.create_task(stats_flusher())
+    asyncio.create_task(deletion_scheduler.run(bot))
+
+
+async def main():
     if not BOT_TOKEN:
         print("❌ BOT_TOKEN .env faylida topilmadi!")
         return
 
-    bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-    dp = Dispatcher()
+    if BOT_MODE in ("webhook", "sharded") and not ensure_webhook_secret():
+        return
 
-    setup_handlers(dp) # Handlers ni sozlaymiz
+    if BOT_MODE == "sharded":
+        from sharding import run_front
+        await run_front()
+        return
+    if STORAGE_BACKEND == "json":
+        from sharding import rebalance_stats
+        rebalance_stats(None) # Avval sharded rejimda ishlagan bo'lsa, statistika bitta to'plamga qaytariladi
+
+    await init_bot(create_bot())
 
     await start_server()
     if RENDER_URL_FOR_PING:
         asyncio.create_task(periodic_pinger(RENDER_URL_FOR_PING))
 
-    await start_polling()
+    try:
+        if BOT_MODE == "webhook":
+            await start_webhook()
+        else:
+            await start_polling()
+    finally:
+        flush_stats()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,227 @@
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Prometheus matn formatidagi yengil metrikalar (tashqi kutubxonasiz). /metrics endpoint'i
+# registry.render() ni qaytaradi. Kuzatish - lug'atdan olish va bir nechta qo'shish, shuning uchun
+# productionda yoqilgan holda qoldirish mumkin. Modul faqat stdlib'ga bog'liq (storage.py ham ishlatadi);
+# aiogram middleware'lari oddiy chaqiriladigan obyektlar sifatida yozilgan.
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# chat_id label'i bilan alohida kuzatiladigan guruhlar soni (har bir jarayonda); qolganlari chat_id="other"
+METRICS_MAX_CHATS = int(os.getenv("METRICS_MAX_CHATS", 100))
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class _HistogramValue:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value, *labels):
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = _HistogramValue(len(self.buckets) + 1)
+        entry.counts[bisect_left(self.buckets, value)] += 1
+        entry.sum += value
+        entry.count += 1
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, entry in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), entry.counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, [le])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {entry.sum}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {entry.count}"
+
+
+class GaugeCallback:
+    """Qiymati /metrics so'ralganda hisoblanadigan gauge: fn() -> son yoki {label_qiymatlari: son}."""
+
+    def __init__(self, name, documentation, fn, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"⚠️ {self.name} metrikasini hisoblashda xato: {e}")
+            return
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for labels, number in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {number}"
+
+
+class LabelLimiter:
+    """Label qiymatlari sonini cheklaydi: dastlabki `limit` ta qiymat o'zicha, keyingilari 'other'."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._values = set()
+
+    def __call__(self, value):
+        value = str(value)
+        if value in self._values:
+            return value
+        if len(self._values) >= self.limit:
+            return 'other'
+        self._values.add(value)
+        return value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, fn, labelnames=()):
+        return self.register(GaugeCallback(name, documentation, fn, labelnames))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def merge_rendered(parts, label):
+    """Bir nechta jarayonning render() matnlarini bittaga birlashtiradi: har bir qatorga label="qiymat"
+    qo'shiladi, HELP/TYPE esa har bir metrika uchun bir marta. parts - [(qiymat, matn)]."""
+    families = {}  # nom -> [HELP/TYPE qatorlari, namunalar]
+    for value, text in parts:
+        family = None
+        extra = f'{label}="{value}"'
+        for line in text.splitlines():
+            if line.startswith('# '):
+                kind, name = line.split(' ', 3)[1:3]
+                family = families.setdefault(name, [{}, []])
+                family[0].setdefault(kind, line)
+                continue
+            if not line or family is None:
+                continue
+            name, _, rest = line.partition('{')
+            if rest:
+                family[1].append(f"{name}{{{extra},{rest}")
+            else:
+                name, _, number = line.partition(' ')
+                family[1].append(f"{name}{{{extra}}} {number}")
+    lines = []
+    for headers, samples in families.values():
+        lines.extend(headers.values())
+        lines.extend(samples)
+    return '\n'.join(lines) + '\n'
+
+# --- Umumiy metrikalar ---
+handler_seconds = registry.histogram(
+    'limitbot_handler_seconds', "Handler bajarilish vaqti", ['handler'])
+storage_seconds = registry.histogram(
+    'limitbot_storage_seconds', "Storage o'qish/yozish vaqti", ['backend', 'op'])
+storage_bytes = registry.counter(
+    'limitbot_storage_bytes_total', "Storage o'qigan/yozgan baytlar", ['backend', 'op'])
+api_calls = registry.counter(
+    'limitbot_telegram_api_calls_total', "Telegram Bot API chaqiruvlari", ['method'])
+api_errors = registry.counter(
+    'limitbot_telegram_api_errors_total', "Telegram Bot API xatolari", ['method', 'error'])
+api_seconds = registry.histogram(
+    'limitbot_telegram_api_seconds', "Telegram Bot API javob vaqti", ['method'])
+limit_decisions = registry.counter(
+    'limitbot_limit_decisions_total', "Limit bo'yicha ruxsat etilgan/bloklangan xabarlar", ['chat_id', 'result'])
+chat_label = LabelLimiter(METRICS_MAX_CHATS)  # limit_decisions uchun
+stats_deltas_dropped = registry.counter(
+    'limitbot_stats_deltas_dropped_total', "Qayta urinishlardan keyin yozilmay tashlangan statistika deltalari")
+
+
+class HandlerMetrics:
+    """Observer'ning ichki middleware'i: mos kelgan handler nomi bo'yicha vaqtni o'lchaydi."""
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get('handler')
+        name = getattr(getattr(handler_object, 'callback', None), '__name__', 'unknown')
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            handler_seconds.observe(time.perf_counter() - start, name)
+
+
+class ApiMetrics:
+    """bot.session middleware'i: Telegram'ga ketgan har bir so'rovni sanaydi va o'lchaydi."""
+
+    async def __call__(self, make_request, bot, method):
+        name = type(method).__name__
+        api_calls.inc(name)
+        start = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            api_errors.inc(name, type(e).__name__)
+            raise
+        finally:
+            api_seconds.observe(time.perf_counter() - start, name)
+
+
+handler_metrics = HandlerMetrics()
+api_metrics = ApiMetrics()
@@ -0,0 +1,628 @@
+"""Ma'lumotlarni backendlar orasida oqim bilan ko'chirish: JSON fayllar, SQLite va Supabase.
+
+Manba va maqsad:
+    json:<papka>      storage.py fayllari: config.json, channels.json, stats.d/ (+ stats.journal); manba
+                      sifatida eski stats.bin/stats.json, chat_config.json va user_stats.json ham o'qiladi
+    sqlite:<fayl>     sqlite_storage.py sxemasi
+    supabase[:<url>]  database.py jadvallari (url berilmasa SUPABASE_URL; kalit SUPABASE_KEY)
+
+Yozuvlar Supabase jadvallari ustunlariga keltiriladi:
+    chat_config        chat_id, free_ad_count, reset_interval_days, invite_levels
+    user_stats         chat_id, user_id, current_ad_cycle_count, invited_members_count, cycle_epoch
+    required_channels  channel_username
+Epochi saqlanmagan eski statistika uchun cycle_epoch oxirgi tiklanish/reklama sanasi va guruhning
+reset_interval_days qiymatidan hisoblanadi; sanasi ham yo'q yozuvlar cycle_epoch=null bilan o'tadi.
+
+Statistika MIGRATE_BATCH qatorlik paketlarda oqadi: JSON fayllar bo'laklab tahlil qilinadi (xotirada
+bir vaqtda bitta foydalanuvchi yoki guruh yozuvi bo'ladi), stats.d/ guruhma-guruh, SQLite va Supabase
+sahifalab o'qiladi. SQLite'ga har paket bitta tranzaksiyada executemany bilan, Supabase'ga bitta upsert
+so'rovi bilan (bir vaqtda MIGRATE_PARALLEL tagacha) yoziladi. JSON maqsadda statistika stats_table
+ustunlarida (~20 bayt/juftlik) yig'iladi va oxirida o'zgargan guruhlar stats.d/ ga yoziladi.
+Maqsaddagi mavjud yozuvlar kalit bo'yicha ustidan yoziladi, qolganlari o'zgarmaydi. JSON yoki SQLite
+maqsaddan foydalanayotgan bot ko'chirish vaqtida to'xtatilgan bo'lishi kerak.
+
+Ishga tushirish: python -m migrate <manba> <maqsad>
+    masalan: python -m migrate json:. sqlite:bot.sqlite3
+"""
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import asyncio
+from collections import deque
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+import storage
+import sqlite_storage
+from binary_snapshot import SUPPORTED as BINARY_SNAPSHOT_SUPPORTED, load_stats
+from limits import cycle_epoch
+from rest_client import PostgrestClient
+from stats_shards import INDEX_FILE, open_stats
+from stats_table import NO_EPOCH, StatsTable
+
+MIGRATE_BATCH = int(os.getenv("MIGRATE_BATCH", 5000))
+MIGRATE_PARALLEL = int(os.getenv("MIGRATE_PARALLEL", 4))  # Supabase'ga bir vaqtdagi upsert so'rovlari
+MIGRATE_RETRIES = 3
+PROGRESS_INTERVAL = 2.0  # Oraliq hisobot, soniya
+JSON_CHUNK = 1 << 20
+
+STATS_COLUMNS = ('chat_id', 'user_id', 'current_ad_cycle_count', 'invited_members_count', 'cycle_epoch')
+
+
+# --- Yozuvlarni umumiy ko'rinishga keltirish ---
+
+def _config(data):
+    """{free_ad_count, reset_interval_days, invite_levels (dict)}; yetishmagan maydonlar standartdan."""
+    config = sqlite_storage._default_config()
+    for key in config:
+        if data.get(key) is not None:
+            config[key] = data[key]
+    if isinstance(config['invite_levels'], str):
+        config['invite_levels'] = json.loads(config['invite_levels'])
+    return config
+
+
+def _interval_lookup(configs):
+    default = sqlite_storage.DEFAULT_CONFIG['reset_interval_days']
+
+    def reset_interval_days(chat_id):
+        config = configs.get(int(chat_id))
+        return config['reset_interval_days'] if config else default
+    return reset_interval_days
+
+
+def _epoch(epoch):
+    return None if epoch == NO_EPOCH else epoch
+
+
+@lru_cache(maxsize=65536)
+def _day_epoch(reset_interval_days, day):
+    return cycle_epoch(reset_interval_days, day)  # Eski yozuvlarda sanalar ko'p takrorlanadi
+
+
+def _legacy_row(chat_id, user_id, stats, reset_interval_days):
+    """binary_snapshot.legacy_epoch bilan bir xil: cycle_epoch, bo'lmasa oxirgi tiklanish/reklama sanasidan."""
+    epoch = stats.get('cycle_epoch')
+    if epoch is None:
+        day = stats.get('last_reset_date') or stats.get('last_ad_timestamp')
+        epoch = _day_epoch(reset_interval_days(chat_id), day) if day else None
+    return (
+        int(chat_id), int(user_id),
+        stats.get('current_ad_cycle_count') or 0, stats.get('invited_members_count') or 0, epoch
+    )
+
+
+def _chat_rows(chat_id, chat):
+    for user_id, cycle, invited, epoch in zip(*chat.columns()):
+        yield chat_id, user_id, cycle, invited, _epoch(epoch)
+
+
+def _table_rows(table):
+    for chat_id in sorted(table.chats):
+        yield from _chat_rows(chat_id, table.chats[chat_id])
+
+
+def _batches(rows, size=MIGRATE_BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- Katta JSON fayllarni bo'laklab o'qish ---
+
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+_DELIMITERS = ',:]} \t\r\n'
+
+
+class JsonMembers:
+    """JSON obyekt a'zolarini fayldan bo'laklab o'qiydi va (kalitlar, qiymat) juftliklarini beradi.
+    descend(kalitlar) True bo'lgan obyekt qiymatlari ichiga kiriladi, qolganlari butunligicha o'qiladi."""
+
+    def __init__(self, f, chunk_size=JSON_CHUNK):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buffer = ''
+        self._pos = 0
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        # Bo'lak kamida bufer qoldig'icha: katta qiymat qayta-qayta boshidan tahlil qilinmasin
+        chunk = self._f.read(max(self._chunk_size, len(self._buffer) - self._pos))
+        if not chunk:
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError("JSON kutilmaganda tugadi")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"JSON: '{char}' kutilgan, '{self._buffer[self._pos]}' topildi")
+        self._pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            if (end == len(self._buffer) or self._buffer[end] not in _DELIMITERS) and self._fill():
+                continue  # Bufer chegarasida kesilgan son ("1." + "5") to'liq emas
+            self._pos = end
+            return value
+
+    def members(self, descend, keys=()):
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            path = keys + (self._value(),)
+            self._expect(':')
+            if self._peek() == '{' and descend(path):
+                yield from self.members(descend, path)
+            else:
+                yield path, self._value()
+            if self._peek() == ',':
+                self._pos += 1
+            else:
+                self._expect('}')
+                return
+
+
+def iter_json_members(path, descend):
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from JsonMembers(f).members(descend)
+
+
+def stats_json_rows(path, reset_interval_days):
+    """stats.json qatorlari: ustunli {"_format": 2, "chats": {...}} yoki eski {user_id: {chat_id: stats}}.
+    Bitta foydalanuvchi yozuvi kichik - u butunligicha o'qiladi, faqat "chats" ichiga kiriladi."""
+    for keys, value in iter_json_members(path, lambda keys: keys == ('chats',)):
+        if keys[0] == 'chats':
+            chat_id = int(keys[1])
+            for user_id, cycle, invited, epoch in zip(*value):
+                yield chat_id, user_id, cycle, invited, _epoch(epoch)
+        elif not keys[0].startswith('_'):
+            for chat_id, stats in value.items():
+                yield _legacy_row(chat_id, keys[0], stats, reset_interval_days)
+
+
+def chat_user_rows(path, reset_interval_days):
+    """user_stats.json qatorlari: {"<chat_id>_<user_id>": stats} va {"<chat_id>": {"<user_id>": stats}} aralash."""
+    for keys, value in iter_json_members(path, lambda keys: len(keys) == 1 and '_' not in keys[0]):
+        if len(keys) == 2:
+            yield _legacy_row(keys[0], keys[1], value, reset_interval_days)
+        elif not keys[0].startswith('_'):
+            chat_id, _, user_id = keys[0].rpartition('_')
+            yield _legacy_row(chat_id, user_id, value, reset_interval_days)
+
+
+# --- Manbalar ---
+
+class JsonSource:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    async def configs(self):
+        configs = {}
+        for name in ('chat_config.json', 'config.json'):  # Ikkalasida bo'lsa config.json ustun
+            path = self._path(name)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    for chat_id, data in json.load(f).items():
+                        configs[int(chat_id)] = _config(data)
+        return configs
+
+    async def channels(self):
+        path = self._path('channels.json')
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return [channel['channel_username'] for channel in json.load(f) if channel.get('channel_username')]
+
+    def _journals(self):
+        journal_path = self._path('stats.journal')
+        return [path for path in (journal_path + '.1', journal_path) if os.path.exists(path)]
+
+    def _has_binary(self):
+        return BINARY_SNAPSHOT_SUPPORTED and os.path.exists(self._path('stats.bin'))
+
+    def _has_shards(self):
+        return os.path.exists(os.path.join(self._path('stats.d'), INDEX_FILE))
+
+    def _legacy_table(self, reset_interval_days):
+        """Guruhlarga hali bo'linmagan eski snapshot: (StatsTable, seq)."""
+        json_path = self._path('stats.json')
+        if self._has_binary():
+            return load_stats(self._path('stats.bin'))
+        if os.path.exists(json_path):
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            snapshot_seq = data.pop('_seq', 0)
+            return StatsTable.from_json(data, reset_interval_days), snapshot_seq
+        return StatsTable(), 0
+
+    def storage_state(self, reset_interval_days, split=False):
+        """storage.py holati (snapshot + journal): (jadval, oxirgi seq). Jadval - stats.d/ guruh fayllari
+        (ShardedStats); ular hali bo'lmasa eski snapshot (StatsTable) yoki split=True da u bo'lingani."""
+        if self._has_shards() or split:
+            data = open_stats(self._path('stats.d'), lambda: self._legacy_table(reset_interval_days))
+            seq, applied_seq = data.index['seq'], data.applied_seq
+        else:
+            data, seq = self._legacy_table(reset_interval_days)
+            applied_seq = lambda chat_id, snapshot_seq=seq: snapshot_seq
+
+        config_file, storage.CONFIG_FILE = storage.CONFIG_FILE, self._path('config.json')  # Eski n/r yozuvlari guruh oralig'ini so'raydi
+        try:
+            for path in self._journals():
+                seq = max(seq, storage._replay_journal(path, data, applied_seq))
+        finally:
+            storage.CONFIG_FILE = config_file
+        return data, seq
+
+    def _storage_rows(self, reset_interval_days):
+        """Guruh fayllari guruhma-guruh o'qiladi; faqat eski stats.json (journalsiz) oqim bilan tahlil qilinadi."""
+        if self._has_shards():
+            data, _ = self.storage_state(reset_interval_days)
+            for chat_id in data.chat_ids():
+                yield from _chat_rows(chat_id, data.chat(chat_id))
+                data.unload(chat_id)
+        elif self._journals() or self._has_binary():
+            yield from _table_rows(self.storage_state(reset_interval_days)[0])
+        elif os.path.exists(self._path('stats.json')):
+            yield from stats_json_rows(self._path('stats.json'), reset_interval_days)
+
+    async def stats(self, configs):
+        reset_interval_days = _interval_lookup(configs)
+        rows = [self._storage_rows(reset_interval_days)]
+        if os.path.exists(self._path('user_stats.json')):
+            rows.append(chat_user_rows(self._path('user_stats.json'), reset_interval_days))
+        for part in rows:
+            for batch in _batches(part):
+                yield batch
+
+    async def close(self):
+        pass
+
+
+class SqliteSource:
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+    async def configs(self):
+        cursor = self.conn.execute("SELECT chat_id, free_ad_count, reset_interval_days, invite_levels FROM chat_config")
+        return {row[0]: _config(dict(zip(('free_ad_count', 'reset_interval_days', 'invite_levels'), row[1:])))
+                for row in cursor}
+
+    async def channels(self):
+        return [row[0] for row in self.conn.execute("SELECT channel_username FROM required_channels ORDER BY rowid")]
+
+    async def stats(self, configs):
+        reset_interval_days = _interval_lookup(configs)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(user_stats)")}
+        cursor = self.conn.execute(
+            "SELECT chat_id, user_id, current_ad_cycle_count, invited_members_count, "
+            f"{'cycle_epoch' if 'cycle_epoch' in columns else 'NULL'}, last_reset_date FROM user_stats"
+        )
+        while True:
+            rows = cursor.fetchmany(MIGRATE_BATCH)
+            if not rows:
+                return
+            yield [
+                row[:5] if row[4] is not None else
+                _legacy_row(row[0], row[1], {'current_ad_cycle_count': row[2], 'invited_members_count': row[3],
+                                             'last_reset_date': row[5]}, reset_interval_days)
+                for row in rows
+            ]
+
+    async def close(self):
+        self.conn.close()
+
+
+def _keyset_after(keys, last):
+    """(k1, k2, ...) > last sharti: 'k1.gt.X,and(k1.eq.X,k2.gt.Y),...' (or=(...) uchun)."""
+    terms = []
+    for i, key in enumerate(keys):
+        conditions = [f"{column}.eq.{value}" for column, value in zip(keys[:i], last)] + [f"{key}.gt.{last[i]}"]
+        terms.append(conditions[0] if len(conditions) == 1 else f"and({','.join(conditions)})")
+    return ','.join(terms)
+
+
+class SupabaseSource:
+    def __init__(self, client):
+        self.client = client
+
+    async def _pages(self, table, keys, columns):
+        """Kalit ustunlari bo'yicha sahifalab o'qiydi (offset emas - har bir sahifa indeksdan boshlanadi)."""
+        last = None
+        while True:
+            query = self.client.table(table).select(columns)
+            for key in keys:
+                query = query.order(key)
+            query = query.limit(MIGRATE_BATCH)
+            if last is not None:
+                query = query.gt(keys[0], last[0]) if len(keys) == 1 else query.or_(_keyset_after(keys, last))
+            rows = (await query.execute()).data
+            if rows:
+                yield rows
+            if len(rows) < MIGRATE_BATCH:
+                return
+            last = [rows[-1][key] for key in keys]
+
+    async def configs(self):
+        configs = {}
+        async for rows in self._pages('chat_config', ('chat_id',), 'chat_id,free_ad_count,reset_interval_days,invite_levels'):
+            for row in rows:
+                configs[int(row['chat_id'])] = _config(row)
+        return configs
+
+    async def channels(self):
+        channels = []
+        async for rows in self._pages('required_channels', ('channel_id',), 'channel_id,channel_username'):
+            channels.extend(row['channel_username'] for row in rows if row.get('channel_username'))
+        return channels
+
+    async def stats(self, configs):
+        reset_interval_days = _interval_lookup(configs)
+        async for rows in self._pages('user_stats', ('chat_id', 'user_id'), ','.join(STATS_COLUMNS) + ',last_ad_timestamp'):
+            yield [_legacy_row(row['chat_id'], row['user_id'], row, reset_interval_days) for row in rows]
+
+    async def close(self):
+        await self.client.close()
+
+
+# --- Maqsadlar ---
+
+class JsonTarget:
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.source = JsonSource(directory)
+        self.configs = {}
+        self.table = None
+        self.seq = 0
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    async def write_configs(self, configs):
+        self.configs = await self.source.configs()
+        self.configs.update(configs)
+        storage._save_data(self._path('config.json'),
+                           {str(chat_id): config for chat_id, config in sorted(self.configs.items())})
+
+    async def write_channels(self, channels):
+        existing = await self.source.channels()
+        added = [name for name in dict.fromkeys(channels) if name not in existing]
+        if added or not os.path.exists(self._path('channels.json')):
+            storage._save_data(self._path('channels.json'),
+                               [{'channel_username': name} for name in existing + added])
+
+    def _load_table(self):
+        """Maqsaddagi mavjud statistika (guruh fayllari) - yangi qatorlar uning ustiga yoziladi. O'zgargan
+        guruhlar journalning oxirgi seq'i bilan yoziladi, shuning uchun journal yozuvlari qayta qo'llanmaydi."""
+        if self.table is None:
+            self.table, self.seq = self.source.storage_state(_interval_lookup(self.configs), split=True)
+        return self.table
+
+    async def write_stats(self, batch):
+        table = self._load_table()
+        for chat_id, user_id, cycle, invited, epoch in batch:
+            table.set(chat_id, user_id, cycle, invited, NO_EPOCH if epoch is None else epoch)
+
+    async def flush(self):
+        if self.table is not None:
+            self.table.save(self.seq)
+
+    async def close(self):
+        pass
+
+
+class SqliteTarget:
+    def __init__(self, path):
+        sqlite_storage.SQLITE_FILE = path
+        self.conn = sqlite_storage._get_conn()  # Sxema va ustun migratsiyalari sqlite_storage bilan bir xil
+
+    async def write_configs(self, configs):
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT INTO chat_config (chat_id, free_ad_count, reset_interval_days, invite_levels) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (chat_id) DO UPDATE SET "
+                "free_ad_count = excluded.free_ad_count, "
+                "reset_interval_days = excluded.reset_interval_days, "
+                "invite_levels = excluded.invite_levels",
+                [(chat_id, config['free_ad_count'], config['reset_interval_days'], json.dumps(config['invite_levels']))
+                 for chat_id, config in configs.items()]
+            )
+
+    async def write_channels(self, channels):
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany("INSERT OR IGNORE INTO required_channels (channel_username) VALUES (?)",
+                                  [(name,) for name in channels])
+
+    async def write_stats(self, batch):
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT INTO user_stats (chat_id, user_id, current_ad_cycle_count, invited_members_count, cycle_epoch) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (chat_id, user_id) DO UPDATE SET "
+                "current_ad_cycle_count = excluded.current_ad_cycle_count, "
+                "invited_members_count = excluded.invited_members_count, "
+                "cycle_epoch = excluded.cycle_epoch, "
+                "last_reset_date = NULL",
+                batch
+            )
+
+    async def flush(self):
+        sqlite_storage.flush_stats()
+
+    async def close(self):
+        pass
+
+
+class SupabaseTarget:
+    def __init__(self, client):
+        self.client = client
+        self._pending = deque()
+
+    async def _upsert(self, table, rows, on_conflict):
+        for attempt in range(MIGRATE_RETRIES):
+            try:
+                await self.client.table(table).upsert(rows, on_conflict=on_conflict, returning='minimal').execute()
+                return
+            except Exception as e:
+                if attempt == MIGRATE_RETRIES - 1:
+                    raise
+                print(f"⚠️ {table} paketini yozishda xato, qayta urinish: {e}")
+                await asyncio.sleep(2 ** attempt)
+
+    async def write_configs(self, configs):
+        rows = [{'chat_id': chat_id, 'free_ad_count': config['free_ad_count'],
+                 'reset_interval_days': config['reset_interval_days'],
+                 'invite_levels': json.dumps(config['invite_levels'])}  # database.py bilan bir xil: JSON matn
+                for chat_id, config in configs.items()]
+        for batch in _batches(rows):
+            await self._upsert('chat_config', batch, 'chat_id')
+
+    async def write_channels(self, channels):
+        # required_channels da channel_username noyob emas - faqat yo'qlari qo'shiladi
+        existing = set(await SupabaseSource(self.client).channels())
+        added = [name for name in dict.fromkeys(channels) if name not in existing]
+        if added:
+            await (self.client.table('required_channels')
+                   .insert([{'channel_username': name, 'is_active': True} for name in added], returning='minimal')
+                   .execute())
+
+    async def write_stats(self, batch):
+        if len(self._pending) >= MIGRATE_PARALLEL:
+            await self._pending.popleft()
+        rows = [dict(zip(STATS_COLUMNS, row)) for row in batch]
+        self._pending.append(asyncio.create_task(self._upsert('user_stats', rows, 'chat_id,user_id')))
+
+    async def flush(self):
+        while self._pending:
+            await self._pending.popleft()
+
+    async def close(self):
+        for task in self._pending:
+            task.cancel()
+        await self.client.close()
+
+
+def open_backend(spec, target=False):
+    """'json:<papka>', 'sqlite:<fayl>' yoki 'supabase[:<url>]' dan manba/maqsad obyekti."""
+    kind, _, location = spec.partition(':')
+    if kind == 'json':
+        return (JsonTarget if target else JsonSource)(location or '.')
+    if kind == 'sqlite':
+        return (SqliteTarget if target else SqliteSource)(location or sqlite_storage.SQLITE_FILE)
+    if kind == 'supabase':
+        url = location or os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_KEY")
+        if not url or not key:
+            raise ValueError("SUPABASE_URL yoki SUPABASE_KEY topilmadi (.env ni tekshiring).")
+        client = PostgrestClient(url, key)
+        return (SupabaseTarget if target else SupabaseSource)(client)
+    raise ValueError(f"Noma'lum backend: {spec} (json:<papka>, sqlite:<fayl> yoki supabase[:<url>])")
+
+
+# --- Ko'chirish ---
+
+class Progress:
+    """Jadval bo'yicha ko'chirilgan qatorlar soni va tezligi (PROGRESS_INTERVAL da bir chiqariladi)."""
+
+    def __init__(self, table):
+        self.table = table
+        self.rows = 0
+        self.start = self._printed = time.perf_counter()
+
+    def add(self, count):
+        self.rows += count
+        now = time.perf_counter()
+        if now - self._printed >= PROGRESS_INTERVAL:
+            self._printed = now
+            self._report(now, "⏳")
+
+    def _report(self, now, mark):
+        elapsed = max(now - self.start, 1e-9)
+        print(f"{mark} {self.table}: {self.rows} qator | {self.rows / elapsed:.0f} qator/s | {elapsed:.1f} s", flush=True)
+
+    def done(self):
+        self._report(time.perf_counter(), "✅")
+        return self.rows
+
+
+async def migrate(source, target):
+    """Sozlamalar, kanallar va statistikani ko'chiradi. {jadval: qatorlar} qaytaradi."""
+    counts = {}
+
+    progress = Progress('chat_config')
+    configs = await source.configs()
+    await target.write_configs(configs)
+    progress.add(len(configs))
+    counts['chat_config'] = progress.done()
+
+    progress = Progress('required_channels')
+    channels = await source.channels()
+    await target.write_channels(channels)
+    progress.add(len(channels))
+    counts['required_channels'] = progress.done()
+
+    progress = Progress('user_stats')
+    async for batch in source.stats(configs):
+        await target.write_stats(batch)
+        progress.add(len(batch))
+    await target.flush()
+    counts['user_stats'] = progress.done()
+    return counts
+
+
+async def run(source_spec, target_spec):
+    source = open_backend(source_spec)
+    target = open_backend(target_spec, target=True)
+    try:
+        return await migrate(source, target)
+    finally:
+        await source.close()
+        await target.close()
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        return
+    load_dotenv()
+    asyncio.run(run(sys.argv[1], sys.argv[2]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import atexit
+import asyncio
+
+# Kelgan update'larni keyinchalik qayta o'ynatish (benchmarks/replay.py) uchun JSONL faylga yozib boradi.
+# UPDATE_RECORD_FILE bo'sh bo'lsa o'chirilgan. Handler faqat qatorni xotiradagi buferga qo'shadi;
+# diskka fon vazifasi (alohida oqimda) yozadi. Bufer to'lib qolsa yangi update'lar tashlab yuboriladi -
+# yozib olish botni hech qachon sekinlashtirmaydi. Fayl UPDATE_RECORD_MAX_BYTES dan oshganda
+# <fayl>.1, <fayl>.2 ... ga aylantiriladi (eng ko'pi UPDATE_RECORD_BACKUPS ta).
+# Qator formati: {"t": unix_vaqt, "u": <Telegram update JSON>}
+UPDATE_RECORD_FILE = os.getenv("UPDATE_RECORD_FILE", "")
+UPDATE_RECORD_MAX_BYTES = int(os.getenv("UPDATE_RECORD_MAX_BYTES", 64 * 1024 * 1024))
+UPDATE_RECORD_BACKUPS = int(os.getenv("UPDATE_RECORD_BACKUPS", 3))
+UPDATE_RECORD_BUFFER = int(os.getenv("UPDATE_RECORD_BUFFER", 10000))
+UPDATE_RECORD_FLUSH_INTERVAL = 1.0
+
+
+class UpdateRecorder:
+    """dp.update uchun tashqi middleware: har bir update'ni buferga qo'shadi va fon vazifasi yozadi."""
+
+    def __init__(self, path=UPDATE_RECORD_FILE, max_bytes=UPDATE_RECORD_MAX_BYTES,
+                 backups=UPDATE_RECORD_BACKUPS, buffer_size=UPDATE_RECORD_BUFFER):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._wakeup = None
+        self._writer = None
+        self._size = None
+        self.recorded = 0
+        self.dropped = 0
+        self.written_bytes = 0
+        self.rotations = 0
+        self.errors = 0
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    async def __call__(self, handler, event, data):
+        self.record(event)
+        return await handler(event, data)
+
+    def record(self, update):
+        if len(self._buffer) >= self.buffer_size:
+            self.dropped += 1
+            return
+        self._buffer.append(f'{{"t":{time.time():.3f},"u":{update.model_dump_json(exclude_none=True, by_alias=True)}}}\n')
+        self.recorded += 1
+        self._ensure_started()
+        if len(self._buffer) >= self.buffer_size // 2:
+            self._wakeup.set()
+
+    def _ensure_started(self):
+        if self._writer is None or self._writer.done():
+            self._wakeup = asyncio.Event()
+            self._writer = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), UPDATE_RECORD_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Buferdagi qatorlarni fon oqimida faylga yozadi."""
+        lines, self._buffer = self._buffer, []
+        if lines:
+            await asyncio.to_thread(self._write, lines)
+
+    def flush_sync(self):
+        lines, self._buffer = self._buffer, []
+        if lines:
+            self._write(lines)
+
+    def _write(self, lines):
+        try:
+            if self._size is None:
+                self._size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            if self._size >= self.max_bytes:
+                self._rotate()
+            chunk = ''.join(lines).encode('utf-8')
+            with open(self.path, 'ab') as f:
+                f.write(chunk)
+            self._size += len(chunk)
+            self.written_bytes += len(chunk)
+        except Exception as e:
+            print(f"❌ Update'larni yozib olishda xato: {e}")
+            self.errors += 1
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._size = 0
+        self.rotations += 1
+
+    def stats(self):
+        return {
+            'buffered': len(self._buffer),
+            'recorded': self.recorded,
+            'dropped': self.dropped,
+            'written_bytes': self.written_bytes,
+            'rotations': self.rotations,
+            'errors': self.errors,
+        }
+
+
+update_recorder = UpdateRecorder()
+atexit.register(update_recorder.flush_sync)
+
+
+def read_records(path):
+    """Yozib olingan faylni (t, update_dict) juftliklari sifatida o'qiydi. Oddiy update JSON qatorlari ham qabul qilinadi."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if 'u' in record and 'update_id' not in record:
+                yield record.get('t'), record['u']
+            else:
+                yield None, record
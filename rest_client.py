@@ -0,0 +1,158 @@
+import os
+import json
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+from metrics import storage_bytes, storage_seconds
+
+# Supabase PostgREST API uchun yengil async client (supabase-py o'rniga).
+# Barcha so'rovlar bitta aiohttp sessiyasi orqali keep-alive ulanishlar puli bilan yuboriladi.
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", 20))
+SUPABASE_KEEPALIVE = float(os.getenv("SUPABASE_KEEPALIVE", 30))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", 10))
+
+
+class PostgrestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"PostgREST {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class APIResponse:
+    """supabase-py dagi kabi natija: .data (ro'yxat yoki single() da bitta obyekt)."""
+
+    __slots__ = ('data', 'status')
+
+    def __init__(self, data, status):
+        self.data = data
+        self.status = status
+
+
+class Query:
+    """supabase-py uslubidagi zanjirli so'rov: client.table('t').select('*').eq('id', 1).execute()."""
+
+    def __init__(self, client, table):
+        self._client = client
+        self._path = table
+        self._method = 'GET'
+        self._params = []
+        self._headers = {}
+        self._body = None
+        self._single = False
+
+    def select(self, columns='*'):
+        self._method = 'GET'
+        self._params.append(('select', columns))
+        return self
+
+    def insert(self, rows, returning='representation'):
+        self._method = 'POST'
+        self._body = rows
+        self._headers['Prefer'] = f"return={returning}"
+        return self
+
+    def upsert(self, rows, on_conflict=None, returning='representation'):
+        """returning='minimal' - katta paketlarda server yozilgan qatorlarni qaytarmaydi."""
+        self._method = 'POST'
+        self._body = rows
+        self._headers['Prefer'] = f"return={returning},resolution=merge-duplicates"
+        if on_conflict:
+            self._params.append(('on_conflict', on_conflict))
+        return self
+
+    def update(self, values):
+        self._method = 'PATCH'
+        self._body = values
+        self._headers['Prefer'] = 'return=representation'
+        return self
+
+    def delete(self):
+        self._method = 'DELETE'
+        self._headers['Prefer'] = 'return=representation'
+        return self
+
+    def eq(self, column, value):
+        self._params.append((column, f"eq.{value}"))
+        return self
+
+    def gt(self, column, value):
+        self._params.append((column, f"gt.{value}"))
+        return self
+
+    def or_(self, filters):
+        """filters - PostgREST sharti, masalan 'a.gt.1,and(a.eq.1,b.gt.2)'."""
+        self._params.append(('or', f"({filters})"))
+        return self
+
+    def order(self, column, desc=False):
+        # Takroriy chaqiruvlar bitta order=a.asc,b.asc parametriga qo'shiladi
+        ordering = f"{column}.{'desc' if desc else 'asc'}"
+        for i, (name, value) in enumerate(self._params):
+            if name == 'order':
+                self._params[i] = ('order', f"{value},{ordering}")
+                return self
+        self._params.append(('order', ordering))
+        return self
+
+    def limit(self, count):
+        self._params.append(('limit', str(count)))
+        return self
+
+    def single(self):
+        self._single = True
+        self._headers['Accept'] = 'application/vnd.pgrst.object+json'
+        return self
+
+    async def execute(self):
+        return await self._client.request(self._method, self._path, self._params, self._body, self._headers, self._single)
+
+
+class PostgrestClient:
+    def __init__(self, url, key, pool_size=SUPABASE_POOL_SIZE, keepalive=SUPABASE_KEEPALIVE, timeout=SUPABASE_TIMEOUT):
+        self.base_url = url.rstrip('/') + '/rest/v1/'
+        self.key = key
+        self.pool_size = pool_size
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = TCPConnector(limit=self.pool_size, keepalive_timeout=self.keepalive)
+            self._session = ClientSession(
+                connector=connector,
+                timeout=ClientTimeout(total=self.timeout),
+                headers={
+                    'apikey': self.key,
+                    'Authorization': f"Bearer {self.key}",
+                    'Content-Type': 'application/json'
+                },
+                json_serialize=lambda data: json.dumps(data, separators=(',', ':'))
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def table(self, name):
+        return Query(self, name)
+
+    async def rpc(self, function, params=None):
+        """Serverdagi SQL funksiyasini chaqiradi (POST /rest/v1/rpc/<function>)."""
+        return await self.request('POST', f"rpc/{function}", [], params or {}, {}, False)
+
+    async def request(self, method, path, params, body, headers, single):
+        session = self._get_session()
+        with storage_seconds.time('supabase', method):
+            async with session.request(method, self.base_url + path, params=params, json=body, headers=headers) as response:
+                text = await response.text()
+        storage_bytes.inc('supabase', 'read', amount=len(text))
+        if response.status >= 400:
+            raise PostgrestError(response.status, text)
+        data = json.loads(text) if text else None
+        if data is None and not single:
+            data = []
+        return APIResponse(data, response.status)
@@ -0,0 +1,248 @@
+import os
+import time
+import asyncio
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, DeleteMessage, DeleteMessages, EditMessageText, SendMessage
+
+# Telegram'ga chiquvchi xabarlar uchun yagona navbat (bot.session middleware'i sifatida ulanadi).
+# Global va har bir chat uchun token bucket'lar Telegram limitlariga mos keladi; RetryAfter
+# kelganda barcha yuboruvchilar birgalikda kutadi. Ustuvorlik: limit ogohlantirishlari va
+# callback javoblari salomlashish xabarlaridan oldin yuboriladi.
+SEND_GLOBAL_PER_SECOND = float(os.getenv("SEND_GLOBAL_PER_SECOND", 30))  # bot bo'yicha umumiy
+SEND_GROUP_PER_MINUTE = float(os.getenv("SEND_GROUP_PER_MINUTE", 20))    # bitta guruhga
+SEND_PRIVATE_PER_SECOND = float(os.getenv("SEND_PRIVATE_PER_SECOND", 1))  # bitta shaxsiy chatga
+SEND_QUEUE_WORKERS = int(os.getenv("SEND_QUEUE_WORKERS", 8))
+SEND_MAX_RETRIES = 3
+SEND_MAX_AGE = float(os.getenv("SEND_MAX_AGE", 60))  # shundan uzoq kutgan xabar eskirgan hisoblanadi
+
+PRIORITY_HIGH = 0    # limit ogohlantirishlari, callback javoblari
+PRIORITY_NORMAL = 1  # admin panel javoblari, o'chirishlar
+PRIORITY_LOW = 2     # salomlashish xabarlari
+
+# Navbatdan o'tadigan metodlar; qolganlari (getMe, getChatAdministrators, ...) to'g'ridan-to'g'ri
+QUEUED_METHODS = (SendMessage, EditMessageText, DeleteMessage, DeleteMessages, AnswerCallbackQuery)
+# Chatga yangi xabar qo'yadigan metodlar - faqat ular chat limitiga hisoblanadi
+CHAT_LIMITED_METHODS = (SendMessage,)
+
+_priority = ContextVar('send_priority', default=None)
+
+
+@contextmanager
+def send_priority(priority):
+    """Blok ichidagi Bot API chaqiruvlari uchun navbat ustuvorligini belgilaydi."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Token mavjud bo'lishigacha qolgan vaqt (0 - hozir bor)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def is_full(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class SendQueue(BaseRequestMiddleware):
+    """Ustuvorlikli navbat, token bucket'lar va umumiy RetryAfter pauzasi."""
+
+    def __init__(self, workers=SEND_QUEUE_WORKERS, global_per_second=SEND_GLOBAL_PER_SECOND,
+                 group_per_minute=SEND_GROUP_PER_MINUTE, private_per_second=SEND_PRIVATE_PER_SECOND):
+        self.workers = workers
+        self.group_per_minute = group_per_minute
+        self.private_per_second = private_per_second
+        self._queue = None
+        self._loop = None
+        self._tasks = []
+        self._seq = itertools.count()
+        self._global = TokenBucket(global_per_second, global_per_second)
+        self._chats = {}
+        self._paused_until = 0.0
+        self._deferred = 0
+        self.sent = 0
+        self.failed = 0
+        self.expired = 0
+        self.retry_after_hits = 0
+        self.max_backlog = 0
+        self._waits = {}  # ustuvorlik -> [yuborilganlar soni, umumiy kutish]
+        self._submitted = set()  # submit() bilan yuborilib, hali tugamagan chaqiruvlar
+
+    def set_global_rate(self, per_second):
+        """Umumiy limitni o'zgartiradi (masalan, bir nechta shard bitta bot limitini bo'lishganda)."""
+        self._global = TokenBucket(per_second, per_second)
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.PriorityQueue()
+            self._deferred = 0
+            self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= 10000:
+                now = time.monotonic()
+                self._chats = {key: b for key, b in self._chats.items() if not b.is_full(now)}
+            if isinstance(chat_id, int) and chat_id > 0:
+                bucket = TokenBucket(self.private_per_second, 3)
+            else:
+                bucket = TokenBucket(self.group_per_minute / 60, self.group_per_minute)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    async def __call__(self, make_request, bot, method):
+        if not isinstance(method, QUEUED_METHODS):
+            return await make_request(bot, method)
+
+        self._ensure_started()
+        priority = _priority.get()
+        if priority is None:
+            priority = PRIORITY_HIGH if isinstance(method, AnswerCallbackQuery) else PRIORITY_NORMAL
+
+        future = self._loop.create_future()
+        job = [make_request, bot, method, future, time.monotonic(), 0]
+        self._queue.put_nowait((priority, next(self._seq), job))
+        self.max_backlog = max(self.max_backlog, self.backlog())
+        return await future
+
+    def submit(self, call, error_message, on_sent=None, on_error=None):
+        """Bot API chaqiruvini (awaitable) natijasini kutmasdan navbatga qo'yadi: handler RetryAfter
+        pauzasi davomida update slotini band qilib turmaydi. Natija on_sent(natija) ga beriladi,
+        xato esa error_message bilan logga yoziladi va on_error(xato) ga beriladi.
+        Ustuvorlik (send_priority) chaqirilgan joydagidan olinadi."""
+        task = asyncio.ensure_future(call)
+        self._submitted.add(task)
+        task.add_done_callback(lambda done: self._finish_submitted(done, error_message, on_sent, on_error))
+        return task
+
+    def _finish_submitted(self, task, error_message, on_sent, on_error):
+        self._submitted.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        try:
+            if error is None:
+                if on_sent is not None:
+                    on_sent(task.result())
+                return
+            print(f"❌ {error_message}: {error}")
+            if on_error is not None:
+                on_error(error)
+        except Exception as e:
+            print(f"❌ Yuborish natijasini qayta ishlashda xato: {e}")
+
+    async def drain(self):
+        """submit() bilan yuborilgan barcha chaqiruvlar tugashini kutadi."""
+        while self._submitted:
+            await asyncio.gather(*self._submitted, return_exceptions=True)
+
+    def _defer(self, entry, delay):
+        self._deferred += 1
+
+        def requeue():
+            self._deferred -= 1
+            self._queue.put_nowait(entry)
+
+        self._loop.call_later(delay, requeue)
+
+    async def _worker(self):
+        while True:
+            entry = await self._queue.get()
+            make_request, bot, method, future, enqueued_at, attempts = job = entry[2]
+            if future.done():  # Chaqiruvchi bekor qilgan
+                continue
+
+            now = time.monotonic()
+            if isinstance(method, CHAT_LIMITED_METHODS) and now - enqueued_at > SEND_MAX_AGE:
+                # Bir necha daqiqa kechikkan ogohlantirish/salomlashishdan foyda yo'q - navbatni tiqmaymiz
+                self.expired += 1
+                future.set_exception(asyncio.TimeoutError(f"xabar navbatda {SEND_MAX_AGE:.0f} soniyadan ko'p turdi"))
+                continue
+            if self._paused_until > now:
+                await asyncio.sleep(self._paused_until - now)
+                now = time.monotonic()
+
+            if isinstance(method, CHAT_LIMITED_METHODS):
+                bucket = self._chat_bucket(getattr(method, 'chat_id', None))
+                delay = bucket.wait_time(now)
+                if delay:
+                    self._defer(entry, delay)  # Boshqa chatlarning xabarlarini to'sib qo'ymaslik uchun
+                    continue
+                bucket.take()
+
+            delay = self._global.wait_time(now)
+            if delay:
+                await asyncio.sleep(delay)
+            self._global.take()
+
+            try:
+                result = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.retry_after_hits += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                print(f"⚠️ Flood Control: barcha yuborishlar {e.retry_after} soniya to'xtatildi.")
+                job[5] = attempts + 1
+                if job[5] <= SEND_MAX_RETRIES:
+                    self._queue.put_nowait(entry)
+                elif not future.done():
+                    self.failed += 1
+                    future.set_exception(e)
+                continue
+            except Exception as e:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+                continue
+
+            self.sent += 1
+            waits = self._waits.setdefault(entry[0], [0, 0.0])
+            waits[0] += 1
+            waits[1] += time.monotonic() - enqueued_at
+            if not future.done():
+                future.set_result(result)
+
+    def backlog(self):
+        return (self._queue.qsize() if self._queue is not None else 0) + self._deferred
+
+    def stats(self):
+        return {
+            'backlog': self.backlog(),
+            'submitted': len(self._submitted),
+            'max_backlog': self.max_backlog,
+            'sent': self.sent,
+            'failed': self.failed,
+            'expired': self.expired,
+            'retry_after_hits': self.retry_after_hits,
+            'paused_for': round(max(0.0, self._paused_until - time.monotonic()), 3),
+            'avg_wait_ms': {priority: round(total / count * 1e3, 3) for priority, (count, total) in sorted(self._waits.items())},
+        }
+
+
+send_queue = SendQueue()
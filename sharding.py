@@ -0,0 +1,392 @@
+import os
+import re
+import json
+import zlib
+import heapq
+import asyncio
+import tempfile
+import multiprocessing
+
+from aiohttp import ClientSession, UnixConnector, web
+
+# Ko'p jarayonli rejim (BOT_MODE=sharded): SHARD_COUNT ta shard jarayoni, har biri chat_id xeshi
+# bo'yicha o'z guruhlariga egalik qiladi va o'z statistika fayllarini yuritadi. Old jarayon faqat
+# webhook'ni qabul qilib, update'ni Unix socket orqali tegishli shardga yuboradi.
+# Shoshqaloq guruh faqat o'z shardini band qiladi, qolgan guruhlar boshqa yadrolarda ishlaydi.
+# Sozlamalar va kanallar fayllari umumiy (storage.py ularni fayl lock'i bilan o'zgartiradi),
+# shuning uchun rejim JSON backend (STORAGE_BACKEND=json) bilan ishlaydi.
+# Shardlar soni aniq beriladi (yadrolar sonidan olinmaydi) va statistika yonidagi stats.shards.json da
+# saqlanadi: u o'zgarsa (yoki bitta jarayonli rejimga o'tilsa), ishga tushishda statistika guruhlar
+# bo'yicha yangi shardlarga ko'chiriladi (rebalance_stats).
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", 0))
+SHARD_SOCKET_DIR = os.getenv("SHARD_SOCKET_DIR", tempfile.gettempdir())
+SHARD_START_TIMEOUT = 30     # Shard socketi paydo bo'lishini kutish (soniya)
+SHARD_CHECK_INTERVAL = 5     # To'xtab qolgan shardlarni qayta ishga tushirish tekshiruvi (soniya)
+
+# Update turidan chat obyektigacha bo'lgan yo'l
+_CHAT_PATHS = (
+    ('message', 'chat'),
+    ('edited_message', 'chat'),
+    ('callback_query', 'message', 'chat'),
+    ('chat_member', 'chat'),
+    ('my_chat_member', 'chat'),
+    ('chat_join_request', 'chat'),
+)
+
+
+def update_chat_id(update):
+    """Xom update'dan chat_id ni topadi (topilmasa - foydalanuvchi id, u ham bo'lmasa 0)."""
+    for path in _CHAT_PATHS:
+        node = update
+        for key in path:
+            node = node.get(key) if isinstance(node, dict) else None
+        if isinstance(node, dict) and 'id' in node:
+            return node['id']
+    for value in update.values():
+        if isinstance(value, dict) and isinstance(value.get('from'), dict):
+            return value['from'].get('id', 0)
+    return 0
+
+
+def shard_for(chat_id, count):
+    return zlib.crc32(str(chat_id).encode()) % count
+
+
+def shard_socket_path(index):
+    return os.path.join(SHARD_SOCKET_DIR, f"limitbot-shard{index}.sock")
+
+
+def shard_file(path, index):
+    """stats.json -> stats.shard0.json"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{index}{ext}"
+
+
+# --- Statistikani shardlar soniga moslash ---
+
+def _layout_path(stats_file):
+    return os.path.splitext(stats_file)[0] + '.shards.json'
+
+
+def _read_layout(stats_file):
+    """Statistika oxirgi marta nechta shard uchun taqsimlangan (None - bitta jarayon)."""
+    try:
+        with open(_layout_path(stats_file), 'r', encoding='utf-8') as f:
+            return json.load(f)['shard_count']
+    except FileNotFoundError:
+        return None
+
+
+def _stats_stores(stats_file, journal_file, count):
+    """count ta shard (None - bitta jarayon) statistikasining (stats_file, journal_file) juftliklari."""
+    if count is None:
+        return [(stats_file, journal_file)]
+    return [(shard_file(stats_file, index), shard_file(journal_file, index)) for index in range(count)]
+
+
+def _shard_indexes(path):
+    """Diskda path ning qaysi shard nusxalari (path.shardN.*) bor."""
+    root, _ = os.path.splitext(path)
+    pattern = re.compile(re.escape(os.path.basename(root)) + r'\.shard(\d+)\.')
+    indexes = set()
+    for name in os.listdir(os.path.dirname(os.path.abspath(path))):
+        match = pattern.match(name)
+        if match:
+            indexes.add(int(match.group(1)))
+    return indexes
+
+
+def _existing_stores(stats_file, journal_file):
+    """Diskdagi barcha to'plamlar: bitta jarayonniki va istalgan shardlar soni bilan yozilganlari."""
+    indexes = _shard_indexes(stats_file) | _shard_indexes(journal_file)
+    return [(stats_file, journal_file)] + [
+        (shard_file(stats_file, index), shard_file(journal_file, index)) for index in sorted(indexes)
+    ]
+
+
+def _rebalance_deletions(count):
+    """Kutilayotgan o'chirishlarni ham chat bo'yicha yangi shard fayllariga taqsimlaydi
+    (har bir jarayon faqat o'z faylidagi navbatni bajaradi)."""
+    from deletion_scheduler import DeletionScheduler, deletion_scheduler
+
+    base = deletion_scheduler.path
+    sources = [base] + [shard_file(base, index) for index in sorted(_shard_indexes(base))]
+    targets = [base] if count is None else [shard_file(base, index) for index in range(count)]
+    schedulers = {path: DeletionScheduler(path) for path in targets}
+    for path in sources:
+        source = DeletionScheduler(path)
+        source._load()
+        for entry in source._heap:
+            schedulers[targets[0 if count is None else shard_for(entry[1], count)]]._heap.append(entry)
+    for scheduler in schedulers.values():
+        heapq.heapify(scheduler._heap)
+        scheduler._compact()
+    for path in sources:
+        if path not in schedulers and os.path.exists(path):
+            os.remove(path)
+
+
+def rebalance_stats(count):
+    """Statistikani count ta shardga (None - bitta jarayon) moslaydi. Shardlar ishga tushishidan oldin,
+    hech kim yozmayotganda chaqiriladi. Taqsimot o'zgargan bo'lsa, barcha to'plamlarning journallari
+    yig'iladi, guruh fayllari (va kutilayotgan o'chirishlar) shard_for bo'yicha ko'chiriladi va
+    stats.shards.json oxirida yoziladi - uzilib qolsa, keyingi ishga tushishda davom ettiriladi.
+    Ko'chirilgan guruhlar sonini qaytaradi."""
+    import storage
+    from stats_shards import list_shards, read_index, read_shard, shard_path, write_index
+
+    previous = _read_layout(storage.STATS_FILE)
+    if previous == count:
+        return 0
+
+    targets = _stats_stores(storage.STATS_FILE, storage.STATS_JOURNAL_FILE, count)
+    stores = list(dict.fromkeys(_existing_stores(storage.STATS_FILE, storage.STATS_JOURNAL_FILE) + targets))
+    seq = 0
+    for stats_file, journal_file in stores:
+        seq = max(seq, read_index(storage.fold_stats_files(stats_file, journal_file))['seq'])
+
+    target_dirs = [storage._shards_dir(stats_file) for stats_file, _ in targets]
+    moved = 0
+    for stats_file, _ in stores:
+        directory = storage._shards_dir(stats_file)
+        for chat_id in list_shards(directory):
+            target = target_dirs[0 if count is None else shard_for(chat_id, count)]
+            if target == directory:
+                continue
+            if os.path.exists(shard_path(target, chat_id)):
+                # Ikkala to'plamda ham bo'lsa, joriy taqsimotdagi nusxa qoladi
+                print(f"⚠️ {chat_id} guruhi statistikasi {directory} va {target} da: {target} dagisi qoldirildi.")
+                os.remove(shard_path(directory, chat_id))
+                continue
+            os.replace(shard_path(directory, chat_id), shard_path(target, chat_id))
+            moved += 1
+
+    # Indekslar fayllardan qayta tuziladi; seq barcha to'plamlarnikidan katta - yangi journal yozuvlari
+    # ko'chirilgan guruhlarga ham qo'llanadi
+    for stats_file, _ in stores:
+        directory = storage._shards_dir(stats_file)
+        write_index(directory, {'seq': seq, 'chats': {
+            str(chat_id): len(read_shard(directory, chat_id)[0]) for chat_id in list_shards(directory)
+        }})
+
+    _rebalance_deletions(count)
+
+    layout_path = _layout_path(storage.STATS_FILE)
+    if count is None:
+        os.remove(layout_path)
+    else:
+        storage._save_data(layout_path, {'shard_count': count})
+    print(f"🔀 Statistika {previous or 1} -> {count or 1} shardga qayta taqsimlandi: {moved} guruh ko'chirildi.")
+    return moved
+
+
+# --- Shard jarayoni ---
+
+async def serve_shard(index, count, bot):
+    """Shard: main.py ning webhook handlerini Unix socket'da ishga tushiradi."""
+    import main
+    import storage
+    from deletion_scheduler import deletion_scheduler
+    from send_queue import send_queue, SEND_GLOBAL_PER_SECOND
+
+    # Har bir shard o'z statistika va o'chirish navbati fayllariga ega
+    storage.STATS_FILE = shard_file(storage.STATS_FILE, index)
+    storage.STATS_JOURNAL_FILE = shard_file(storage.STATS_JOURNAL_FILE, index)
+    deletion_scheduler.path = shard_file(deletion_scheduler.path, index)
+    # Bot bo'yicha umumiy Telegram limiti shardlar orasida bo'linadi; chat limitlari esa
+    # to'liq shu shardda, chunki chat faqat bitta shardga tegishli
+    send_queue.set_global_rate(SEND_GLOBAL_PER_SECOND / count)
+
+    main.BOT_MODE = "webhook"  # Secret old jarayondan sarlavhada keladi va shu yerda ham tekshiriladi
+    await main.init_bot(bot)
+
+    app = main.make_web_app()
+
+    async def handle_shard_stats(request):
+        return web.json_response({'shard': index, 'in_flight': len(main.webhook_tasks)})
+
+    app.add_routes([web.get('/shard', handle_shard_stats)])
+
+    path = shard_socket_path(index)
+    if os.path.exists(path):
+        os.remove(path)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.UnixSite(runner, path).start()
+    print(f"🧩 Shard {index}/{count} ishga tushdi: {path}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        storage.flush_stats()
+
+
+def run_shard(index, count):
+    """multiprocessing uchun kirish nuqtasi (haqiqiy Bot bilan)."""
+    import main
+    try:
+        asyncio.run(serve_shard(index, count, main.create_bot()))
+    except KeyboardInterrupt:
+        pass
+
+
+def start_shards(count, target=run_shard, args=()):
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    for index in range(count):
+        if os.path.exists(shard_socket_path(index)):
+            os.remove(shard_socket_path(index))  # Oldingi ishga tushirishdan qolgan socket
+        process = context.Process(target=target, args=(index, count) + tuple(args), daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
+
+
+async def wait_for_shards(count):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SHARD_START_TIMEOUT
+    for index in range(count):
+        while not os.path.exists(shard_socket_path(index)):
+            if loop.time() > deadline:
+                raise RuntimeError(f"Shard {index} {SHARD_START_TIMEOUT} soniyada ishga tushmadi")
+            await asyncio.sleep(0.05)
+
+
+# --- Old jarayon ---
+
+class ShardRouter:
+    """Webhook update'larini chat_id bo'yicha shardlarga yuboradi."""
+
+    def __init__(self, count):
+        self.count = count
+        self._sessions = None
+        self.routed = [0] * count
+        self.errors = 0
+
+    def _get_sessions(self):
+        if self._sessions is None:
+            self._sessions = [
+                ClientSession(connector=UnixConnector(path=shard_socket_path(index)))
+                for index in range(self.count)
+            ]
+        return self._sessions
+
+    async def close(self):
+        if self._sessions is not None:
+            for session in self._sessions:
+                await session.close()
+            self._sessions = None
+
+    async def _shard_metrics(self, index):
+        session = self._get_sessions()[index]
+        async with session.get(f"http://shard{index}/metrics") as response:
+            return await response.text()
+
+    async def handle_metrics(self, request):
+        """Barcha shardlarning /metrics javoblari shard="N" yorlig'i bilan, hamda old jarayon ko'rsatkichlari."""
+        from metrics import merge_rendered
+
+        results = await asyncio.gather(*(self._shard_metrics(index) for index in range(self.count)),
+                                       return_exceptions=True)
+        parts = [(index, text) for index, text in enumerate(results) if isinstance(text, str)]
+        front = (
+            ["# HELP limitbot_shard_up Shard /metrics ga javob berdimi", "# TYPE limitbot_shard_up gauge"]
+            + [f'limitbot_shard_up{{shard="{index}"}} {int(isinstance(text, str))}' for index, text in enumerate(results)]
+            + ["# HELP limitbot_shard_routed_total Shardga yuborilgan update'lar", "# TYPE limitbot_shard_routed_total counter"]
+            + [f'limitbot_shard_routed_total{{shard="{index}"}} {routed}' for index, routed in enumerate(self.routed)]
+            + ["# HELP limitbot_shard_route_errors_total Shardga yuborib bo'lmagan update'lar",
+               "# TYPE limitbot_shard_route_errors_total counter", f"limitbot_shard_route_errors_total {self.errors}"]
+        )
+        body = merge_rendered(parts, 'shard') + '\n'.join(front) + '\n'
+        return web.Response(body=body.encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    async def handle_webhook(self, request):
+        import main
+
+        if not main.check_webhook_secret(request):
+            return web.Response(status=401)
+
+        body = await request.read()
+        try:
+            update = json.loads(body)
+        except ValueError:
+            return web.Response(status=400)
+
+        index = shard_for(update_chat_id(update), self.count)
+        try:
+            session = self._get_sessions()[index]
+            # Shard update'ni qabul qilgach javob beradi; u to'lib qolsa, javob kechikadi (backpressure)
+            async with session.post(f"http://shard{index}{main.WEBHOOK_PATH}", data=body, headers={
+                'Content-Type': 'application/json',
+                'X-Telegram-Bot-Api-Secret-Token': main.WEBHOOK_SECRET
+            }) as response:
+                self.routed[index] += 1
+                return web.Response(status=response.status)
+        except Exception as e:
+            print(f"❌ Update'ni shard {index} ga yuborishda xato: {e}")
+            self.errors += 1
+            return web.Response(status=502)  # Telegram update'ni keyinroq qayta yuboradi
+
+    def make_app(self):
+        import main
+
+        app = web.Application()
+        app.add_routes([
+            web.get('/ping', main.handle_ping),
+            web.get('/metrics', self.handle_metrics),
+            web.post(main.WEBHOOK_PATH, self.handle_webhook),
+        ])
+        return app
+
+    def stats(self):
+        return {'routed': list(self.routed), 'errors': self.errors}
+
+
+async def supervise(processes, target=run_shard, args=()):
+    """To'xtab qolgan shard jarayonlarini qayta ishga tushiradi."""
+    context = multiprocessing.get_context('spawn')
+    count = len(processes)
+    while True:
+        await asyncio.sleep(SHARD_CHECK_INTERVAL)
+        for index, process in enumerate(processes):
+            if not process.is_alive():
+                print(f"⚠️ Shard {index} to'xtadi (kod {process.exitcode}), qayta ishga tushirilmoqda.")
+                processes[index] = context.Process(target=target, args=(index, count) + tuple(args), daemon=True)
+                processes[index].start()
+
+
+async def run_front(count=SHARD_COUNT):
+    """BOT_MODE=sharded: shardlarni ishga tushiradi va webhook'ni ularga tarqatadi."""
+    import main
+    from aiogram import Dispatcher
+
+    if count < 1:
+        print("❌ SHARD_COUNT o'rnatilmagan: sharded rejimida shardlar soni aniq berilishi kerak.")
+        return
+    rebalance_stats(count)
+
+    processes = start_shards(count)
+    await wait_for_shards(count)
+
+    router = ShardRouter(count)
+    runner = web.AppRunner(router.make_app())
+    await runner.setup()
+    await web.TCPSite(runner, host='0.0.0.0', port=main.WEB_SERVER_PORT).start()
+    print(f"🌐 Old jarayon {main.WEB_SERVER_PORT}-portda, {count} ta shard bilan ishga tushdi.")
+
+    # allowed_updates ni handlerlar ro'yxatidan olish uchun vaqtinchalik dispatcher
+    dispatcher = Dispatcher()
+    main.setup_handlers(dispatcher)
+    bot = main.create_bot()
+    await main.register_webhook(bot, dispatcher.resolve_used_update_types())
+    await bot.session.close()
+
+    if main.RENDER_URL_FOR_PING:
+        asyncio.create_task(main.periodic_pinger(main.RENDER_URL_FOR_PING))
+
+    try:
+        await supervise(processes)
+    finally:
+        await router.close()
+        for process in processes:
+            process.terminate()
@@ -0,0 +1,241 @@
+import json
+import os
+import sqlite3
+import asyncio
+import atexit
+
+from config_cache import ConfigCache
+from metrics import storage_seconds
+from limits import cycle_epoch, evaluate_quota, stats_epoch
+
+# storage.py bilan bir xil funksiyalar, lekin ma'lumotlar lokal SQLite faylida (WAL rejimi).
+# Har bir so'rov indeks bo'yicha nuqtaviy o'qish/yozish, butun faylni qayta yozish yo'q.
+SQLITE_FILE = os.getenv("SQLITE_FILE", 'bot.sqlite3')
+STATS_FLUSH_INTERVAL = int(os.getenv("STATS_FLUSH_INTERVAL", 30))
+
+DEFAULT_CONFIG = {
+    'free_ad_count': 1,
+    'reset_interval_days': 30,
+    'invite_levels': {'1': 5, '2': 7, 'max': 10}
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_config (
+    chat_id             INTEGER PRIMARY KEY,
+    free_ad_count       INTEGER NOT NULL,
+    reset_interval_days INTEGER NOT NULL,
+    invite_levels       TEXT    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_stats (
+    chat_id                INTEGER NOT NULL,
+    user_id                INTEGER NOT NULL,
+    current_ad_cycle_count INTEGER NOT NULL DEFAULT 0,
+    invited_members_count  INTEGER NOT NULL DEFAULT 0,
+    cycle_epoch            INTEGER,
+    last_reset_date        TEXT,     -- eski yozuvlar uchun (cycle_epoch bo'lmasa undan hisoblanadi)
+    PRIMARY KEY (chat_id, user_id)
+) WITHOUT ROWID;
+DROP INDEX IF EXISTS idx_user_stats_user; -- eski sxemadan: hech bir so'rov ishlatmaydi, faqat yozishni sekinlatadi
+CREATE TABLE IF NOT EXISTS required_channels (
+    channel_username TEXT PRIMARY KEY
+);
+"""
+
+_conn = None
+_config_cache = ConfigCache()
+
+# --- Yordamchi Funksiyalar ---
+
+def _get_conn():
+    """SQLite ulanishini bir marta ochadi va sxemani yaratadi."""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(SQLITE_FILE, isolation_level=None, check_same_thread=False)
+        _conn.row_factory = sqlite3.Row
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.executescript(SCHEMA)
+        columns = {row['name'] for row in _conn.execute("PRAGMA table_info(user_stats)")}
+        if 'cycle_epoch' not in columns:
+            _conn.execute("ALTER TABLE user_stats ADD COLUMN cycle_epoch INTEGER")
+    return _conn
+
+def _config_from_row(row):
+    return {
+        'free_ad_count': row['free_ad_count'],
+        'reset_interval_days': row['reset_interval_days'],
+        'invite_levels': json.loads(row['invite_levels'])
+    }
+
+def flush_stats():
+    """WAL faylini asosiy bazaga ko'chiradi (checkpoint)."""
+    if _conn is None:
+        return 0
+    _conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    return 0
+
+async def stats_flusher(interval_seconds=STATS_FLUSH_INTERVAL):
+    """WAL checkpointini belgilangan oraliqda bajarib turadi."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            flush_stats()
+        except Exception as e:
+            print(f"❌ SQLite checkpointda xato: {e}")
+
+atexit.register(flush_stats)
+
+# --- Guruh Sozlamalari (chat_config) ---
+
+def _default_config():
+    return dict(DEFAULT_CONFIG, invite_levels=dict(DEFAULT_CONFIG['invite_levels']))
+
+def _get_config_entry(chat_id):
+    """Keshdan (versiya, sozlamalar, qoida) yozuvini oladi, kerak bo'lsa bazadan yuklaydi."""
+    entry = _config_cache.get(chat_id)
+    if entry is None:
+        row = _get_conn().execute("SELECT * FROM chat_config WHERE chat_id = ?", (int(chat_id),)).fetchone()
+        entry = _config_cache.put(chat_id, _config_from_row(row) if row is not None else _default_config())
+    return entry
+
+def get_config(chat_id):
+    """Berilgan chat ID uchun sozlamalarni oladi yoki standart sozlamalarni qaytaradi."""
+    return _get_config_entry(chat_id)[1]
+
+def get_policy(chat_id):
+    """Guruhning tuzilgan limit qoidasini (LimitPolicy) qaytaradi."""
+    return _get_config_entry(chat_id)[2]
+
+def update_config(chat_id, key, value):
+    """Guruh sozlamalarini yangilaydi."""
+    if key not in DEFAULT_CONFIG:
+        raise KeyError(key)
+
+    add_new_group(chat_id)
+    if key == 'invite_levels':
+        value = json.dumps(value)
+    _get_conn().execute(f"UPDATE chat_config SET {key} = ? WHERE chat_id = ?", (value, int(chat_id)))
+    _config_cache.invalidate(chat_id)
+
+def get_all_chat_configs():
+    """Barcha sozlamalar o'rnatilgan guruh IDlarini qaytaradi."""
+    rows = _get_conn().execute("SELECT chat_id FROM chat_config ORDER BY chat_id").fetchall()
+    return [str(row['chat_id']) for row in rows]
+
+def add_new_group(chat_id):
+    """Yangi guruhni standart sozlamalar bilan qo'shadi."""
+    cursor = _get_conn().execute(
+        "INSERT OR IGNORE INTO chat_config (chat_id, free_ad_count, reset_interval_days, invite_levels) "
+        "VALUES (?, ?, ?, ?)",
+        (int(chat_id), DEFAULT_CONFIG['free_ad_count'], DEFAULT_CONFIG['reset_interval_days'],
+         json.dumps(DEFAULT_CONFIG['invite_levels']))
+    )
+    if cursor.rowcount > 0:
+        _config_cache.invalidate(chat_id)
+
+def delete_group(chat_id):
+    """Guruh sozlamalarini va unga tegishli statistikani o'chiradi."""
+    conn = _get_conn()
+    with conn:
+        conn.execute("BEGIN")
+        conn.execute("DELETE FROM chat_config WHERE chat_id = ?", (int(chat_id),))
+        conn.execute("DELETE FROM user_stats WHERE chat_id = ?", (int(chat_id),))
+    _config_cache.invalidate(chat_id)
+
+# --- Foydalanuvchi Statistikasi (user_stats) ---
+#
+# cycle_epoch ustuni qo'shilishidan oldingi qatorlarda epoch last_reset_date dan olinadi; o'qish va
+# yozish bitta BEGIN IMMEDIATE tranzaksiyasida.
+
+def _read_stats(conn, key, reset_interval_days):
+    """(ad_cycle_count, invited_count, joriy_epoch) qaytaradi. Hech narsa yozmaydi."""
+    epoch = cycle_epoch(reset_interval_days)
+    with storage_seconds.time('sqlite', 'read'):
+        row = conn.execute(
+            "SELECT current_ad_cycle_count, invited_members_count, cycle_epoch, last_reset_date "
+            "FROM user_stats WHERE chat_id = ? AND user_id = ?", key
+        ).fetchone()
+
+    if row is None or stats_epoch(dict(row), reset_interval_days) != epoch:
+        return 0, 0, epoch
+    return row['current_ad_cycle_count'], row['invited_members_count'], epoch
+
+def _write_stats(conn, key, ad_cycle_count, invited_count, epoch):
+    with storage_seconds.time('sqlite', 'write'):
+        conn.execute(
+            "INSERT INTO user_stats (chat_id, user_id, current_ad_cycle_count, invited_members_count, cycle_epoch) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (chat_id, user_id) DO UPDATE SET "
+            "current_ad_cycle_count = excluded.current_ad_cycle_count, "
+            "invited_members_count = excluded.invited_members_count, "
+            "cycle_epoch = excluded.cycle_epoch",
+            key + (ad_cycle_count, invited_count, epoch)
+        )
+
+def get_user_stats(user_id, chat_id, config):
+    """Foydalanuvchining joriy tsikldagi statistikasini oladi."""
+    cycle_count, invited_count, epoch = _read_stats(
+        _get_conn(), (int(chat_id), int(user_id)), config.get('reset_interval_days', 30)
+    )
+    return {'current_ad_cycle_count': cycle_count, 'invited_members_count': invited_count, 'cycle_epoch': epoch}
+
+def update_user_stats(user_id, chat_id, invited_count_change=0, ad_used=False, reset_invited=False):
+    """Foydalanuvchi statistikasini yangilaydi."""
+    if not invited_count_change and not ad_used and not reset_invited:
+        return
+
+    conn = _get_conn()
+    key = (int(chat_id), int(user_id))
+    reset_interval_days = get_policy(chat_id).reset_interval_days
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        cycle_count, invited_count, epoch = _read_stats(conn, key, reset_interval_days)
+        invited_count = 0 if reset_invited else invited_count + invited_count_change
+        _write_stats(conn, key, cycle_count + (1 if ad_used else 0), invited_count, epoch)
+
+def consume_ad_quota(user_id, chat_id, policy, invited_count_change=0, consume_free=True):
+    """Limitni tekshiradi va kvota yetarli bo'lsa uni bitta tranzaksiyada ishlatadi. QuotaResult qaytaradi."""
+    conn = _get_conn()
+    key = (int(chat_id), int(user_id))
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        cycle_count, invited_count, epoch = _read_stats(conn, key, policy.reset_interval_days)
+        result, new_cycle_count, new_invited = evaluate_quota(
+            policy, cycle_count, invited_count, invited_count_change, consume_free
+        )
+        if new_cycle_count != cycle_count or new_invited != invited_count:
+            _write_stats(conn, key, new_cycle_count, new_invited, epoch)
+    return result
+
+
+def get_group_stats(chat_id):
+    """Guruhning saqlangan statistikasi: [(user_id, ad_cycle_count, invited_count, cycle_epoch)], user_id
+    bo'yicha saralangan. (chat_id, user_id) kaliti tufayli faqat shu guruh qatorlari o'qiladi."""
+    rows = _get_conn().execute(
+        "SELECT user_id, current_ad_cycle_count, invited_members_count, cycle_epoch "
+        "FROM user_stats WHERE chat_id = ? ORDER BY user_id", (int(chat_id),)
+    ).fetchall()
+    return [tuple(row) for row in rows]
+
+def reset_group_stats(chat_id):
+    """Guruhdagi barcha hisoblagichlarni nollaydi (sozlamalar qoladi)."""
+    _get_conn().execute("DELETE FROM user_stats WHERE chat_id = ?", (int(chat_id),))
+
+# --- Majburiy Kanallar (required_channels) ---
+
+def get_required_channels():
+    """Majburiy kanallar ro'yxatini oladi."""
+    rows = _get_conn().execute("SELECT channel_username FROM required_channels ORDER BY rowid").fetchall()
+    return [dict(row) for row in rows]
+
+def add_channel(username):
+    """Yangi majburiy kanal qo'shadi."""
+    cursor = _get_conn().execute(
+        "INSERT OR IGNORE INTO required_channels (channel_username) VALUES (?)", (username,)
+    )
+    return cursor.rowcount > 0
+
+def delete_channel(username):
+    """Majburiy kanalni ro'yxatdan o'chiradi."""
+    cursor = _get_conn().execute("DELETE FROM required_channels WHERE channel_username = ?", (username,))
+    return cursor.rowcount > 0
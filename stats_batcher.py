@@ -0,0 +1,173 @@
+import os
+import time
+import asyncio
+
+from metrics import stats_deltas_dropped
+
+# Statistika o'zgarishlarini yig'ib, bitta so'rovda yuboruvchi batcher.
+# Bir xil (chat_id, user_id) uchun kutilayotgan o'zgarishlar bitta deltaga birlashtiriladi;
+# paket STATS_BATCH_WINDOW_MS o'tganda yoki STATS_BATCH_MAX ta kalit yig'ilganda yuboriladi.
+STATS_BATCH_WINDOW_MS = float(os.getenv("STATS_BATCH_WINDOW_MS", 50))
+STATS_BATCH_MAX = int(os.getenv("STATS_BATCH_MAX", 500))
+# Yozilmagan paket deltalari navbatga qaytariladi va kechikish har safar ikki barobar oshadi;
+# kalit STATS_BATCH_RETRIES marta yozilmasa, u tashlanadi (limitbot_stats_deltas_dropped_total).
+STATS_BATCH_RETRIES = int(os.getenv("STATS_BATCH_RETRIES", 5))
+STATS_BATCH_RETRY_DELAY = float(os.getenv("STATS_BATCH_RETRY_DELAY", 0.5))
+STATS_BATCH_RETRY_MAX_DELAY = 30.0
+
+
+class StatsBatcher:
+    """kalit -> delta navbati. flush_batch(items) - paketni yozuvchi async funksiya,
+    merge(eski, yangi) - bir kalitning ikki deltasini birlashtiradi."""
+
+    def __init__(self, flush_batch, merge, window=STATS_BATCH_WINDOW_MS / 1e3, max_items=STATS_BATCH_MAX,
+                 retries=STATS_BATCH_RETRIES, retry_delay=STATS_BATCH_RETRY_DELAY):
+        self._flush_batch = flush_batch
+        self._merge = merge
+        self.window = window
+        self.max_items = max_items
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._pending = {}      # kalit -> birlashtirilgan delta
+        self._waiter = None     # joriy paket yozilganda natija oladigan future
+        self._timer = None
+        self._tasks = set()
+        self._lock = asyncio.Lock()  # paketlar ketma-ket yoziladi (tartib saqlanadi)
+        self._attempts = {}     # kalit -> muvaffaqiyatsiz yozishlar soni
+        self._failures = 0      # ketma-ket muvaffaqiyatsiz paketlar (kechikish uchun)
+        self.events = 0
+        self.merged = 0
+        self.batches = 0
+        self.items = 0
+        self.flush_errors = 0
+        self.retried = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+    def add(self, key, delta):
+        """Deltani navbatga qo'shadi. Paket yozilganda True/False oladigan future qaytaradi."""
+        self.events += 1
+        if key in self._pending:
+            self.merged += 1
+            self._pending[key] = self._merge(self._pending[key], delta)
+        else:
+            self._pending[key] = delta
+
+        waiter = self._schedule(self.window)
+        self.max_depth = max(self.max_depth, len(self._pending))
+
+        if len(self._pending) >= self.max_items:
+            self._start_flush()
+        return waiter
+
+    def _schedule(self, delay, reschedule=False):
+        """Joriy paket future'ini qaytaradi; paket hali yo'q bo'lsa, uni delay dan keyin yozishni rejalashtiradi."""
+        loop = asyncio.get_running_loop()
+        if self._waiter is None:
+            self._waiter = loop.create_future()
+        elif not reschedule:
+            return self._waiter
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_later(delay, self._start_flush)
+        return self._waiter
+
+    def _requeue(self, items, waiter):
+        """Yozilmagan deltalarni navbatga qaytaradi (keyingi o'zgarishlar bilan birlashtirib) va qayta
+        urinishni kechiktirib rejalashtiradi. Urinishlari tugagan kalitlar tashlanadi."""
+        retry = {}
+        for key, delta in items.items():
+            attempts = self._attempts.get(key, 0) + 1
+            if attempts >= self.retries:
+                self._attempts.pop(key, None)
+                self.dropped += 1
+                stats_deltas_dropped.inc()
+            else:
+                self._attempts[key] = attempts
+                retry[key] = delta
+        if len(retry) < len(items):
+            print(f"❌ {len(items) - len(retry)} ta statistika deltasi {self.retries} urinishdan keyin tashlandi")
+        if not retry:
+            waiter.set_result(False)
+            return
+
+        self.retried += len(retry)
+        for key, delta in retry.items():
+            self._pending[key] = self._merge(delta, self._pending[key]) if key in self._pending else delta
+        delay = min(self.retry_delay * 2 ** (self._failures - 1), STATS_BATCH_RETRY_MAX_DELAY)
+        self._schedule(delay, reschedule=True).add_done_callback(lambda done: waiter.set_result(done.result()))
+
+    def _take(self):
+        """Joriy paketni navbatdan oladi; keyingi add() yangi paket boshlaydi."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = (self._pending, self._waiter)
+        self._pending, self._waiter = {}, None
+        return batch
+
+    def _start_flush(self):
+        task = asyncio.create_task(self._write(*self._take()))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        """Kutilayotgan o'zgarishlarni hoziroq yozadi va oldingi paketlar tugashini kutadi."""
+        return await self._write(*self._take())
+
+    async def _write(self, items, waiter):
+        async with self._lock:
+            if not items:
+                return True
+
+            start = time.perf_counter()
+            try:
+                await self._flush_batch(list(items.items()))
+                ok = True
+            except Exception as e:
+                print(f"⚠️ Statistika paketini yozishda xato ({len(items)} ta yozuv), qayta uriniladi: {e}")
+                self.flush_errors += 1
+                ok = False
+
+            latency = time.perf_counter() - start
+            self.batches += 1
+            self.items += len(items)
+            self.last_flush_latency = latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+            self.total_flush_latency += latency
+            if ok:
+                self._failures = 0
+                for key in items:
+                    self._attempts.pop(key, None)
+                waiter.set_result(True)
+            else:
+                self._failures += 1
+                self._requeue(items, waiter)
+            return ok
+
+    async def wait_for(self, key):
+        """Read-your-writes: kalit bo'yicha yozilmagan o'zgarish bo'lsa, uni yozib bo'lguncha kutadi."""
+        if key in self._pending or self._lock.locked():
+            await self.flush()
+
+    def depth(self):
+        return len(self._pending)
+
+    def stats(self):
+        return {
+            'depth': len(self._pending),
+            'max_depth': self.max_depth,
+            'events': self.events,
+            'merged': self.merged,
+            'batches': self.batches,
+            'items': self.items,
+            'flush_errors': self.flush_errors,
+            'retried': self.retried,
+            'dropped': self.dropped,
+            'last_flush_ms': round(self.last_flush_latency * 1e3, 3),
+            'avg_flush_ms': round(self.total_flush_latency / self.batches * 1e3, 3) if self.batches else 0.0,
+            'max_flush_ms': round(self.max_flush_latency * 1e3, 3),
+        }
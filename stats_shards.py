@@ -0,0 +1,176 @@
+"""storage.py statistikasining guruhlar bo'yicha bo'lingan snapshoti: har bir guruh o'z faylida.
+
+stats.d/
+    index.json     {"seq": yig'ilgan oxirgi journal yozuvi, "chats": {chat_id: qatorlar soni}}
+    <chat_id>.bin  bitta guruhli binary_snapshot; sarlavhadagi seq - shu guruhga qo'llangan oxirgi yozuv
+
+Guruh birinchi murojaatda faqat o'z faylidan yuklanadi, shuning uchun kichik guruhdagi xabar katta
+guruh hajmiga bog'liq emas. Journal yig'ilganda faqat o'zgargan guruhlar qayta yoziladi, o'chirilgan
+guruhning fayli o'chiriladi. Har bir fayl alohida os.replace bilan almashtiriladi va indeks oxirida
+yoziladi; qayta tiklashda journal yozuvi guruhga faqat uning faylidagi seq dan keyingi bo'lsa qo'llanadi.
+Guruh fayli bor-yo'qligi fayl tizimidan aniqlanadi - indeks guruhlar ro'yxati va seq uchun.
+binary_snapshot qo'llab-quvvatlanmaydigan (big-endian) tizimlarda fayllar <chat_id>.json ko'rinishida.
+"""
+import os
+import json
+import tempfile
+
+from binary_snapshot import SUPPORTED as BINARY_SNAPSHOT_SUPPORTED, Snapshot, write_snapshot
+from stats_table import ChatStats, StatsTable
+
+INDEX_FILE = 'index.json'
+SHARD_SUFFIX = '.bin' if BINARY_SNAPSHOT_SUPPORTED else '.json'
+
+
+def shard_path(directory, chat_id):
+    return os.path.join(directory, f"{chat_id}{SHARD_SUFFIX}")
+
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.tmp_')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def read_shard(directory, chat_id):
+    """(ChatStats, seq) yoki fayl bo'lmasa (None, 0)."""
+    path = shard_path(directory, chat_id)
+    if not os.path.exists(path):
+        return None, 0
+    if BINARY_SNAPSHOT_SUPPORTED:
+        snapshot = Snapshot(path)
+        return snapshot.stats_table().chats.get(chat_id), snapshot.seq
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return StatsTable.from_json(data, None).chats.get(chat_id), data['_seq']
+
+
+def write_shard(directory, chat_id, chat, seq):
+    """Bitta guruhni yozadi. Yozilgan baytlarni qaytaradi."""
+    table = StatsTable()
+    table.chats[chat_id] = chat
+    path = shard_path(directory, chat_id)
+    if BINARY_SNAPSHOT_SUPPORTED:
+        return write_snapshot(path, table, seq)
+    data = json.dumps(dict(table.to_json(), _seq=seq), separators=(',', ':')).encode('utf-8')
+    _write_atomic(path, data)
+    return len(data)
+
+
+def list_shards(directory):
+    """Papkadagi guruh fayllari bo'yicha chat_id lar (indeksni o'qimaydi)."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(int(name[:-len(SHARD_SUFFIX)]) for name in os.listdir(directory)
+                  if name.endswith(SHARD_SUFFIX) and not name.startswith('.'))
+
+
+def remove_shard(directory, chat_id):
+    try:
+        os.remove(shard_path(directory, chat_id))
+    except FileNotFoundError:
+        pass
+
+
+def read_index(directory):
+    with open(os.path.join(directory, INDEX_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_index(directory, index):
+    _write_atomic(os.path.join(directory, INDEX_FILE), json.dumps(index, separators=(',', ':')).encode('utf-8'))
+
+
+def split_table(directory, table, seq):
+    """Bitta fayldagi snapshotni (StatsTable) guruh fayllariga bo'ladi. Indeks oxirida yoziladi -
+    u bo'lmasa bo'lish tugamagan hisoblanadi."""
+    os.makedirs(directory, exist_ok=True)
+    index = {'seq': seq, 'chats': {}}
+    for chat_id, chat in table.chats.items():
+        if len(chat):
+            write_shard(directory, chat_id, chat, seq)
+            index['chats'][str(chat_id)] = len(chat)
+    write_index(directory, index)
+
+
+class ShardedStats:
+    """StatsTable bilan bir xil get/set/drop_chat. Guruhlar kerak bo'lganda o'z faylidan yuklanadi."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index = read_index(directory)
+        self.chats = {}     # chat_id -> ChatStats yoki None (statistikasi yo'q)
+        self.seqs = {}      # chat_id -> guruh faylidagi seq
+        self.dirty = set()  # save() da qayta yoziladigan guruhlar
+
+    def chat(self, chat_id):
+        """Guruh statistikasi (ChatStats) yoki None; birinchi murojaatda faylidan o'qiladi."""
+        if chat_id not in self.chats:
+            self.chats[chat_id], self.seqs[chat_id] = read_shard(self.directory, chat_id)
+        return self.chats[chat_id]
+
+    def applied_seq(self, chat_id):
+        """Guruhga qo'llangan oxirgi journal yozuvi: qayta tiklashda undan oldingilari o'tkazib yuboriladi."""
+        self.chat(chat_id)
+        return self.seqs[chat_id]
+
+    def chat_ids(self):
+        """Statistikasi bor guruhlar: indeks + xotirada yaratilganlar - o'chirilganlar. Fayllarni o'qimaydi."""
+        ids = {int(chat_id) for chat_id in self.index['chats']}
+        ids.update(self.chats)
+        return sorted(chat_id for chat_id in ids if self.chats.get(chat_id, True) is not None)
+
+    def __len__(self):
+        return sum(len(self.chat(chat_id)) for chat_id in self.chat_ids())
+
+    def get(self, chat_id, user_id):
+        chat = self.chat(chat_id)
+        return chat.get(user_id) if chat is not None else None
+
+    def set(self, chat_id, user_id, cycle, invited, epoch):
+        chat = self.chat(chat_id)
+        if chat is None:
+            chat = self.chats[chat_id] = ChatStats()
+        chat.set(user_id, cycle, invited, epoch)
+        self.dirty.add(chat_id)
+
+    def drop_chat(self, chat_id):
+        self.chats[chat_id] = None
+        self.seqs.setdefault(chat_id, 0)
+        self.dirty.add(chat_id)
+
+    def unload(self, chat_id):
+        """O'zgarmagan guruhni xotiradan chiqaradi (keyingi murojaatda faylidan qayta o'qiladi)."""
+        if chat_id not in self.dirty:
+            self.chats.pop(chat_id, None)
+            self.seqs.pop(chat_id, None)
+
+    def save(self, seq):
+        """O'zgargan guruhlarni seq bilan yozadi (bo'shlarining fayli o'chiriladi), so'ng indeksni.
+        Yozilgan baytlarni qaytaradi."""
+        written = 0
+        chats = self.index['chats']
+        for chat_id in sorted(self.dirty):
+            chat = self.chats[chat_id]
+            if chat is None or not len(chat):
+                remove_shard(self.directory, chat_id)
+                chats.pop(str(chat_id), None)
+            else:
+                written += write_shard(self.directory, chat_id, chat, seq)
+                chats[str(chat_id)] = len(chat)
+        self.index['seq'] = max(self.index['seq'], seq)
+        write_index(self.directory, self.index)
+        self.dirty.clear()
+        return written
+
+
+def open_stats(directory, load_legacy):
+    """ShardedStats. Papkada indeks hali bo'lmasa load_legacy() -> (StatsTable, seq) bir marta bo'linadi."""
+    if not os.path.exists(os.path.join(directory, INDEX_FILE)):
+        split_table(directory, *load_legacy())
+    return ShardedStats(directory)
@@ -0,0 +1,157 @@
+from array import array
+from bisect import bisect_left
+
+from limits import stats_epoch
+
+# Foydalanuvchi statistikasining ixcham xotiradagi ko'rinishi (storage.py uchun).
+# Har bir guruh uchun user_id bo'yicha saralangan ustunlar (array): id 8 bayt, hisoblagichlar va
+# tsikl epochi 4 baytdan - bitta (guruh, foydalanuvchi) juftligi ~20 bayt. Yangi foydalanuvchilar
+# avval kichik lug'atga tushadi va u ustunlar hajmining 1/8 qismidan oshganda saralangan ustunlarga
+# qo'shiladi (qidiruv - bisect). Epochi noma'lum eski yozuvlar NO_EPOCH bilan saqlanadi.
+NO_EPOCH = -1
+COLUMN_TYPES = ('q', 'i', 'i', 'i')  # ids, cycles, invited, epochs
+MERGE_MIN = 1024  # Lug'at shundan kichik bo'lsa ustunlarga qo'shilmaydi
+
+SNAPSHOT_FORMAT = 2  # stats.json: {"_format": 2, "chats": {chat_id: [ids, cycles, invited, epochs]}}
+
+
+class ChatStats:
+    """Bitta guruh statistikasi: saralangan ustunlar + yangi foydalanuvchilar lug'ati."""
+
+    __slots__ = ('ids', 'cycles', 'invited', 'epochs', 'recent', '_last')
+
+    def __init__(self, ids=None, cycles=None, invited=None, epochs=None):
+        # Ustunlar array yoki binary_snapshot'dagi mmap ustidagi yoziladigan memoryview bo'lishi mumkin
+        self.ids = ids if ids is not None else array('q')
+        self.cycles = cycles if cycles is not None else array('i')
+        self.invited = invited if invited is not None else array('i')
+        self.epochs = epochs if epochs is not None else array('i')
+        self.recent = {}  # user_id -> (cycle, invited, epoch)
+        self._last = (None, -1)  # oxirgi qidiruv: o'qish va undan keyingi yozish bir xil foydalanuvchiga
+
+    def __len__(self):
+        return len(self.ids) + len(self.recent)
+
+    def _find(self, user_id):
+        last_id, index = self._last
+        if last_id == user_id:
+            return index
+        index = bisect_left(self.ids, user_id)
+        if index >= len(self.ids) or self.ids[index] != user_id:
+            index = -1
+        self._last = (user_id, index)
+        return index
+
+    def get(self, user_id):
+        """(ad_cycle_count, invited_count, epoch) yoki None."""
+        row = self.recent.get(user_id)
+        if row is not None:
+            return row
+        index = self._find(user_id)
+        if index < 0:
+            return None
+        return self.cycles[index], self.invited[index], self.epochs[index]
+
+    def set(self, user_id, cycle, invited, epoch):
+        if user_id not in self.recent:
+            index = self._find(user_id)
+            if index >= 0:
+                self.cycles[index] = cycle
+                self.invited[index] = invited
+                self.epochs[index] = epoch
+                return
+        self.recent[user_id] = (cycle, invited, epoch)
+        if len(self.recent) > max(MERGE_MIN, len(self.ids) >> 3):
+            self.merge()
+
+    def merge(self):
+        """Lug'atdagi yozuvlarni saralangan ustunlarga qo'shadi (ustunlar bo'laklab ko'chiriladi)."""
+        if not self.recent:
+            return
+        columns = tuple(memoryview(column) for column in (self.ids, self.cycles, self.invited, self.epochs))
+        merged = tuple(array(typecode) for typecode in COLUMN_TYPES)
+        start = 0
+        for user_id in sorted(self.recent):
+            position = bisect_left(self.ids, user_id, start)
+            for old, new, value in zip(columns, merged, (user_id,) + self.recent[user_id]):
+                new.frombytes(old[start:position].cast('B'))
+                new.append(value)
+            start = position
+        for old, new in zip(columns, merged):
+            new.frombytes(old[start:].cast('B'))
+        self.ids, self.cycles, self.invited, self.epochs = merged
+        self.recent = {}
+        self._last = (None, -1)
+
+    def columns(self):
+        self.merge()
+        return self.ids, self.cycles, self.invited, self.epochs
+
+
+class StatsTable:
+    """chat_id -> ChatStats. Kalitlar butun sonlar."""
+
+    __slots__ = ('chats',)
+
+    def __init__(self):
+        self.chats = {}
+
+    def __len__(self):
+        return sum(len(chat) for chat in self.chats.values())
+
+    def get(self, chat_id, user_id):
+        chat = self.chats.get(chat_id)
+        return chat.get(user_id) if chat is not None else None
+
+    def set(self, chat_id, user_id, cycle, invited, epoch):
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = self.chats[chat_id] = ChatStats()
+        chat.set(user_id, cycle, invited, epoch)
+
+    def drop_chat(self, chat_id):
+        self.chats.pop(chat_id, None)
+
+    # --- JSON snapshot ---
+
+    def to_json(self):
+        return {
+            '_format': SNAPSHOT_FORMAT,
+            'chats': {str(chat_id): [column.tolist() for column in chat.columns()] for chat_id, chat in self.chats.items()}
+        }
+
+    @classmethod
+    def from_json(cls, data, reset_interval_days):
+        """Snapshotdan jadval tuzadi. Eski {user_id: {chat_id: stats}} ko'rinishi ham o'qiladi;
+        unda epoch saqlanmagan yozuvlar uchun reset_interval_days(chat_id) ishlatiladi."""
+        table = cls()
+        if data.get('_format') == SNAPSHOT_FORMAT:
+            for chat_id_str, (ids, cycles, invited, epochs) in data['chats'].items():
+                table.chats[int(chat_id_str)] = ChatStats(
+                    array('q', ids), array('i', cycles), array('i', invited), array('i', epochs)
+                )
+            return table
+
+        intervals = {}
+        date_epochs = {}  # (interval, sana) -> epoch: sanalar ko'p takrorlanadi
+        for user_id_str, chats in data.items():
+            if user_id_str.startswith('_'):
+                continue
+            user_id = int(user_id_str)
+            for chat_id_str, stats in chats.items():
+                if chat_id_str not in intervals:
+                    intervals[chat_id_str] = reset_interval_days(chat_id_str)
+                epoch = stats.get('cycle_epoch')
+                if epoch is None:
+                    key = (intervals[chat_id_str], stats.get('last_reset_date'))
+                    if key not in date_epochs:
+                        date_epochs[key] = stats_epoch(stats, key[0])
+                    epoch = date_epochs[key]
+                table.set(
+                    int(chat_id_str), user_id,
+                    stats.get('current_ad_cycle_count', 0), stats.get('invited_members_count', 0),
+                    NO_EPOCH if epoch is None else epoch
+                )
+        for chat in table.chats.values():
+            chat.merge()
+        return table
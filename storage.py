@@ -1,6 +1,21 @@
 import json
 import os
-from datetime import datetime, timedelta
+import asyncio
+import atexit
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl # Faqat Unix: bir nechta jarayon (sharding) umumiy fayllarni navbat bilan o'zgartiradi
+except ImportError:
+    fcntl = None
+
+from config_cache import ConfigCache
+from metrics import storage_bytes, storage_seconds
+from limits import cycle_epoch, evaluate_quota
+from stats_table import NO_EPOCH, StatsTable
+from stats_shards import open_stats
+from binary_snapshot import SUPPORTED as BINARY_SNAPSHOT_SUPPORTED, load_stats
 
 # Fayl yo'llari (Renderda saqlash uchun)
 CONFIG_FILE = 'config.json'
@@ -8,6 +23,20 @@ STATS_FILE = 'stats.json'
 # ADMINS_FILE olib tashlandi
 CHANNELS_FILE = 'channels.json' # Majburiy kanallar mantiqi saqlanib qoldi
 
+# Statistika xotirada saqlanadi, har bir o'zgarish journal fayliga qo'shib boriladi.
+# Journal STATS_JOURNAL_MAX_BYTES dan oshsa, fon oqimida guruhlar snapshotiga (stats.d/) yig'iladi.
+STATS_JOURNAL_FILE = 'stats.journal'
+STATS_JOURNAL_MAX_BYTES = int(os.getenv("STATS_JOURNAL_MAX_BYTES", 4 * 1024 * 1024))
+STATS_FLUSH_INTERVAL = int(os.getenv("STATS_FLUSH_INTERVAL", 30))
+
+_stats = None       # ShardedStats (chat_id -> ustunli ChatStats) - snapshot + journal holati
+_seq = 0            # Oxirgi journal yozuvining tartib raqami
+_journal = None     # Yozish uchun ochilgan journal fayli
+_unsynced = 0       # fsync qilinmagan yozuvlar soni
+
+_config_cache = ConfigCache()
+_config_mtime = None  # Keshdagi sozlamalar o'qilgan config.json ning (mtime, inode) qiymati
+
 # --- Yordamchi Funksiyalar ---
 
 def _load_data(file_path, default_value=None):
@@ -17,47 +46,314 @@ def _load_data(file_path, default_value=None):
         
     try:
         if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with storage_seconds.time('json', 'read'), open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                storage_bytes.inc('json', 'read', amount=f.tell())
+                return data
         else:
             _save_data(file_path, default_value)
             return default_value
     except (json.JSONDecodeError, FileNotFoundError):
         return default_value
 
-def _save_data(file_path, data):
-    """JSON faylga ma'lumot saqlaydi."""
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4)
+@contextmanager
+def _file_lock(file_path):
+    """Fayl ustida o'qish-o'zgartirish-yozish uchun jarayonlararo lock (<fayl>.lock orqali)."""
+    if fcntl is None:
+        yield
+        return
+    with open(file_path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _save_data(file_path, data, indent=4):
+    """JSON faylga ma'lumot saqlaydi (vaqtinchalik fayl + rename orqali, atomar)."""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix='.json')
+    try:
+        with storage_seconds.time('json', 'write'):
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=indent)
+                storage_bytes.inc('json', 'write', amount=f.tell())
+            os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+# --- Statistika journali (stats.journal + stats.d/ snapshot) ---
+#
+# Har bir yozuv bitta qatorli JSON: {"s": seq, "o": amal, "c": chat_id, "u": user_id, ...}
+#   u - yangilash ("e" - tsikl epochi, "i" - taklif o'zgarishi, "a" - reklama ishlatildi,
+#       "z" - takliflar nollandi). Statistikaning epochi "e" dan farq qilsa, hisoblagichlar
+#       o'zgarishdan oldin nollanadi - tsikl tiklanishi alohida yozilmaydi.
+#   d - guruh statistikasini o'chirish
+#   n, r - eski versiyadagi yaratish/tiklash yozuvlari ("d" - sana), faqat qayta tiklashda uchraydi
+# Snapshot guruhlar bo'yicha bo'lingan (stats_shards.py): stats.json yonidagi stats.d/ papkasida har bir
+# guruh o'z faylida va o'ziga kiritilgan oxirgi yozuv raqamini saqlaydi, shuning uchun qayta tiklashda
+# (snapshot + journal) hech bir yozuv ikki marta qo'llanmaydi. Guruh birinchi murojaatda yuklanadi,
+# yig'ishda faqat journalda o'zgargan guruhlar qayta yoziladi - bir guruhni yuklash, o'chirish yoki
+# eksport qilish boshqa guruhlar hajmiga bog'liq emas.
+# stats.d/ hali bo'lmasa eski yagona snapshot (stats.bin yoki stats.json - ustunli yoki
+# {user_id: {chat_id: stats}}) bir marta guruhlarga bo'linadi; eski fayl zaxira sifatida qoladi.
+
+def _binary_snapshot_path(stats_file=None):
+    return os.path.splitext(stats_file or STATS_FILE)[0] + '.bin'
+
+def _shards_dir(stats_file=None):
+    return os.path.splitext(stats_file or STATS_FILE)[0] + '.d'
+
+def _reset_interval_days(chat_id):
+    return get_policy(chat_id).reset_interval_days
+
+def _apply_record(data, record):
+    """Bitta journal yozuvini statistikaga qo'llaydi (jonli yozish va tiklash uchun umumiy)."""
+    op = record['o']
+    chat_id = int(record['c'])
+
+    if op == 'd':
+        data.drop_chat(chat_id)
+        return
+
+    user_id = int(record['u'])
+
+    if op in ('n', 'r'):
+        data.set(chat_id, user_id, 0, 0, cycle_epoch(_reset_interval_days(chat_id), record['d']))
+        return
+
+    stats = data.get(chat_id, user_id)
+    epoch = record.get('e')
+    if epoch is not None and (stats is None or stats[2] != epoch):
+        stats = (0, 0, epoch)
+    if stats is None:
+        return
+
+    cycle_count, invited_count, epoch = stats
+    if record.get('i'):
+        invited_count += record['i']
+    if record.get('a'):
+        cycle_count += 1
+    if record.get('z'):
+        invited_count = 0
+    data.set(chat_id, user_id, cycle_count, invited_count, epoch)
+
+def _replay_journal(file_path, data, applied_seq):
+    """Journal yozuvlarini qo'llaydi (guruhga applied_seq(chat_id) dan keyingilarini) va oxirgi seq ni qaytaradi."""
+    last_seq = 0
+    if not os.path.exists(file_path):
+        return last_seq
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break # Jarayon yozish paytida to'xtagan - oxirgi chala qator tashlanadi
+            last_seq = record['s']
+            if record['s'] <= applied_seq(int(record['c'])):
+                continue
+            _apply_record(data, record)
+    return last_seq
+
+def _load_legacy_snapshot(stats_file=None):
+    """Eski yagona snapshot (StatsTable, seq): avval stats.bin, u bo'lmasa yoki o'qib bo'lmasa stats.json."""
+    stats_file = stats_file or STATS_FILE
+    binary_path = _binary_snapshot_path(stats_file)
+    if BINARY_SNAPSHOT_SUPPORTED and os.path.exists(binary_path):
+        try:
+            with storage_seconds.time('json', 'snapshot_open'):
+                return load_stats(binary_path)
+        except Exception as e:
+            print(f"❌ {binary_path} ni o'qishda xato, {stats_file} ishlatiladi: {e}")
+    if not os.path.exists(stats_file):
+        return StatsTable(), 0  # _load_data bo'sh fayl yaratmasin
+    data = _load_data(stats_file)
+    snapshot_seq = data.pop('_seq', 0)
+    return StatsTable.from_json(data, _reset_interval_days), snapshot_seq
+
+def _load_snapshot():
+    """Guruhlar snapshoti (ShardedStats); faqat indeks o'qiladi."""
+    with storage_seconds.time('json', 'snapshot_open'):
+        return open_stats(_shards_dir(), _load_legacy_snapshot)
+
+def _get_stats_data():
+    """Statistikani bir marta (snapshot + journal) tiklaydi va keyin xotiradagi nusxani qaytaradi."""
+    global _stats, _seq
+    if _stats is None:
+        data = _load_snapshot()
+        _seq = data.index['seq']
+        for file_path in (STATS_JOURNAL_FILE + '.1', STATS_JOURNAL_FILE):
+            _seq = max(_seq, _replay_journal(file_path, data, data.applied_seq))
+        _stats = data
+    return _stats
+
+def _commit(record):
+    """Yozuvni journalga qo'shadi va xotiradagi statistikaga qo'llaydi."""
+    global _seq, _journal, _unsynced
+    data = _get_stats_data()
+
+    _seq += 1
+    record['s'] = _seq
+    if _journal is None:
+        _journal = open(STATS_JOURNAL_FILE, 'a', encoding='utf-8')
+    line = json.dumps(record, separators=(',', ':')) + '\n'
+    with storage_seconds.time('json', 'journal'):
+        _journal.write(line)
+        _journal.flush()
+    storage_bytes.inc('json', 'journal', amount=len(line))
+    _unsynced += 1
+
+    _apply_record(data, record)
+
+def flush_stats():
+    """Journalni diskka (fsync) yozadi. Yozilgan yozuvlar sonini qaytaradi."""
+    global _unsynced
+    if _journal is None or not _unsynced:
+        return 0
+
+    count = _unsynced
+    _journal.flush()
+    os.fsync(_journal.fileno())
+    _unsynced = 0
+    return count
+
+def _rotate_journal():
+    """Joriy journalni stats.journal.1 ga ko'chiradi; keyingi yozuvlar yangi faylga tushadi."""
+    global _journal
+    flush_stats()
+    if _journal is not None:
+        _journal.close()
+        _journal = None
+    os.replace(STATS_JOURNAL_FILE, STATS_JOURNAL_FILE + '.1')
+
+def _fold_journal():
+    """stats.journal.1 dagi guruhlarning snapshot fayllarini qayta yozadi. Jonli holatga tegmaydi."""
+    rotated_path = STATS_JOURNAL_FILE + '.1'
+    data = _load_snapshot()
+    seq = _replay_journal(rotated_path, data, data.applied_seq)
+    with storage_seconds.time('json', 'write'):
+        size = data.save(seq)
+    storage_bytes.inc('json', 'write', amount=size)
+    os.remove(rotated_path)
+
+def fold_stats_files(stats_file, journal_file):
+    """Hech bir jarayon ishlatmayotgan statistika to'plamining journallarini uning stats.d/ iga yig'adi va
+    journallarni o'chiradi (sharding.py shardlar sonini o'zgartirishdan oldin). Papkani qaytaradi."""
+    directory = _shards_dir(stats_file)
+    data = open_stats(directory, lambda: _load_legacy_snapshot(stats_file))
+    seq = data.index['seq']
+    for file_path in (journal_file + '.1', journal_file):
+        seq = max(seq, _replay_journal(file_path, data, data.applied_seq))
+    data.save(seq)
+    for file_path in (journal_file + '.1', journal_file):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    return directory
+
+def _journal_size():
+    try:
+        return os.path.getsize(STATS_JOURNAL_FILE)
+    except OSError:
+        return 0
+
+def compact_stats():
+    """Journalni snapshotga sinxron yig'adi."""
+    _get_stats_data()
+    if os.path.exists(STATS_JOURNAL_FILE + '.1'):
+        _fold_journal()
+    if _journal_size() > 0:
+        _rotate_journal()
+        _fold_journal()
+
+async def stats_flusher(interval_seconds=STATS_FLUSH_INTERVAL):
+    """Journalni vaqti-vaqti bilan fsync qiladi va kattalashsa fon oqimida snapshotga yig'adi."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            flush_stats()
+            # Oldingi yig'ish tugamagan bo'lsa, .1 fayl ustiga yozilmaydi
+            if not os.path.exists(STATS_JOURNAL_FILE + '.1'):
+                if _journal_size() < STATS_JOURNAL_MAX_BYTES:
+                    continue
+                _rotate_journal()
+            await loop.run_in_executor(None, _fold_journal)
+        except Exception as e:
+            print(f"❌ Statistikani saqlashda xato: {e}")
+
+atexit.register(flush_stats)
 
 # --- Guruh Sozlamalari (config.json) ---
+#
+# Sozlamalar config_cache orqali xotirada saqlanadi. config.json qo'lda tahrirlansa (mtime
+# o'zgarsa) kesh tozalanadi, shuning uchun o'zgarishlar qayta ishga tushirmasdan kuchga kiradi.
+# Qaytarilgan sozlamalar umumiy obyekt - ularni o'zgartirmang, update_config dan foydalaning.
+
+def _default_config():
+    return {
+        'free_ad_count': 1,             # Nechta xabar bepul ruxsat etiladi
+        'reset_interval_days': 30,      # Hisob necha kunda tiklanadi
+        'invite_levels': {'1': 5, '2': 7, 'max': 10} # 1-xabar uchun 5, 2-xabar uchun 7, qolganlariga 10
+    }
+
+def _config_file_mtime():
+    # os.replace har safar yangi inode beradi - bir xil mtime'dagi ikki yozuv ham farqlanadi
+    try:
+        stat = os.stat(CONFIG_FILE)
+        return stat.st_mtime_ns, stat.st_ino
+    except OSError:
+        return None
+
+def _check_config_file():
+    """config.json tashqaridan o'zgargan bo'lsa, sozlamalar keshini tozalaydi."""
+    global _config_mtime
+    mtime = _config_file_mtime()
+    if mtime != _config_mtime:
+        _config_cache.invalidate()
+        _config_mtime = mtime
+
+def _save_config_data(data):
+    global _config_mtime
+    _save_data(CONFIG_FILE, data)
+    _config_mtime = _config_file_mtime()
+
+def _get_config_entry(chat_id):
+    """Keshdan (versiya, sozlamalar, qoida) yozuvini oladi, kerak bo'lsa config.json dan yuklaydi."""
+    _check_config_file()
+
+    entry = _config_cache.get(chat_id)
+    if entry is None:
+        data = _load_data(CONFIG_FILE)
+        # Fayl baribir o'qildi - keshda yo'q barcha guruhlarni birdaniga joylaymiz
+        for other_chat_id, other_config in data.items():
+            if other_chat_id != str(chat_id) and other_chat_id not in _config_cache:
+                _config_cache.put(other_chat_id, other_config)
+        entry = _config_cache.put(chat_id, data.get(str(chat_id)) or _default_config())
+        
+    return entry
 
 def get_config(chat_id):
     """Berilgan chat ID uchun sozlamalarni oladi yoki standart sozlamalarni qaytaradi."""
-    chat_id_str = str(chat_id)
-    data = _load_data(CONFIG_FILE)
-    
-    # Standart sozlamalar
-    if chat_id_str not in data:
-        data[chat_id_str] = {
-            'free_ad_count': 1,             # Nechta xabar bepul ruxsat etiladi
-            'reset_interval_days': 30,      # Hisob necha kunda tiklanadi
-            'invite_levels': {'1': 5, '2': 7, 'max': 10} # 1-xabar uchun 5, 2-xabar uchun 7, qolganlariga 10
-        }
-        _save_data(CONFIG_FILE, data)
-        
-    return data[chat_id_str]
+    return _get_config_entry(chat_id)[1]
+
+def get_policy(chat_id):
+    """Guruhning tuzilgan limit qoidasini (LimitPolicy) qaytaradi."""
+    return _get_config_entry(chat_id)[2]
 
 def update_config(chat_id, key, value):
     """Guruh sozlamalarini yangilaydi."""
     chat_id_str = str(chat_id)
-    data = _load_data(CONFIG_FILE)
-    
-    if chat_id_str not in data:
-        get_config(chat_id)
+    with _file_lock(CONFIG_FILE):
+        data = _load_data(CONFIG_FILE)
 
-    data[chat_id_str][key] = value
-    _save_data(CONFIG_FILE, data)
+        data.setdefault(chat_id_str, _default_config())[key] = value
+        _save_config_data(data)
+    _config_cache.invalidate(chat_id_str)
 
 def get_all_chat_configs():
     """Barcha sozlamalar o'rnatilgan guruh IDlarini qaytaradi."""
@@ -65,90 +361,108 @@ def get_all_chat_configs():
 
 def add_new_group(chat_id):
     """Yangi guruhni standart sozlamalar bilan qo'shadi."""
-    get_config(chat_id)
+    chat_id_str = str(chat_id)
+    with _file_lock(CONFIG_FILE):
+        data = _load_data(CONFIG_FILE)
+
+        if chat_id_str not in data:
+            data[chat_id_str] = _default_config()
+            _save_config_data(data)
+            _config_cache.invalidate(chat_id_str)
 
 def delete_group(chat_id):
     """Guruh sozlamalarini va unga tegishli statistikani o'chiradi."""
     chat_id_str = str(chat_id)
-    config_data = _load_data(CONFIG_FILE)
-    stats_data = _load_data(STATS_FILE)
-    
-    if chat_id_str in config_data:
-        del config_data[chat_id_str]
-        _save_data(CONFIG_FILE, config_data)
+    with _file_lock(CONFIG_FILE):
+        config_data = _load_data(CONFIG_FILE)
+
+        if chat_id_str in config_data:
+            del config_data[chat_id_str]
+            _save_config_data(config_data)
+    _config_cache.invalidate(chat_id_str)
         
-    stats_data = {
-        user_id: stats for user_id, stats in stats_data.items() 
-        if chat_id_str not in stats
-    }
-    _save_data(STATS_FILE, stats_data)
+    _commit({'o': 'd', 'c': chat_id_str})
     
-# --- Foydalanuvchi Statistikasi (stats.json) ---
+# --- Foydalanuvchi Statistikasi (stats.journal + stats.d/) ---
+#
+# Eskirgan epochli hisoblagichning birinchi o'zgarishi journalga "e" (yangi epoch) bilan yoziladi:
+# _apply_record uni 0 dan boshlaydi.
 
-def _check_and_reset_stats(user_id, chat_id, user_stats, config):
-    """Limit tiklanish vaqti kelganini tekshiradi va tiklaydi."""
-    reset_interval_days = config.get('reset_interval_days', 30)
-    
-    if 'last_reset_date' not in user_stats or not user_stats['last_reset_date']:
-        return user_stats
-
-    last_reset = datetime.strptime(user_stats['last_reset_date'], '%Y-%m-%d')
-    if datetime.now() >= last_reset + timedelta(days=reset_interval_days):
-        user_stats['current_ad_cycle_count'] = 0
-        user_stats['invited_members_count'] = 0
-        user_stats['last_reset_date'] = datetime.now().strftime('%Y-%m-%d')
-    
-    return user_stats
+def _read_stats(user_id, chat_id, reset_interval_days):
+    """(ad_cycle_count, invited_count, joriy_epoch, saqlangan_yozuv_joriymi) qaytaradi. Hech narsa yozmaydi."""
+    epoch = cycle_epoch(reset_interval_days)
+    stats = _get_stats_data().get(chat_id, user_id)
+
+    if stats is None or stats[2] != epoch:
+        return 0, 0, epoch, False
+    return stats[0], stats[1], epoch, True
 
 def get_user_stats(user_id, chat_id, config):
-    """Foydalanuvchi statistikasini oladi va kerak bo'lsa tiklaydi."""
-    user_id_str = str(user_id)
-    chat_id_str = str(chat_id)
-    data = _load_data(STATS_FILE)
-    
-    if user_id_str not in data:
-        data[user_id_str] = {}
-        
-    if chat_id_str not in data[user_id_str]:
-        data[user_id_str][chat_id_str] = {
-            'current_ad_cycle_count': 0, # Joriy tsiklda yuborilgan xabarlar soni
-            'invited_members_count': 0,  # Qo'shilgan odamlar soni
-            'last_reset_date': datetime.now().strftime('%Y-%m-%d')
-        }
-
-    # Tiklanishni tekshirish
-    data[user_id_str][chat_id_str] = _check_and_reset_stats(
-        user_id_str, chat_id_str, data[user_id_str][chat_id_str], config
+    """Foydalanuvchining joriy tsikldagi statistikasini oladi."""
+    cycle_count, invited_count, epoch, _ = _read_stats(
+        int(user_id), int(chat_id), config.get('reset_interval_days', 30)
     )
-    
-    _save_data(STATS_FILE, data)
-    return data[user_id_str][chat_id_str]
+    return {
+        'current_ad_cycle_count': cycle_count, # Joriy tsiklda yuborilgan xabarlar soni
+        'invited_members_count': invited_count, # Qo'shilgan odamlar soni
+        'cycle_epoch': epoch
+    }
+
+def _commit_stats(user_id, chat_id, epoch, is_current, invited_change=0, ad_used=False, reset_invited=False):
+    """O'zgarish bo'lsa, bitta "u" yozuvini qo'shadi. Eskirgan statistikaga epoch ham yoziladi."""
+    record = {'o': 'u', 'c': str(chat_id), 'u': str(user_id)}
+    if invited_change:
+        record['i'] = invited_change
+    if ad_used:
+        record['a'] = 1
+    if reset_invited:
+        record['z'] = 1
+    if len(record) == 3:
+        return
+    if not is_current:
+        record['e'] = epoch
+    _commit(record)
 
 def update_user_stats(user_id, chat_id, invited_count_change=0, ad_used=False, reset_invited=False):
     """Foydalanuvchi statistikasini yangilaydi."""
-    user_id_str = str(user_id)
-    chat_id_str = str(chat_id)
-    data = _load_data(STATS_FILE)
-    
-    if user_id_str not in data: data[user_id_str] = {}
-    
-    stats = data.get(user_id_str, {}).get(chat_id_str, {})
-    if not stats:
-        return 
+    user_id = int(user_id)
+    chat_id = int(chat_id)
+    _, _, epoch, is_current = _read_stats(user_id, chat_id, get_policy(chat_id).reset_interval_days)
 
-    if invited_count_change != 0:
-        stats['invited_members_count'] += invited_count_change
-        
-    if ad_used:
-        stats['current_ad_cycle_count'] += 1
-        
-    if reset_invited:
-        stats['invited_members_count'] = 0
-        
-    data[user_id_str][chat_id_str] = stats
-    _save_data(STATS_FILE, data)
+    _commit_stats(user_id, chat_id, epoch, is_current, invited_count_change, ad_used, reset_invited)
+
+def consume_ad_quota(user_id, chat_id, policy, invited_count_change=0, consume_free=True):
+    """Limitni tekshiradi va kvota yetarli bo'lsa uni bitta yozuv bilan ishlatadi. QuotaResult qaytaradi."""
+    user_id = int(user_id)
+    chat_id = int(chat_id)
+    cycle_count, invited_count, epoch, is_current = _read_stats(
+        user_id, chat_id, policy.reset_interval_days
+    )
+
+    result, new_cycle_count, new_invited = evaluate_quota(
+        policy, cycle_count, invited_count, invited_count_change, consume_free
+    )
+
+    _commit_stats(
+        user_id, chat_id, epoch, is_current,
+        new_invited - invited_count, new_cycle_count != cycle_count
+    )
+    return result
 
 
+def get_group_stats(chat_id):
+    """Guruhning saqlangan statistikasi: [(user_id, ad_cycle_count, invited_count, cycle_epoch)], user_id
+    bo'yicha saralangan (cycle_epoch noma'lum bo'lsa None). Faqat shu guruh fayli o'qiladi."""
+    chat = _get_stats_data().chat(int(chat_id))
+    if chat is None:
+        return []
+    return [(user_id, cycle, invited, None if epoch == NO_EPOCH else epoch)
+            for user_id, cycle, invited, epoch in zip(*chat.columns())]
+
+def reset_group_stats(chat_id):
+    """Guruhdagi barcha hisoblagichlarni nollaydi (sozlamalar qoladi)."""
+    _commit({'o': 'd', 'c': str(chat_id)})
+
 # --- Majburiy Kanallar (channels.json) ---
 
 def get_required_channels():
@@ -157,22 +471,24 @@ def get_required_channels():
 
 def add_channel(username):
     """Yangi majburiy kanal qo'shadi."""
-    data = _load_data(CHANNELS_FILE, default_value=[])
-    
-    if not any(c.get('channel_username') == username for c in data):
-        data.append({'channel_username': username})
-        _save_data(CHANNELS_FILE, data)
-        return True
+    with _file_lock(CHANNELS_FILE):
+        data = _load_data(CHANNELS_FILE, default_value=[])
+
+        if not any(c.get('channel_username') == username for c in data):
+            data.append({'channel_username': username})
+            _save_data(CHANNELS_FILE, data)
+            return True
     return False
 
 def delete_channel(username):
     """Majburiy kanalni ro'yxatdan o'chiradi."""
-    data = _load_data(CHANNELS_FILE, default_value=[])
-    
-    initial_length = len(data)
-    data = [c for c in data if c.get('channel_username') != username]
-    
-    if len(data) < initial_length:
-        _save_data(CHANNELS_FILE, data)
-        return True
+    with _file_lock(CHANNELS_FILE):
+        data = _load_data(CHANNELS_FILE, default_value=[])
+
+        initial_length = len(data)
+        data = [c for c in data if c.get('channel_username') != username]
+
+        if len(data) < initial_length:
+            _save_data(CHANNELS_FILE, data)
+            return True
     return False
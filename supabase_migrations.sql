@@ -0,0 +1,113 @@
+-- Supabase (PostgreSQL) sxemasiga database.py talab qiladigan o'zgarishlar.
+-- SQL Editor'da ketma-ket ishga tushiring; har bir bo'lim qayta ishga tushirilsa ham xavfsiz.
+
+-- Tsikl epochi: hisoblagichlar qaysi tsiklga tegishli ekanini saqlaydi (lazy tiklanish uchun)
+-- va (chat_id, user_id) bo'yicha upsert uchun noyob indeks.
+ALTER TABLE user_stats ADD COLUMN IF NOT EXISTS cycle_epoch integer;
+CREATE UNIQUE INDEX IF NOT EXISTS user_stats_chat_user_key ON user_stats (chat_id, user_id);
+
+-- Yozuv epochi: cycle_epoch bo'lmagan eski yozuvlarda u oxirgi reklama sanasidan hisoblanadi
+-- (limits.stats_epoch bilan bir xil). Sana UTC bo'yicha olinadi - natija sessiya TimeZone'iga bog'liq emas;
+-- text -> timestamptz o'girish STABLE bo'lgani uchun funksiya ham STABLE.
+CREATE OR REPLACE FUNCTION user_stats_epoch(p_cycle_epoch integer, p_last_ad_timestamp text, p_reset_interval_days integer)
+RETURNS integer
+LANGUAGE sql STABLE AS $$
+    SELECT COALESCE(p_cycle_epoch,
+                    ((p_last_ad_timestamp::timestamptz AT TIME ZONE 'UTC')::date - DATE '1970-01-01') / p_reset_interval_days);
+$$;
+
+-- Bitta foydalanuvchi deltasi: o'sishlar, tiklanish va epoch almashuvi bitta upsert bilan serverda qo'llanadi.
+-- p_reset_invited bo'lsa, takliflar avval 0 qilinadi, keyin p_invited_delta qo'shiladi.
+CREATE OR REPLACE FUNCTION apply_user_stats_delta(
+    p_chat_id bigint,
+    p_user_id bigint,
+    p_epoch integer,
+    p_reset_interval_days integer,
+    p_ad_delta integer DEFAULT 0,
+    p_invited_delta integer DEFAULT 0,
+    p_reset_invited boolean DEFAULT false
+) RETURNS void
+LANGUAGE sql AS $$
+    INSERT INTO user_stats AS s (chat_id, user_id, current_ad_cycle_count, invited_members_count, cycle_epoch, last_ad_timestamp)
+    VALUES (p_chat_id, p_user_id, p_ad_delta, p_invited_delta, p_epoch,
+            CASE WHEN p_ad_delta > 0 THEN now() END)
+    ON CONFLICT (chat_id, user_id) DO UPDATE SET
+        current_ad_cycle_count = p_ad_delta + CASE
+            WHEN user_stats_epoch(s.cycle_epoch, s.last_ad_timestamp::text, p_reset_interval_days) = p_epoch
+            THEN s.current_ad_cycle_count ELSE 0 END,
+        invited_members_count = CASE
+            WHEN p_reset_invited THEN p_invited_delta
+            WHEN user_stats_epoch(s.cycle_epoch, s.last_ad_timestamp::text, p_reset_interval_days) = p_epoch
+            THEN s.invited_members_count + p_invited_delta
+            ELSE p_invited_delta END,
+        cycle_epoch = p_epoch,
+        last_ad_timestamp = CASE WHEN p_ad_delta > 0 THEN now() ELSE s.last_ad_timestamp END;
+$$;
+
+-- database.update_user_stats: batcher yig'gan deltalar paketi bitta so'rov va bitta tranzaksiyada.
+-- p_deltas: [{chat_id, user_id, epoch, reset_interval_days, ad_delta, invited_delta, reset_invited}, ...]
+CREATE OR REPLACE FUNCTION apply_user_stats_deltas(p_deltas jsonb)
+RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM apply_user_stats_delta(d.chat_id, d.user_id, d.epoch, d.reset_interval_days,
+                                   d.ad_delta, d.invited_delta, d.reset_invited)
+    FROM jsonb_to_recordset(p_deltas) AS d(chat_id bigint, user_id bigint, epoch integer, reset_interval_days integer,
+                                           ad_delta integer, invited_delta integer, reset_invited boolean);
+END;
+$$;
+
+-- database.consume_ad_quota: limitni tekshirish va kvotani ishlatish qator qulfi ostida bitta
+-- tranzaksiyada (limits.evaluate_quota bilan bir xil mantiq). p_thresholds - LimitPolicy.thresholds:
+-- bepul tsikllardan keyingi darajalar (p_free_ad_count ta bepul tsikl ro'yxatda yo'q).
+DROP FUNCTION IF EXISTS consume_ad_quota(bigint, bigint, integer, integer, integer[], integer, integer, boolean);
+CREATE OR REPLACE FUNCTION consume_ad_quota(
+    p_chat_id bigint,
+    p_user_id bigint,
+    p_epoch integer,
+    p_reset_interval_days integer,
+    p_free_ad_count integer,
+    p_thresholds integer[],
+    p_max_required integer,
+    p_invited_delta integer DEFAULT 0,
+    p_consume_free boolean DEFAULT true
+) RETURNS json
+LANGUAGE plpgsql AS $$
+DECLARE
+    s user_stats;
+    v_cycle integer := 0;
+    v_invited integer := 0;
+    v_required integer;
+    v_allowed boolean;
+BEGIN
+    INSERT INTO user_stats (chat_id, user_id, current_ad_cycle_count, invited_members_count, cycle_epoch)
+    VALUES (p_chat_id, p_user_id, 0, 0, p_epoch)
+    ON CONFLICT (chat_id, user_id) DO NOTHING;
+
+    SELECT * INTO s FROM user_stats WHERE chat_id = p_chat_id AND user_id = p_user_id FOR UPDATE;
+
+    IF user_stats_epoch(s.cycle_epoch, s.last_ad_timestamp::text, p_reset_interval_days) = p_epoch THEN
+        v_cycle := s.current_ad_cycle_count;
+        v_invited := s.invited_members_count;
+    END IF;
+
+    v_invited := v_invited + p_invited_delta;
+    v_required := CASE WHEN v_cycle < p_free_ad_count THEN 0
+                       ELSE COALESCE(p_thresholds[v_cycle - p_free_ad_count + 1], p_max_required) END;
+    v_allowed := CASE WHEN v_required = 0 THEN p_consume_free ELSE v_invited >= v_required END;
+
+    UPDATE user_stats SET
+        current_ad_cycle_count = v_cycle + CASE WHEN v_allowed THEN 1 ELSE 0 END,
+        invited_members_count = v_invited - CASE WHEN v_allowed THEN v_required ELSE 0 END,
+        cycle_epoch = p_epoch,
+        last_ad_timestamp = CASE WHEN v_allowed THEN now() ELSE s.last_ad_timestamp END
+    WHERE chat_id = p_chat_id AND user_id = p_user_id;
+
+    RETURN json_build_object(
+        'allowed', v_allowed,
+        'required', v_required,
+        'invited', v_invited,
+        'missing', CASE WHEN v_allowed THEN 0 ELSE GREATEST(v_required - v_invited, 0) END
+    );
+END;
+$$;
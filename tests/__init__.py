@@ -0,0 +1 @@
+# Testlar: python -m pytest tests
@@ -0,0 +1,55 @@
+import pytest
+
+import sqlite_storage
+import storage
+
+
+def _close_stats():
+    """Jarayon to'xtagandek: xotiradagi statistika va ochiq journal tashlanadi, fayllar qoladi."""
+    if storage._journal is not None:
+        storage._journal.close()
+    storage._stats, storage._journal, storage._seq, storage._unsynced = None, None, 0, 0
+
+
+@pytest.fixture
+def json_storage(tmp_path, monkeypatch):
+    """storage.py fayllari vaqtinchalik papkada; papka yo'lini qaytaradi."""
+    _close_stats()
+    monkeypatch.setattr(storage, 'CONFIG_FILE', str(tmp_path / 'config.json'))
+    monkeypatch.setattr(storage, 'STATS_FILE', str(tmp_path / 'stats.json'))
+    monkeypatch.setattr(storage, 'STATS_JOURNAL_FILE', str(tmp_path / 'stats.journal'))
+    monkeypatch.setattr(storage, 'CHANNELS_FILE', str(tmp_path / 'channels.json'))
+    monkeypatch.setattr(storage, '_config_mtime', None)
+    storage._config_cache.invalidate()
+    yield tmp_path
+    _close_stats()
+    storage._config_cache.invalidate()
+
+
+@pytest.fixture
+def restart(json_storage):
+    """Qayta ishga tushirish: keyingi murojaat snapshot va journaldan tiklaydi."""
+    return _close_stats
+
+
+def _close_sqlite():
+    if sqlite_storage._conn is not None:
+        sqlite_storage._conn.close()
+    sqlite_storage._conn = None
+    sqlite_storage._config_cache.invalidate()
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """sqlite_storage vaqtinchalik bazada; fayl yo'lini qaytaradi."""
+    _close_sqlite()
+    path = str(tmp_path / 'bot.sqlite3')
+    monkeypatch.setattr(sqlite_storage, 'SQLITE_FILE', path)
+    yield path
+    _close_sqlite()
+
+
+@pytest.fixture
+def reopen_sqlite(sqlite_db):
+    """Ulanishni yopadi: keyingi murojaat bazani qayta ochadi."""
+    return _close_sqlite
@@ -0,0 +1,73 @@
+"""admin_cache: yangilash javobi kutilayotganda kelgan chat_member o'zgarishlari yo'qolmasligi."""
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.enums import ChatMemberStatus
+
+from admin_cache import AdminRoster
+
+CHAT_ID = -1001000000000
+
+
+class GatedBot:
+    """get_chat_administrators javobi release() gacha ushlab turiladi."""
+
+    def __init__(self, admins):
+        self.admins = admins
+        self.calls = 0
+        self.gate = asyncio.Event()
+
+    async def get_chat_administrators(self, chat_id):
+        self.calls += 1
+        await self.gate.wait()
+        return [SimpleNamespace(user=SimpleNamespace(id=user_id)) for user_id in self.admins]
+
+
+async def start_refresh(roster, bot):
+    task = asyncio.create_task(roster.is_admin(bot, CHAT_ID, 1))
+    await asyncio.sleep(0)
+    return task
+
+
+def test_demotion_during_refresh_is_kept():
+    async def run():
+        roster, bot = AdminRoster(), GatedBot({1, 2})
+        task = await start_refresh(roster, bot)
+        roster.apply_member_update(CHAT_ID, 1, ChatMemberStatus.MEMBER)  # Javob undan oldin olingan
+        roster.apply_member_update(CHAT_ID, 3, ChatMemberStatus.ADMINISTRATOR)
+        bot.gate.set()
+
+        assert await task is False
+        assert not await roster.is_admin(bot, CHAT_ID, 1)
+        assert await roster.is_admin(bot, CHAT_ID, 3)
+        assert bot.calls == 1
+        assert roster.stats()['invalidations'] == 0
+    asyncio.run(run())
+
+
+def test_invalidate_during_refresh_discards_result():
+    async def run():
+        roster, bot = AdminRoster(), GatedBot({1})
+        task = await start_refresh(roster, bot)
+        roster.invalidate(CHAT_ID)
+        bot.gate.set()
+        await task
+
+        bot.admins = set()
+        assert not await roster.is_admin(bot, CHAT_ID, 1)
+        assert bot.calls == 2
+    asyncio.run(run())
+
+
+def test_patch_counts_separately_from_invalidate():
+    async def run():
+        roster, bot = AdminRoster(), GatedBot({1})
+        bot.gate.set()
+        assert await roster.is_admin(bot, CHAT_ID, 1)
+
+        roster.apply_member_update(CHAT_ID, 1, ChatMemberStatus.LEFT)
+        assert not await roster.is_admin(bot, CHAT_ID, 1)
+        roster.invalidate(CHAT_ID)
+        roster.invalidate(CHAT_ID)  # Keshda yo'q
+        assert (roster.stats()['patches'], roster.stats()['invalidations']) == (1, 1)
+    asyncio.run(run())
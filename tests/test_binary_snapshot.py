@@ -0,0 +1,80 @@
+"""binary_snapshot: yozish va o'qish (kichik fayl bytearray'ga o'qiladi, kattasi mmap qilinadi)."""
+import mmap
+import random
+from array import array
+
+import pytest
+
+from binary_snapshot import MMAP_MIN_BYTES, SUPPORTED, Snapshot, load_stats, write_snapshot
+from stats_table import NO_EPOCH, ChatStats, StatsTable
+
+pytestmark = pytest.mark.skipif(not SUPPORTED, reason="binar snapshot faqat little-endian tizimlarda")
+
+CONFIGS = {
+    '-1001000000000': {'free_ad_count': 2, 'reset_interval_days': 7, 'invite_levels': {'1': 3, 'max': 5}},
+    '-1001000000001': {'free_ad_count': 0, 'reset_interval_days': 30, 'invite_levels': {}},
+}
+
+
+def make_table(chats, users, seed=1):
+    rng = random.Random(seed)
+    table = StatsTable()
+    for chat in range(chats):
+        ids = sorted(rng.sample(range(1, 10 * users), users))
+        table.chats[-1001000000000 - chat] = ChatStats(
+            array('q', ids), array('i', (rng.randrange(5) for _ in ids)),
+            array('i', (rng.randrange(30) for _ in ids)),
+            array('i', (rng.choice((NO_EPOCH, 700, 701)) for _ in ids))
+        )
+    return table
+
+
+def rows(table):
+    return {chat_id: [tuple(column) for column in chat.columns()] for chat_id, chat in table.chats.items()}
+
+
+@pytest.mark.parametrize('chats, users, mapped', [
+    (3, 50, False),     # < MMAP_MIN_BYTES
+    (4, 5000, True),    # ~400 KiB
+])
+def test_round_trip(tmp_path, chats, users, mapped):
+    path = str(tmp_path / 'stats.bin')
+    table = make_table(chats, users)
+    size = write_snapshot(path, table, seq=42, configs=CONFIGS)
+
+    assert (size >= MMAP_MIN_BYTES) == mapped
+    snapshot = Snapshot(path)
+    assert isinstance(snapshot._view.obj, mmap.mmap) == mapped
+    assert snapshot.seq == 42
+    assert snapshot.configs() == CONFIGS
+    assert snapshot.config(-1001000000001) == CONFIGS['-1001000000001']
+    assert snapshot.config(-1) is None
+
+    loaded, seq = load_stats(path)
+    assert seq == 42
+    assert rows(loaded) == rows(table)
+
+
+def test_loaded_table_changes_stay_in_memory(tmp_path):
+    path = str(tmp_path / 'stats.bin')
+    table = make_table(1, 50)
+    write_snapshot(path, table)
+    chat_id = next(iter(table.chats))
+    user_id = table.chats[chat_id].ids[10]
+
+    loaded, _ = load_stats(path)
+    loaded.set(chat_id, user_id, 9, 9, 701)
+    loaded.set(chat_id, 1, 1, 0, 701)  # Yangi foydalanuvchi
+
+    assert loaded.get(chat_id, user_id) == (9, 9, 701)
+    assert loaded.get(chat_id, 1) == (1, 0, 701)
+    assert rows(load_stats(path)[0]) == rows(table)
+
+
+def test_empty_table(tmp_path):
+    path = str(tmp_path / 'stats.bin')
+    write_snapshot(path, StatsTable(), seq=3)
+
+    loaded, seq = load_stats(path)
+    assert (len(loaded), seq) == (0, 3)
+    assert Snapshot(path).configs() == {}
@@ -0,0 +1,61 @@
+"""stats.d/: guruhni o'chirish va nollash yig'ish hamda qayta ishga tushirishdan keyin ham saqlanadi."""
+import os
+
+import pytest
+
+import storage
+from stats_shards import list_shards
+
+DELETED, RESET, KEPT = -1001000000000, -1001000000001, -1001000000002
+
+
+def fill(chat_id, users=3):
+    for user_id in range(1, users + 1):
+        storage.update_user_stats(user_id, chat_id, ad_used=True)
+
+
+@pytest.fixture
+def groups(json_storage, restart):
+    for chat_id in (DELETED, RESET, KEPT):
+        storage.add_new_group(chat_id)
+        fill(chat_id)
+    storage.compact_stats()  # Guruhlar stats.d/ da
+    restart()
+    return restart
+
+
+@pytest.mark.parametrize('fold', [False, True])
+def test_delete_and_reset_survive_restart(groups, fold):
+    storage.delete_group(DELETED)
+    storage.reset_group_stats(RESET)
+    fill(KEPT, users=4)
+    if fold:
+        storage.compact_stats()
+    groups()
+
+    assert storage.get_group_stats(DELETED) == []
+    assert storage.get_group_stats(RESET) == []
+    assert [row[:2] for row in storage.get_group_stats(KEPT)] == [(1, 2), (2, 2), (3, 2), (4, 1)]
+    assert set(storage.get_all_chat_configs()) == {str(RESET), str(KEPT)}
+
+    storage.compact_stats()
+    groups()
+    assert list_shards(storage._shards_dir()) == [KEPT]
+    assert storage.get_group_stats(DELETED) == []
+
+
+def test_reset_group_then_new_stats(groups):
+    storage.reset_group_stats(RESET)
+    storage.update_user_stats(7, RESET, ad_used=True)
+    storage.compact_stats()
+    groups()
+
+    assert [row[:2] for row in storage.get_group_stats(RESET)] == [(7, 1)]
+
+
+def test_no_legacy_snapshot_files_created(json_storage):
+    storage.update_user_stats(1, KEPT, ad_used=True)
+    storage.compact_stats()
+
+    assert not os.path.exists(storage.STATS_FILE)
+    assert list_shards(storage._shards_dir()) == [KEPT]
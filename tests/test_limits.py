@@ -0,0 +1,123 @@
+"""limits.py: LimitPolicy.from_config, required_for, evaluate_quota va compile_policy."""
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from limits import (
+    DEFAULT_MAX_REQUIRED, DEFAULT_POLICY, MAX_FREE_AD_COUNT, MAX_INVITE_LEVEL, MAX_RESET_INTERVAL_DAYS,
+    LimitPolicy, QuotaResult, compile_policy, cycle_epoch, evaluate_quota, stats_epoch
+)
+
+
+@pytest.mark.parametrize('config, required', [
+    ({}, [0, 5, 7, 10, 10]),  # Standart: 1 bepul, '1': 5, '2': 7, 'max': 10
+    ({'free_ad_count': 0, 'invite_levels': {'1': 3}}, [3, 10, 10]),
+    ({'free_ad_count': 3, 'invite_levels': {'1': 2, 'max': 4}}, [0, 0, 0, 2, 4, 4]),
+    ({'free_ad_count': 1, 'invite_levels': {'1': 2, '3': 6, 'max': 9}}, [0, 2, 9, 6, 9]),  # '2' yo'q - max
+    ({'free_ad_count': 0, 'invite_levels': {'max': 0}}, [0, 0, 0]),
+    ({'free_ad_count': MAX_FREE_AD_COUNT, 'invite_levels': {}}, [0] * 3),
+])
+def test_required_for(config, required):
+    config = dict({'invite_levels': {'1': 5, '2': 7, 'max': 10}}, **config)
+    policy = LimitPolicy.from_config(config)
+    assert [policy.required_for(cycle) for cycle in range(len(required))] == required
+
+
+def test_thresholds_hold_only_invite_levels():
+    policy = LimitPolicy.from_config({'free_ad_count': MAX_FREE_AD_COUNT, 'invite_levels': {'2': 4}})
+    assert policy.thresholds == (DEFAULT_MAX_REQUIRED, 4)
+    assert policy.required_for(MAX_FREE_AD_COUNT - 1) == 0
+    assert policy.required_for(MAX_FREE_AD_COUNT + 1) == 4
+
+
+@pytest.mark.parametrize('config', [
+    {'free_ad_count': True},
+    {'free_ad_count': -1},
+    {'free_ad_count': '1'},
+    {'free_ad_count': MAX_FREE_AD_COUNT + 1},
+    {'reset_interval_days': 0},
+    {'reset_interval_days': False},
+    {'reset_interval_days': MAX_RESET_INTERVAL_DAYS + 1},
+    {'invite_levels': [5, 7]},
+    {'invite_levels': {'0': 5}},
+    {'invite_levels': {'-1': 5}},
+    {'invite_levels': {'a': 5}},
+    {'invite_levels': {'1.5': 5}},
+    {'invite_levels': {'²': 5}},
+    {'invite_levels': {str(MAX_INVITE_LEVEL + 1): 5}},
+    {'invite_levels': {'1': -5}},
+    {'invite_levels': {'1': True}},
+    {'invite_levels': {'max': '10'}},
+])
+def test_from_config_rejects(config):
+    with pytest.raises(ValueError):
+        LimitPolicy.from_config(config)
+
+
+def test_compile_policy_falls_back_to_default():
+    assert compile_policy({'free_ad_count': -1}) is DEFAULT_POLICY
+    assert compile_policy({'free_ad_count': 2}).required_for(1) == 0
+
+
+def test_policy_is_immutable():
+    with pytest.raises(AttributeError):
+        DEFAULT_POLICY.free_ad_count = 5
+
+
+POLICY = LimitPolicy.from_config({'free_ad_count': 1, 'invite_levels': {'1': 2, '2': 3, 'max': 4}})
+
+
+@pytest.mark.parametrize('cycle, invited, change, consume_free, expected', [
+    # Bepul tsikl
+    (0, 0, 0, True, (QuotaResult(True, 0, 0, 0), 1, 0)),
+    (0, 3, 0, True, (QuotaResult(True, 0, 3, 0), 1, 3)),
+    # Bepul tsikl, lekin consume_free=False: ruxsat yo'q, hech narsa o'zgarmaydi
+    (0, 0, 1, False, (QuotaResult(False, 0, 1, 0), 0, 1)),
+    # Takliflar yetarli emas
+    (1, 1, 0, True, (QuotaResult(False, 2, 1, 1), 1, 1)),
+    # Yetarli: ortiqcha takliflar keyingi tsiklga o'tadi
+    (1, 1, 4, True, (QuotaResult(True, 2, 5, 0), 2, 3)),
+    (2, 3, 0, True, (QuotaResult(True, 3, 3, 0), 3, 0)),
+    # Jadvaldan keyin max
+    (5, 3, 0, True, (QuotaResult(False, 4, 3, 1), 5, 3)),
+    (5, 3, 1, False, (QuotaResult(True, 4, 4, 0), 6, 0)),
+])
+def test_evaluate_quota(cycle, invited, change, consume_free, expected):
+    assert evaluate_quota(POLICY, cycle, invited, change, consume_free) == expected
+
+
+def test_surplus_carries_over_cycles():
+    cycle, invited = 0, 0
+    allowed = []
+    for change in (0, 9, 0, 0, 0):
+        result, cycle, invited = evaluate_quota(POLICY, cycle, invited, change)
+        allowed.append(result.allowed)
+    # 9 taklif: 2 (1-daraja) + 3 (2-daraja) + 4 (max) tsikllarga yetadi, keyingisiga yo'q
+    assert allowed == [True, True, True, True, False]
+    assert (cycle, invited) == (4, 0)
+
+
+@pytest.mark.parametrize('day, expected', [
+    ('2024-01-01', date(2024, 1, 1)),
+    ('2024-01-01T02:00:00+05:00', date(2023, 12, 31)),  # UTC da hali oldingi kun
+    ('2023-12-31T22:00:00-05:00', date(2024, 1, 1)),
+    ('2024-01-01T23:30:00Z', date(2024, 1, 1)),
+    ('2024-01-01T23:30:00', date(2024, 1, 1)),  # Vaqt zonasisiz - UTC
+    (datetime(2024, 1, 1, 2, tzinfo=timezone(timedelta(hours=5))), date(2023, 12, 31)),
+    (date(2024, 1, 1), date(2024, 1, 1)),
+])
+def test_cycle_epoch_counts_utc_days(day, expected):
+    assert cycle_epoch(1, day) == cycle_epoch(1, expected)
+    assert cycle_epoch(1, expected) == (expected - date(1970, 1, 1)).days
+
+
+def test_cycle_epoch_today_is_utc():
+    before = datetime.now(timezone.utc).date()
+    assert cycle_epoch(1) in (cycle_epoch(1, before), cycle_epoch(1, before) + 1)
+
+
+def test_stats_epoch_prefers_stored_epoch():
+    assert stats_epoch({'cycle_epoch': 7, 'last_reset_date': '2024-01-01'}, 30) == 7
+    assert stats_epoch({'last_ad_timestamp': '2024-01-01T02:00:00+05:00'}, 1, 'last_ad_timestamp') == \
+        cycle_epoch(1, date(2023, 12, 31))
+    assert stats_epoch({}, 30) is None
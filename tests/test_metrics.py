@@ -0,0 +1,28 @@
+"""metrics: chat_id label'ining cheklovi va shardlar metrikalarini birlashtirish."""
+from metrics import Counter, LabelLimiter, merge_rendered
+
+
+def test_label_limiter_buckets_overflow_as_other():
+    label = LabelLimiter(2)
+    assert [label(chat_id) for chat_id in (-1, -2, -3, -1, -4, -2)] == ['-1', '-2', 'other', '-1', 'other', '-2']
+
+
+def test_limited_counter_stays_bounded():
+    label = LabelLimiter(3)
+    decisions = Counter('limitbot_limit_decisions_total', "test", ['chat_id', 'result'])
+    for chat_id in range(1000):
+        decisions.inc(label(-chat_id), 'allowed')
+    samples = [line for line in decisions.render() if not line.startswith('#')]
+    assert len(samples) == 4
+    assert 'limitbot_limit_decisions_total{chat_id="other",result="allowed"} 997' in samples
+
+
+def test_merge_rendered_labels_every_sample_once_per_family():
+    text = ("# HELP a_total A\n# TYPE a_total counter\na_total{result=\"ok\"} 1\n"
+            "# HELP b B\n# TYPE b gauge\nb 2\n")
+    merged = merge_rendered([('0', text), ('1', text)], 'shard').splitlines()
+    assert merged == [
+        '# HELP a_total A', '# TYPE a_total counter',
+        'a_total{shard="0",result="ok"} 1', 'a_total{shard="1",result="ok"} 1',
+        '# HELP b B', '# TYPE b gauge', 'b{shard="0"} 2', 'b{shard="1"} 2',
+    ]
@@ -0,0 +1,169 @@
+"""send_queue: token bucket'lar, ustuvorlik, umumiy RetryAfter pauzasi, eskirish va submit()."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, DeleteMessage, SendMessage
+
+import send_queue
+from send_queue import PRIORITY_HIGH, PRIORITY_LOW, SEND_MAX_AGE, SendQueue, TokenBucket, send_priority
+
+CHAT_ID = -1001000000000
+
+_real_sleep = asyncio.sleep
+
+
+class FakeClock:
+    """time.monotonic o'rnida; asyncio.sleep vaqtni kutmasdan oldinga suradi."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, delay):
+        # Bir vaqtda uxlaganlar vaqtni qo'shib yubormasin: har biri o'z tugash vaqtigacha suradi
+        wake_at = self.now + delay
+        await _real_sleep(0)
+        self.now = max(self.now, wake_at)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(send_queue, 'time', SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(send_queue.asyncio, 'sleep', clock.sleep)
+    return clock
+
+
+class FakeApi:
+    """make_request o'rnida: chaqiruvlar vaqti bilan yoziladi, errors navbatdagi chaqiruvlarda ko'tariladi."""
+
+    def __init__(self, clock, errors=()):
+        self.clock = clock
+        self.errors = list(errors)
+        self.calls = []
+
+    async def __call__(self, bot, method):
+        if self.errors:
+            error = self.errors.pop(0)
+            if error is not None:
+                raise error
+        self.calls.append((self.clock.now, method))
+        return True
+
+
+def retry_after(seconds):
+    return TelegramRetryAfter(method=DeleteMessage(chat_id=CHAT_ID, message_id=1), message="Flood", retry_after=seconds)
+
+
+def test_token_bucket_refill(clock):
+    bucket = TokenBucket(rate=2, capacity=2)
+    bucket.take()
+    bucket.take()
+    assert bucket.wait_time(clock.now) == 0.5
+
+    clock.now = 0.25
+    assert bucket.wait_time(clock.now) == 0.25
+    clock.now = 0.5
+    assert bucket.wait_time(clock.now) == 0
+    assert not bucket.is_full(clock.now)
+
+    clock.now = 100
+    assert bucket.is_full(clock.now)
+    assert bucket.tokens == 2  # capacity dan oshmaydi
+
+
+def test_global_bucket_spaces_requests(clock):
+    async def run():
+        queue = SendQueue(workers=1, global_per_second=2)
+        api = FakeApi(clock)
+        await asyncio.gather(*(queue(api, None, DeleteMessage(chat_id=CHAT_ID, message_id=i)) for i in range(4)))
+        return [at for at, _ in api.calls]
+    assert asyncio.run(run()) == [0, 0, 0.5, 1.0]
+
+
+def test_priority_order(clock):
+    async def run():
+        queue = SendQueue(workers=1)
+        api = FakeApi(clock)
+
+        async def send(text, priority):
+            with send_priority(priority):
+                await queue(api, None, SendMessage(chat_id=-CHAT_ID - 1, text=text))
+
+        await asyncio.gather(
+            send("salom", PRIORITY_LOW),
+            queue(api, None, DeleteMessage(chat_id=CHAT_ID, message_id=1)),
+            queue(api, None, AnswerCallbackQuery(callback_query_id='1')),  # Standart - yuqori
+            send("limit", PRIORITY_HIGH),
+        )
+        return [type(method).__name__ + (getattr(method, 'text', None) or '') for _, method in api.calls]
+    assert asyncio.run(run()) == ['AnswerCallbackQuery', 'SendMessagelimit', 'DeleteMessage', 'SendMessagesalom']
+
+
+def test_retry_after_pauses_every_worker(clock):
+    async def run():
+        queue = SendQueue(workers=3)
+        api = FakeApi(clock, errors=[retry_after(5)])
+        results = await asyncio.gather(*(queue(api, None, DeleteMessage(chat_id=CHAT_ID, message_id=i)) for i in range(3)))
+        return queue, api, results
+
+    queue, api, results = asyncio.run(run())
+    assert results == [True, True, True]
+    assert sorted(method.message_id for _, method in api.calls) == [0, 1, 2]
+    assert all(at >= 5 for at, _ in api.calls)  # Xato bermagan ishchilar ham pauzani kutdi
+    assert (queue.retry_after_hits, queue.sent, queue.failed) == (1, 3, 0)
+
+
+def test_retry_after_gives_up_after_max_retries(clock):
+    async def run():
+        queue = SendQueue(workers=1)
+        api = FakeApi(clock, errors=[retry_after(1)] * (send_queue.SEND_MAX_RETRIES + 1))
+        with pytest.raises(TelegramRetryAfter):
+            await queue(api, None, DeleteMessage(chat_id=CHAT_ID, message_id=1))
+        return queue
+    queue = asyncio.run(run())
+    assert (queue.retry_after_hits, queue.failed) == (send_queue.SEND_MAX_RETRIES + 1, 1)
+
+
+def test_stale_send_message_expires(clock):
+    async def run():
+        queue = SendQueue(workers=1)
+        api = FakeApi(clock)
+        send = asyncio.ensure_future(queue(api, None, SendMessage(chat_id=CHAT_ID, text="limit")))
+        delete = asyncio.ensure_future(queue(api, None, DeleteMessage(chat_id=CHAT_ID, message_id=1)))
+        await _real_sleep(0)
+        clock.now = SEND_MAX_AGE + 1  # Navbatda turib qoldi
+        with pytest.raises(asyncio.TimeoutError):
+            await send
+        assert await delete  # O'chirishlar eskirmaydi
+        return queue, api
+    queue, api = asyncio.run(run())
+    assert queue.expired == 1
+    assert [type(method) for _, method in api.calls] == [DeleteMessage]
+
+
+def test_submit_on_sent_and_on_error(clock):
+    async def ok():
+        return 42
+
+    async def fail():
+        raise RuntimeError("bot bloklangan")
+
+    async def run():
+        queue = SendQueue(workers=1)
+        sent, errors = [], []
+        queue.submit(ok(), "yuborib bo'lmadi", on_sent=sent.append, on_error=errors.append)
+        queue.submit(fail(), "yuborib bo'lmadi", on_sent=sent.append, on_error=errors.append)
+        queue.submit(fail(), "callbacksiz")
+        assert queue.stats()['submitted'] == 3
+        await queue.drain()
+        return queue, sent, errors
+
+    queue, sent, errors = asyncio.run(run())
+    assert sent == [42]
+    assert [str(error) for error in errors] == ["bot bloklangan"]
+    assert queue.stats()['submitted'] == 0
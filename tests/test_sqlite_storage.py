@@ -0,0 +1,95 @@
+"""sqlite_storage: kvota, eskirgan epoch, eski sxema va guruhni o'chirish/nollash."""
+import sqlite3
+from datetime import timedelta
+
+import sqlite_storage
+from limits import CYCLE_START, cycle_epoch
+
+CHAT_ID = -1001000000000
+
+
+def stats(user_id, chat_id=CHAT_ID):
+    result = sqlite_storage.get_user_stats(user_id, chat_id, sqlite_storage.get_config(chat_id))
+    return result['current_ad_cycle_count'], result['invited_members_count']
+
+
+def consume(user_id, invited=0, chat_id=CHAT_ID, consume_free=True):
+    return sqlite_storage.consume_ad_quota(user_id, chat_id, sqlite_storage.get_policy(chat_id), invited, consume_free)
+
+
+def epoch_day(epoch, reset_interval_days=30):
+    """epoch tsikliga tushadigan sana (ISO)."""
+    return (CYCLE_START + timedelta(days=epoch * reset_interval_days)).isoformat()
+
+
+def test_consume_ad_quota_round_trip(sqlite_db, reopen_sqlite):
+    # Standart: 1 bepul, keyin 5 taklif
+    assert consume(1).allowed
+    result = consume(1, invited=3)
+    assert (result.allowed, result.required, result.missing) == (False, 5, 2)
+    assert stats(1) == (1, 3)
+
+    reopen_sqlite()
+    assert stats(1) == (1, 3)
+    assert consume(1, invited=4).allowed
+    assert stats(1) == (2, 2)  # Ortiqcha 2 taklif keyingi tsiklga o'tdi
+
+
+def test_blocked_without_changes_writes_nothing(sqlite_db):
+    assert consume(1).allowed
+    assert not consume(1).allowed
+    assert not consume(2, consume_free=False).allowed
+    assert sqlite_storage.get_group_stats(CHAT_ID) == [(1, 1, 0, cycle_epoch(30))]
+
+
+def test_stale_epoch_reads_zero(sqlite_db):
+    conn = sqlite_storage._get_conn()
+    current = cycle_epoch(30)
+    conn.execute("INSERT INTO user_stats VALUES (?, 1, 4, 9, ?, NULL)", (CHAT_ID, current - 1))
+    conn.execute("INSERT INTO user_stats VALUES (?, 2, 4, 9, NULL, ?)", (CHAT_ID, epoch_day(current - 1)))
+    conn.execute("INSERT INTO user_stats VALUES (?, 3, 4, 9, NULL, ?)", (CHAT_ID, epoch_day(current)))
+
+    assert stats(1) == (0, 0)
+    assert stats(2) == (0, 0)
+    assert stats(3) == (4, 9)  # Eski yozuv: epoch last_reset_date dan
+
+    assert consume(1).allowed  # Yangi tsiklda bepul xabar
+    assert sqlite_storage.get_group_stats(CHAT_ID)[0] == (1, 1, 0, current)
+
+
+def test_old_schema_gets_cycle_epoch(sqlite_db):
+    conn = sqlite3.connect(sqlite_db)
+    conn.executescript("""
+        CREATE TABLE user_stats (
+            chat_id INTEGER NOT NULL, user_id INTEGER NOT NULL,
+            current_ad_cycle_count INTEGER NOT NULL DEFAULT 0, invited_members_count INTEGER NOT NULL DEFAULT 0,
+            last_reset_date TEXT, PRIMARY KEY (chat_id, user_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX idx_user_stats_user ON user_stats (user_id);
+    """)
+    conn.execute("INSERT INTO user_stats VALUES (?, 1, 1, 2, ?)", (CHAT_ID, epoch_day(cycle_epoch(30))))
+    conn.commit()
+    conn.close()
+
+    assert stats(1) == (1, 2)
+    columns = {row['name'] for row in sqlite_storage._get_conn().execute("PRAGMA table_info(user_stats)")}
+    assert 'cycle_epoch' in columns
+    indexes = sqlite_storage._get_conn().execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+    assert 'idx_user_stats_user' not in {row['name'] for row in indexes}
+
+
+def test_delete_and_reset_group(sqlite_db, reopen_sqlite):
+    for chat_id in (CHAT_ID, CHAT_ID - 1, CHAT_ID - 2):
+        sqlite_storage.add_new_group(chat_id)
+        consume(1, chat_id=chat_id)
+    sqlite_storage.update_config(CHAT_ID - 1, 'free_ad_count', 3)
+
+    sqlite_storage.delete_group(CHAT_ID)
+    sqlite_storage.reset_group_stats(CHAT_ID - 1)
+    reopen_sqlite()
+
+    assert sqlite_storage.get_all_chat_configs() == [str(CHAT_ID - 2), str(CHAT_ID - 1)]
+    assert sqlite_storage.get_group_stats(CHAT_ID) == []
+    assert sqlite_storage.get_group_stats(CHAT_ID - 1) == []
+    assert sqlite_storage.get_config(CHAT_ID - 1)['free_ad_count'] == 3
+    assert stats(1, CHAT_ID - 2) == (1, 0)
@@ -0,0 +1,106 @@
+"""stats_batcher: deltalarni birlashtirish, yozilmagan paketni qayta urinish va tashlash."""
+import asyncio
+
+import pytest
+
+from database import _merge_deltas
+from metrics import stats_deltas_dropped
+from stats_batcher import StatsBatcher
+
+KEY = (-1001000000000, 1)
+
+
+@pytest.mark.parametrize('old, new, merged', [
+    # (epoch, reset_interval_days, ad_delta, invited_delta, reset_invited)
+    ((5, 30, 1, 2, False), (5, 30, 1, 3, False), (5, 30, 2, 5, False)),
+    # Avval nollash, keyin qo'shish: eski takliflar yo'qoladi, yangilari qoladi
+    ((5, 30, 1, 2, False), (5, 30, 0, 4, True), (5, 30, 1, 4, True)),
+    # Nollashdan keyingi qo'shishlar saqlanadi
+    ((5, 30, 0, 4, True), (5, 30, 1, 3, False), (5, 30, 1, 7, True)),
+    # Yangi tsikl: eski tsikl deltasi o'rnini bosadi
+    ((5, 30, 3, 9, True), (6, 30, 1, 1, False), (6, 30, 1, 1, False)),
+])
+def test_merge_deltas(old, new, merged):
+    assert _merge_deltas(old, new) == merged
+
+
+class FlakyRpc:
+    """Dastlabki `failures` ta chaqiruvda xato beradi; yozilganlarni kalit bo'yicha yig'adi."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+        self.written = {}
+
+    async def __call__(self, items):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("server javob bermadi")
+        for key, delta in items:
+            self.written[key] = _merge_deltas(self.written[key], delta) if key in self.written else delta
+
+
+def make_batcher(rpc, retries=5):
+    return StatsBatcher(rpc, _merge_deltas, window=0.001, retries=retries, retry_delay=0.001)
+
+
+def test_failed_batch_is_retried_and_merged():
+    async def run():
+        rpc = FlakyRpc(failures=3)
+        batcher = make_batcher(rpc)
+        first = batcher.add(KEY, (5, 30, 1, 2, False))
+        second = batcher.add((KEY[0], 2), (5, 30, 1, 0, False))
+        while rpc.calls < 2:
+            await asyncio.sleep(0.001)
+        # Qayta urinish kutilayotganda kelgan o'zgarishlar qaytarilgan deltalar bilan birlashadi
+        third = batcher.add(KEY, (5, 30, 1, 1, False))
+        results = await asyncio.gather(first, second, third)
+        return rpc, batcher, results
+
+    rpc, batcher, results = asyncio.run(run())
+    assert results == [True, True, True]
+    assert rpc.calls == 4
+    assert rpc.written == {KEY: (5, 30, 2, 3, False), (KEY[0], 2): (5, 30, 1, 0, False)}
+    assert (batcher.flush_errors, batcher.dropped, batcher.depth()) == (3, 0, 0)
+
+
+def test_reset_during_retry_is_applied_after_failed_delta():
+    async def run():
+        rpc = FlakyRpc(failures=1)
+        batcher = make_batcher(rpc)
+        first = batcher.add(KEY, (5, 30, 1, 2, False))
+        while rpc.calls < 1:
+            await asyncio.sleep(0.001)
+        second = batcher.add(KEY, (5, 30, 0, 1, True))
+        await asyncio.gather(first, second)
+        return rpc
+
+    assert asyncio.run(run()).written == {KEY: (5, 30, 1, 1, True)}
+
+
+def test_delta_dropped_after_retries():
+    async def run():
+        rpc = FlakyRpc(failures=100)
+        batcher = make_batcher(rpc, retries=3)
+        written = await batcher.add(KEY, (5, 30, 1, 0, False))
+        return rpc, batcher, written
+
+    dropped_before = stats_deltas_dropped._values.get((), 0)
+    rpc, batcher, written = asyncio.run(run())
+    assert written is False
+    assert rpc.calls == 3
+    assert (batcher.dropped, batcher.depth(), rpc.written) == (1, 0, {})
+    assert stats_deltas_dropped._values[()] == dropped_before + 1
+
+
+def test_attempts_reset_after_success():
+    async def run():
+        rpc = FlakyRpc(failures=2)
+        batcher = make_batcher(rpc, retries=3)
+        assert await batcher.add(KEY, (5, 30, 1, 0, False))
+        rpc.failures, rpc.calls = 2, 0  # Yana 2 ta xato: oldingi urinishlar hisobga olinmasligi kerak
+        return await batcher.add(KEY, (5, 30, 1, 0, False)), rpc
+
+    written, rpc = asyncio.run(run())
+    assert written is True
+    assert rpc.written[KEY] == (5, 30, 2, 0, False)
@@ -0,0 +1,80 @@
+"""stats.journal: qayta tiklash, aylantirish (.1) va stats.d/ ga yig'ish."""
+import os
+import shutil
+
+import storage
+from stats_table import StatsTable
+
+CHAT_ID = -1001000000000
+
+
+def ads(user_id, chat_id=CHAT_ID):
+    return storage.get_user_stats(user_id, chat_id, storage.get_config(chat_id))['current_ad_cycle_count']
+
+
+def use_ads(user_id, count, chat_id=CHAT_ID):
+    for _ in range(count):
+        storage.update_user_stats(user_id, chat_id, ad_used=True)
+
+
+def test_replay_after_crash_between_rotate_and_fold(json_storage, restart):
+    use_ads(1, 2)
+    storage._rotate_journal()  # stats.journal.1 yig'ilmasdan jarayon to'xtaydi
+    use_ads(1, 1)
+    use_ads(2, 3)
+    restart()
+
+    assert os.path.exists(storage.STATS_JOURNAL_FILE + '.1')
+    assert (ads(1), ads(2)) == (3, 3)
+
+    use_ads(2, 1)
+    storage.compact_stats()
+    restart()
+
+    assert not os.path.exists(storage.STATS_JOURNAL_FILE + '.1')
+    assert (ads(1), ads(2)) == (3, 4)
+
+
+def test_replay_skips_records_already_folded(json_storage, restart):
+    use_ads(1, 3)
+    storage._rotate_journal()
+    rotated = storage.STATS_JOURNAL_FILE + '.1'
+    shutil.copy(rotated, rotated + '.bak')
+    storage._fold_journal()
+    os.replace(rotated + '.bak', rotated)  # Guruh fayli yozildi, .1 o'chirilmay qoldi
+    restart()
+
+    assert ads(1) == 3
+
+    storage.compact_stats()
+    restart()
+    assert ads(1) == 3
+
+
+def test_replay_journal_applies_only_newer_records(json_storage):
+    use_ads(1, 2, CHAT_ID)
+    use_ads(1, 2, CHAT_ID - 1)
+    storage.flush_stats()
+
+    epoch = storage.get_user_stats(1, CHAT_ID, storage.get_config(CHAT_ID))['cycle_epoch']
+
+    # Snapshot: birinchi guruh s=2 gacha, ikkinchisi s=3 gacha (1-reklama) yig'ilgan
+    table = StatsTable()
+    table.set(CHAT_ID, 1, 2, 0, epoch)
+    table.set(CHAT_ID - 1, 1, 1, 0, epoch)
+    applied = {CHAT_ID: 2, CHAT_ID - 1: 3}
+    last_seq = storage._replay_journal(storage.STATS_JOURNAL_FILE, table, lambda chat_id: applied[chat_id])
+
+    assert last_seq == 4
+    assert table.get(CHAT_ID, 1) == (2, 0, epoch)
+    assert table.get(CHAT_ID - 1, 1) == (2, 0, epoch)
+
+
+def test_replay_drops_torn_last_line(json_storage, restart):
+    use_ads(1, 2)
+    storage.flush_stats()
+    with open(storage.STATS_JOURNAL_FILE, 'a', encoding='utf-8') as f:
+        f.write('{"o":"u","c":"-10')  # Yozish paytida to'xtagan
+    restart()
+
+    assert ads(1) == 2
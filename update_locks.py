@@ -0,0 +1,94 @@
+import os
+import asyncio
+
+from aiogram import BaseMiddleware
+
+# Update'larni parallel qayta ishlash: bir xil (chat_id, user_id) uchun update'lar navbat bilan
+# (statistika o'qish-o'zgartirish-yozish ketma-ketligi buzilmasligi uchun), turli foydalanuvchilar
+# uchun esa parallel ishlaydi. Umumiy parallellik UPDATE_CONCURRENCY bilan cheklanadi.
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", 64))
+
+
+class KeyedLocks:
+    """kalit -> asyncio.Lock; lock'ni hech kim kutmay qolganda u lug'atdan o'chiriladi."""
+
+    def __init__(self):
+        self._locks = {}  # kalit -> [lock, foydalanuvchilar soni]
+
+    async def acquire(self, key):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            await entry[0].acquire()
+        except BaseException:
+            self._drop(key, entry)
+            raise
+
+    def release(self, key):
+        entry = self._locks[key]
+        entry[0].release()
+        self._drop(key, entry)
+
+    def _drop(self, key, entry):
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._locks[key]
+
+    def __contains__(self, key):
+        return key in self._locks
+
+    def __len__(self):
+        return len(self._locks)
+
+
+class UpdateSerializer(BaseMiddleware):
+    """dp.update uchun tashqi middleware: global semafor + (chat_id, user_id) bo'yicha lock."""
+
+    def __init__(self, concurrency=UPDATE_CONCURRENCY):
+        self.concurrency = concurrency
+        self._slots = None
+        self._loop = None
+        self.locks = KeyedLocks()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.contended = 0
+
+    def _get_slots(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.concurrency)
+        return self._slots
+
+    async def __call__(self, handler, event, data):
+        chat = data.get('event_chat')
+        user = data.get('event_from_user')
+        key = (chat.id if chat else None, user.id if user else None)
+
+        # Avval kalit lock'i: o'z navbatini kutayotgan update global slotni band qilmaydi
+        if key in self.locks:
+            self.contended += 1
+        await self.locks.acquire(key)
+        try:
+            async with self._get_slots():
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                try:
+                    return await handler(event, data)
+                finally:
+                    self.in_flight -= 1
+        finally:
+            self.locks.release(key)
+
+    def stats(self):
+        return {
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'locked_keys': len(self.locks),
+            'contended': self.contended,
+        }
+
+
+update_serializer = UpdateSerializer()